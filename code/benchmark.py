@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+""" Benchmarks of calculation steps for paper on
+    Global environmental and socio-economic impacts of a transition to a
+    circular economy in metal and electrical products: a Dutch case-study
+
+    Copyright (c) 2020 Bertram F. de Boer
+
+    Bertram F. de Boer
+    Faculty of Science
+    Institute of Environmental Sciences (CML)
+    Department of Industrial Ecology
+    Einsteinweg 2
+    2333 CC Leiden
+    The Netherlands
+
+    +31 (0)71 527 1478
+    b.f.de.boer@cml.leidenuniv.nl
+
+    Permission is hereby granted, free of charge, to any person obtaining a
+    copy of this software and associated documentation files (the "Software"),
+    to deal in the Software without restriction, including without limitation
+    the rights to use, copy, modify, merge, publish, distribute, sublicense,
+    and/or sell copies of the Software, and to permit persons to whom the
+    Software is furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in
+    all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+    FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+    DEALINGS IN THE SOFTWARE.
+"""
+
+import json
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import cfg
+import circular_measures_calc as cmc
+import circular_measures_main as cmm
+import leontief as lt
+import synthetic as syn
+import utils as ut
+
+# Numbers of regions and products of EXIOBASE, and numbers of measures.
+N_REG = 49
+N_PROD = 200
+LIST_N_MEAS = [1, 10, 50, 100, 200, 500]
+N_REPEAT = 3
+
+# Numbers of changed columns of A per technology scenario.
+LIST_N_COL = [1, 2, 5, 10, 50]
+
+# Numbers of measures of power series of Leontief system.
+LIST_N_MEAS_SERIES = [1, 10, 50]
+
+# Scales of pipeline benchmark: name, regions, products, and measures.
+LIST_TUP_SCALE = [('small', 5, 200, 10),
+                  ('full', 49, 200, 19),
+                  ('2x', 98, 200, 38)]
+
+# Stages of pipeline reported in benchmark, as traced spans.
+LIST_STAGE = ['parse',
+              'process',
+              'save_proc',
+              'calc_y_eb_cntr_nl',
+              'calc_bridge_eb_source_reg_all',
+              'calc_bridge_eb_source_reg_nl',
+              'gen_bridge_sbi_eb',
+              'calc_dict_op',
+              'calc_base',
+              'calc_delta',
+              'calc_fp_block',
+              'write_y_tno',
+              'get_df_result',
+              'get_df_attr',
+              'write_result',
+              'cat_result',
+              'write_cat_result']
+
+
+def calc_y_eb_source_col(df_bridge_eb_source, df_y_eb):
+    """ Calculate sourcing of final demand column by column.
+
+        Former implementation of calc_y_eb_source, kept as reference.
+
+    """
+    df_y_eb_source = pd.DataFrame()
+    with warnings.catch_warnings():
+        # Growing frame column by column is exactly what is benchmarked.
+        warnings.simplefilter('ignore', pd.errors.PerformanceWarning)
+        for col in df_y_eb.columns:
+            df_y_eb_source[col] = (
+                df_bridge_eb_source.mul(
+                    df_y_eb[col],
+                    axis=0,
+                    level=1))
+    return df_y_eb_source
+
+
+def gen_y_eb_source(n_meas, seed=0):
+    """ Generate random sourcing bridge and final demand of measures.
+
+    """
+    rng = np.random.default_rng(seed)
+    list_reg = ['R{}'.format(reg_id) for reg_id in range(N_REG)]
+    list_prod = ['P{}'.format(prod_id) for prod_id in range(N_PROD)]
+    index_source = pd.MultiIndex.from_product([list_reg, list_prod])
+    array_bridge = rng.random((N_REG, N_PROD))
+    array_bridge /= array_bridge.sum(axis=0)
+    df_bridge_eb_source = pd.Series(array_bridge.ravel(), index=index_source)
+    df_y_eb = pd.DataFrame(rng.random((N_PROD, n_meas)),
+                           index=list_prod,
+                           columns=range(n_meas))
+    return df_bridge_eb_source, df_y_eb
+
+
+def gen_ca(seed=0):
+    """ Generate random technical coefficient matrix, with columns summing
+        to at most one half.
+
+    """
+    rng = np.random.default_rng(seed)
+    list_reg = ['R{}'.format(reg_id) for reg_id in range(N_REG)]
+    list_prod = ['P{}'.format(prod_id) for prod_id in range(N_PROD)]
+    index_ca = pd.MultiIndex.from_product([list_reg, list_prod, ['']])
+    columns_ca = pd.MultiIndex.from_product([list_reg, list_prod])
+    n_x = len(columns_ca)
+    array_ca = rng.random((n_x, n_x))*(rng.random((n_x, n_x)) < 0.2)
+    array_ca *= rng.uniform(0.2, 0.5, n_x)/array_ca.sum(axis=0)
+    return pd.DataFrame(array_ca, index=index_ca, columns=columns_ca)
+
+
+def calc_y_cbs_circular_rep_col(df_io_cbs_2010_circular_coeff,
+                                df_y_cbs_circular,
+                                tup_cbs_rep):
+    """ Calculate imports or margins of repair sector column by column.
+
+        Former implementation of calc_y_delta_cbs_circular_import, kept as
+        reference.
+
+    """
+    dict_y_cbs_circular_rep = {}
+    for col in df_y_cbs_circular:
+        df_y_cbs_circular_col_diag = (
+            pd.DataFrame(np.diag(df_y_cbs_circular[col]),
+                         index=df_y_cbs_circular.index,
+                         columns=df_y_cbs_circular.index))
+        df_y_cbs_circular_col_rep = df_io_cbs_2010_circular_coeff.dot(
+            df_y_cbs_circular_col_diag)
+        dict_y_cbs_circular_rep[col] = (
+            df_y_cbs_circular_col_rep.sum()[tup_cbs_rep])
+    return dict_y_cbs_circular_rep
+
+
+def gen_y_cbs_circular(n_meas, seed=0):
+    """ Generate random import coefficients and demand of repair sectors.
+
+    """
+    rng = np.random.default_rng(seed)
+    index_rep = pd.MultiIndex.from_tuples([cfg.TUP_CBS_REP_MACH,
+                                           cfg.TUP_CBS_REP_CONS])
+    df_coeff = pd.DataFrame(rng.random((2, 2)), columns=index_rep)
+    df_y_cbs_circular = pd.DataFrame(rng.random((2, n_meas)),
+                                     index=index_rep,
+                                     columns=range(n_meas))
+    return df_coeff, df_y_cbs_circular
+
+
+def get_time(func, *args):
+    """ Get best wall time of repeated calls.
+
+    """
+    list_time = []
+    for _ in range(N_REPEAT):
+        time_start = time.perf_counter()
+        func(*args)
+        list_time.append(time.perf_counter()-time_start)
+    return min(list_time)
+
+
+def bench_calc_y_eb_source():
+    """ Compare column wise and broadcasted sourcing of final demand.
+
+    """
+    print('calc_y_eb_source: {} regions, {} products'.format(N_REG, N_PROD))
+    print('{:>8}{:>14}{:>14}{:>10}'.format('measures', 'column [s]',
+                                           'broadcast [s]', 'speedup'))
+    for n_meas in LIST_N_MEAS:
+        df_bridge_eb_source, df_y_eb = gen_y_eb_source(n_meas)
+        time_col = get_time(calc_y_eb_source_col, df_bridge_eb_source,
+                            df_y_eb)
+        time_vec = get_time(cmc.calc_y_eb_source, df_bridge_eb_source,
+                            df_y_eb)
+        print('{:>8}{:>14.4f}{:>14.4f}{:>10.1f}'.format(
+            n_meas, time_col, time_vec, time_col/time_vec))
+
+
+def bench_calc_y_cbs_circular_rep():
+    """ Compare column wise and batched imports of repair sectors.
+
+    """
+    print('calc_y_cbs_circular_rep: consumer and machinery repairs')
+    print('{:>8}{:>14}{:>14}{:>10}'.format('measures', 'column [s]',
+                                           'batched [s]', 'speedup'))
+    for n_meas in LIST_N_MEAS:
+        df_coeff, df_y_cbs_circular = gen_y_cbs_circular(n_meas)
+        list_tup_cbs_rep = [cfg.TUP_CBS_REP_CONS, cfg.TUP_CBS_REP_MACH]
+        time_col = sum(get_time(calc_y_cbs_circular_rep_col, df_coeff,
+                                df_y_cbs_circular, tup_cbs_rep)
+                       for tup_cbs_rep in list_tup_cbs_rep)
+        time_vec = get_time(cmc.calc_y_cbs_circular_rep, df_coeff,
+                            df_y_cbs_circular, list_tup_cbs_rep)
+        print('{:>8}{:>14.4f}{:>14.4f}{:>10.1f}'.format(
+            n_meas, time_col, time_vec, time_col/time_vec))
+
+
+def bench_calc_update():
+    """ Compare refactorization and low-rank update of Leontief system for
+        technology scenarios.
+
+    """
+    print('calc_update: {} regions, {} products'.format(N_REG, N_PROD))
+    print('{:>8}{:>14}{:>14}{:>10}'.format('columns', 'factorize [s]',
+                                           'update [s]', 'speedup'))
+    rng = np.random.default_rng(0)
+    df_ca = gen_ca()
+    n_x = len(df_ca.columns)
+    dict_lu = lt.factorize(df_ca)
+    time_lu = get_time(lt.factorize, df_ca)
+    for n_col in LIST_N_COL:
+        array_pos = rng.choice(n_x, n_col, replace=False)
+        array_d = -0.1*df_ca.values[:, array_pos]
+        time_update = get_time(lt.calc_update, dict_lu, array_pos, array_d)
+        print('{:>8}{:>14.4f}{:>14.4f}{:>10.1f}'.format(
+            n_col, time_lu, time_update, time_lu/time_update))
+
+
+def calc_x_method(method, df_ca, array_y):
+    """ Calculate total output with given method, including factorization.
+
+    """
+    cfg.LEONTIEF_METHOD = method
+    return lt.solve(lt.factorize(df_ca), array_y)
+
+
+def bench_solve_series():
+    """ Compare exact solve and power series of Leontief system, over
+        final demand of measures.
+
+    """
+    print('solve_series: {} regions, {} products, tolerance {}'.format(
+        N_REG, N_PROD, cfg.LEONTIEF_SERIES_TOL))
+    print('{:>8}{:>14}{:>14}{:>10}{:>8}{:>12}{:>12}'.format(
+        'measures', 'exact [s]', 'series [s]', 'speedup', 'tiers', 'bound',
+        'error'))
+    rng = np.random.default_rng(0)
+    df_ca = gen_ca()
+    method = cfg.LEONTIEF_METHOD
+    for n_meas in LIST_N_MEAS_SERIES:
+        array_y = rng.random((len(df_ca.columns), n_meas))
+        array_x = calc_x_method('dense', df_ca, array_y)
+        cfg.LEONTIEF_METHOD = 'series'
+        array_x_series, n_tier, array_err = lt.solve_series(
+            lt.factorize(df_ca), array_y)
+        err = (np.linalg.norm(array_x_series-array_x, 1, axis=0) /
+               np.linalg.norm(array_x, 1, axis=0)).max()
+        time_exact = get_time(calc_x_method, 'dense', df_ca, array_y)
+        time_series = get_time(calc_x_method, 'series', df_ca, array_y)
+        print('{:>8}{:>14.4f}{:>14.4f}{:>10.1f}{:>8}{:>12.1e}{:>12.1e}'
+              .format(n_meas, time_exact, time_series, time_exact/time_series,
+                      n_tier, array_err.max(), err))
+    cfg.LEONTIEF_METHOD = method
+
+
+def get_dict_stage(list_dict_span):
+    """ Sum calls and wall time, and take maximum peak of traced memory,
+        of spans per stage.
+
+    """
+    dict_stage = {}
+    for dict_span in list_dict_span:
+        name = dict_span['name']
+        if name not in LIST_STAGE:
+            continue
+        if name not in dict_stage:
+            dict_stage[name] = {'n_call': 0, 'time': 0., 'mem': 0.}
+        dict_stage[name]['n_call'] += 1
+        dict_stage[name]['time'] += dict_span['wall']
+        mem_peak = dict_span.get('mem_peak')
+        if mem_peak is None or dict_stage[name]['mem'] is None:
+            dict_stage[name]['mem'] = None
+        else:
+            dict_stage[name]['mem'] = max(dict_stage[name]['mem'], mem_peak)
+    return dict_stage
+
+
+def bench_pipeline(list_scale_name=None, bool_mem=True):
+    """ Time and profile memory of stages of pipeline on synthetic data.
+
+        Synthetic EXIOBASE and input of TNO are generated per scale in a
+        temporary directory, and main is run once with cfg.TRACE. Stages
+        are reported from spans of trace, which main writes to log
+        directory. Times of stages include overhead of tracing memory if
+        bool_mem. Stages of tasks that overlap in task graph have no peak,
+        see ut.span.
+
+        Parameters:
+        -----------
+        list_scale_name: list with names of scales in LIST_TUP_SCALE, or
+        None for all scales.
+        bool_mem: boolean to trace peak memory per stage.
+
+    """
+    for scale_name, n_reg, n_prod, n_meas in LIST_TUP_SCALE:
+        if list_scale_name and scale_name not in list_scale_name:
+            continue
+        with tempfile.TemporaryDirectory() as dir_path:
+            time_start = time.perf_counter()
+            dict_syn = syn.gen(dir_path, n_reg, n_prod, n_meas)
+            time_gen = time.perf_counter()-time_start
+            syn.set_cfg(dict_syn, dir_path+'/output')
+            cfg.TRACE = True
+            cfg.TRACE_MEM = bool_mem
+            ut.makedirs()
+
+            time_start = time.perf_counter()
+            cmm.main()
+            time_main = time.perf_counter()-time_start
+
+            # Spans of ut.list_span are cleared once main wrote them.
+            list_dict_span = []
+            with open(cfg.LOG_DIR_PATH+cfg.TRACE_FILE_NAME) as read_file:
+                for line in read_file:
+                    list_dict_span.append(json.loads(line))
+            dict_stage = get_dict_stage(list_dict_span)
+
+        print('pipeline {}: {} regions, {} products, {} measures'.format(
+            scale_name, n_reg, n_prod, n_meas))
+        print('{:<32}{:>8}{:>12}{:>12}'.format('stage', 'calls', 'time [s]',
+                                               'peak [MB]'))
+        print('{:<32}{:>8}{:>12.2f}{:>12}'.format('generate', 1, time_gen,
+                                                  ''))
+        for name in LIST_STAGE:
+            if name not in dict_stage:
+                continue
+            dict_func = dict_stage[name]
+            str_mem = ''
+            if bool_mem and dict_func['mem'] is not None:
+                str_mem = '{:.1f}'.format(dict_func['mem']/2**20)
+            print('{:<32}{:>8}{:>12.2f}{:>12}'.format(
+                name, dict_func['n_call'], dict_func['time'], str_mem))
+        print('{:<32}{:>8}{:>12.2f}{:>12}'.format('main', 1, time_main, ''))
+
+
+if __name__ == '__main__':
+    # Run pipeline benchmark for given scales with argument 'pipeline',
+    # technology scenarios with argument 'tech', and power series of
+    # Leontief system with argument 'series'.
+    if sys.argv[1:2] == ['pipeline']:
+        bench_pipeline(sys.argv[2:])
+    elif sys.argv[1:2] == ['tech']:
+        bench_calc_update()
+    elif sys.argv[1:2] == ['series']:
+        bench_solve_series()
+    else:
+        bench_calc_y_eb_source()
+        bench_calc_y_cbs_circular_rep()
@@ -62,6 +62,13 @@ RESULT_DIR_PATH = '{}/result/'.format(OUTPUT_DIR_PATH)
 RESULT_TXT_DIR_PATH = '{}/txt/'.format(RESULT_DIR_PATH)
 LOG_DIR_PATH = '{}/log/'.format(OUTPUT_DIR_PATH)
 
+# Directory with store of long-format results, partitioned by variant.
+RESULT_STORE_DIR_PATH = '{}/store/'.format(RESULT_DIR_PATH)
+
+# Directory with store of long-format attribution of footprints to
+# pathways, written in block evaluation.
+RESULT_ATTR_STORE_DIR_PATH = '{}/store_attr/'.format(RESULT_DIR_PATH)
+
 LIST_OUTPUT_DIR_PATH = [RESULT_TXT_DIR_PATH,
                         LOG_DIR_PATH]
 
@@ -79,6 +86,8 @@ CBS_REP_EMP_2010_FILE_NAME = 'cbs_rep_emp_2010.txt'
 # Directory with raw text version of EXIOBASE. Used for parsing.
 EB_DATA_DIR_PATH = '../../data/'
 EB_DIR_PATH = EB_DATA_DIR_PATH+'mrIOT_pxp_ita_transactions_3.3_2010/'
+# Number of processes to parse EXIOBASE tables. None uses all processors.
+EB_PARSE_N_WORKER = None
 E_FP_FILE_NAME = 'list_impact_emission.txt'
 M_FP_FILE_NAME = 'list_impact_material.txt'
 R_FP_FILE_NAME = 'list_impact_resource.txt'
@@ -89,8 +98,32 @@ DICT_FP_FILE_NAME = {}
 DICT_FP_FILE_NAME['job'] = JOB_FP_FILE_NAME
 DICT_FP_FILE_NAME['va'] = VA_FP_FILE_NAME
 
-# Name of processed EXIOBASE pickle.
-DICT_EB_PROC_FILE_NAME = 'dict_eb_proc.pkl'
+# Directory with processed EXIOBASE stores. Each store is kept in a
+# subdirectory named by hash of raw EXIOBASE and processing code. Each table
+# is saved as raw .npy array, opened memory-mapped, with separate index meta
+# data. Lock file guards rebuilds by concurrent runs.
+EB_PROC_DIR_NAME = 'eb_proc/'
+EB_PROC_META_FILE_NAME = 'meta.json'
+EB_PROC_LOCK_FILE_NAME = 'build.lock'
+EB_PROC_STORE_VERSION = 1
+
+# Boolean to key processed EXIOBASE store on content of raw EXIOBASE.
+# Otherwise, store is keyed on manifest of file sizes and modification
+# times, such that startup with warm store does not read raw tables. Without
+# raw EXIOBASE, newest valid store is used.
+EB_PROC_HASH_CONTENT = False
+
+# Subdirectory of processed EXIOBASE store with regional footprint
+# multipliers, keyed on requested footprints, impacts, and regions.
+EB_MULT_DIR_NAME = 'mult/'
+EB_MULT_STORE_VERSION = 1
+
+# Subdirectory of processed EXIOBASE store with cached results per measure,
+# keyed on invariants of model, regions, and calculation code. Each measure
+# is saved as pickle named by hash of its final demand in TNO
+# classification.
+EB_RESULT_DIR_NAME = 'result/'
+EB_RESULT_STORE_VERSION = 1
 
 TUP_CBS_REP_CONS = (73, 'Reparatie van consumentenartikelen')
 TUP_EB_REP_CONS = ('NL',
@@ -117,11 +150,77 @@ TUP_EB_MARGIN = ('NL', ('Wholesale trade and commission trade services, '
 # Boolean to save processed EXIOBASE version for future uses.
 SAVE_EB = True
 
+# Boolean to build dense Leontief inverse cL in processed EXIOBASE.
+# Total output is solved from LU factorization of I-A otherwise.
+CALC_CL = False
+
+# Boolean to evaluate footprints with precomputed regional multipliers
+# M = (F o mask)L, instead of solving total output of each demand.
+FP_MULT = True
+
+# Boolean to reuse cached results of measures with unchanged final demand
+# and model. Only changed measures are evaluated again.
+RESULT_CACHE = True
+
+# Task graph of model, baseline, and delta. Results of tasks are stored as
+# pickle in GRAPH_DIR_NAME of input directory, named by hash of code, input
+# files, and keys of input tasks, if GRAPH_STORE. Independent tasks run
+# concurrently on GRAPH_N_WORKER threads.
+GRAPH_DIR_NAME = 'graph/'
+GRAPH_STORE_VERSION = 1
+GRAPH_STORE = True
+GRAPH_N_WORKER = 4
+
+# Executor to evaluate measures in calc_base and calc_delta: 'serial',
+# 'thread', or 'process'. Measures are sharded over CALC_N_WORKER workers.
+# None uses all processors. Process workers map store of processed EXIOBASE.
+CALC_EXECUTOR = 'serial'
+CALC_N_WORKER = None
+
+# Boolean to evaluate baseline and delta of all pathways in one block of
+# final demand, solved and characterized once, with footprints attributed
+# per pathway. Block is evaluated in one pass, without CALC_EXECUTOR.
+CALC_BLOCK = True
+
+# Method to factorize I-A: 'auto', 'dense' (LAPACK), or 'sparse' (SuperLU).
+# In 'auto' mode, sparse LU is used if fill ratio of A is below maximum.
+# Method 'series' approximates x = sum of A^k y with sparse products over A,
+# without factorization, for exploratory runs.
+LEONTIEF_METHOD = 'auto'
+LEONTIEF_SPARSE_FILL_MAX = 0.1
+
+# Relative tolerance and maximum number of tiers of power series. Series
+# stops if a-posteriori bound on error of each solution is below tolerance
+# times its norm. Bound requires column sums of |A| below one.
+LEONTIEF_SERIES_TOL = 1e-6
+LEONTIEF_SERIES_MAX_TIER = 1000
+
+# Host and port of local scenario server. Server is bound to localhost only.
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 8765
+
 # Define file names of log data.
 LOG_FILE_NAME = 'log.txt'
 
-# Define log mode for first log.
-log_mode = 'w'
+# Boolean to trace wall time, CPU time, peak memory, and array sizes of
+# stages. Spans are written to log directory at end of run, as JSON lines
+# and in Chrome trace format (chrome://tracing). Boolean to also trace
+# Python allocations per span with tracemalloc, which slows down run. Peak
+# of tracemalloc is process-global, so exact peaks need GRAPH_N_WORKER = 1;
+# otherwise spans that overlap other threads have no peak.
+TRACE = False
+TRACE_MEM = False
+TRACE_FILE_NAME = 'trace.jsonl'
+TRACE_CHROME_FILE_NAME = 'trace.json'
+
+# Level of log, and boolean to write log from background thread.
+# Lines are buffered up to LOG_BUFFER_SIZE characters, or
+# LOG_FLUSH_INTERVAL seconds, and written at once. Warnings are written
+# immediately. Log of previous run is overwritten.
+LOG_LEVEL = 'INFO'
+LOG_THREAD = False
+LOG_BUFFER_SIZE = 1 << 16
+LOG_FLUSH_INTERVAL = 5.
 
 TUP_NL = ('NL', ['NL'])
 
@@ -190,6 +289,72 @@ TUP_VA_SCALAR_DELTA = ('Value added [G€]',
                        ('Value added', 'G€'),
                        1e3)
 
+DICT_FP_TUP_SCALAR_DELTA = {'Carbon': TUP_CF_SCALAR_DELTA,
+                            'Material use': TUP_MF_SCALAR_DELTA,
+                            'Water consumption': TUP_WF_SCALAR_DELTA,
+                            'Land use': TUP_LF_SCALAR_DELTA}
+
+DICT_FP_TUP_SCALAR_BASE = {'Carbon': TUP_CF_SCALAR_BASE,
+                           'Material use': TUP_MF_SCALAR_BASE,
+                           'Water consumption': TUP_WF_SCALAR_BASE,
+                           'Land use': TUP_LF_SCALAR_BASE}
+
+# Long-format results with one row per run, variant, pathway, measure,
+# region, and indicator, in reporting units. Store is written as Parquet if
+# pyarrow is installed, and as gzipped tab separated text otherwise. Text
+# files of totals per activity are derived from it. Direct effects of
+# repair sectors in NL count as circularity activities.
+RUN_ID = DATE
+LIST_RESULT_COL = ['run',
+                   'variant',
+                   'pathway',
+                   'measure',
+                   'region',
+                   'indicator',
+                   'unit',
+                   'value']
+DICT_PATHWAY_ACT = {'prim': 'Prim',
+                    'circ': 'Circ',
+                    'direct': 'Circ'}
+
+# Pathways of final demand per activity, attributed in block evaluation.
+# Imports and margins of circularity activities are rank-1 pathways.
+DICT_ACT_LIST_PATHWAY = {'prim': ['primary'],
+                         'circ': ['domestic',
+                                  'import_cons',
+                                  'import_mach',
+                                  'margin_cons',
+                                  'margin_mach']}
+RESULT_STORE_COMPRESSION = 'zstd'
+RESULT_STORE_TXT_FILE_NAME = 'part-0.txt.gz'
+CAT_FILE_NAME_PATTERN = 'd_cat_{}.txt'
+
+# Monte Carlo over low and high bounds of TNO final demand. Samples are
+# drawn in chunks to bound memory. Percentiles are reported per footprint,
+# region, and measure.
+MC_N_SAMPLE = 10000
+MC_CHUNK_SIZE = 1000
+MC_SEED = 0
+MC_LIST_PCT = [5, 50, 95]
+DELTA_MC_FILE_NAME = 'delta_mc.txt'
+DELTA_BOUND_FILE_NAME = 'delta_bound.txt'
+DELTA_BOUND_IND_FILE_NAME = 'delta_bound_ind.txt'
+BASE_BOUND_FILE_NAME = 'base_bound.txt'
+BASE_BOUND_IND_FILE_NAME = 'base_bound_ind.txt'
+
+# Technology scenarios, as factors on columns of technical coefficients of
+# EXIOBASE. Empty row region or product applies factor to all regions or
+# products. Scenarios are evaluated as low-rank updates of baseline
+# Leontief system, without refactorization.
+TECH_FILE_NAME = 'tech_scenario.txt'
+TECH_LIST_COL = ['scen_id',
+                 'col_reg',
+                 'col_prod',
+                 'row_reg',
+                 'row_prod',
+                 'factor']
+DELTA_TECH_FILE_NAME = 'delta_tech.txt'
+
 BASE_NET_FILE_NAME_PATTERN = 'base_net'
 BASE_CIRC_FILE_NAME_PATTERN = 'base_circ'
 BASE_PRIM_FILE_NAME_PATTERN = 'base_prim'
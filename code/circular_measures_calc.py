@@ -35,31 +35,83 @@
     DEALINGS IN THE SOFTWARE.
 """
 
+import concurrent.futures as cf
+import inspect
+import os
+import threading
+
 import numpy as np
 import pandas as pd
 
 import cfg
+import exiobase as eb
+import leontief as lt
 import utils as ut
 
+# Processed EXIOBASE per worker process, loaded memory-mapped once by
+# init_worker.
+dict_worker = {}
+
+# Locks to compute regional multipliers, output of injections, footprint
+# intensities, and rows of factor inputs once per process. Renewed in worker
+# processes, since fork may copy them while held by other thread.
+dict_lock = {'mult': threading.Lock(),
+             'inject': threading.Lock(),
+             'qr': threading.Lock(),
+             'cv': threading.Lock()}
+
 # Calculate total demand of machinery, and electrical machinery in EXIOBASE.
 
 
+def calc_y_cbs_circular_rep(df_io_cbs_2010_circular_coeff,
+                            df_y_cbs_circular,
+                            list_tup_cbs_rep=None):
+    """ Calculate imports or margins of repair sectors for all measures.
+
+        Import or margin of a repair sector is the column sum of its
+        coefficients times its demand. All measures and repair sectors are
+        handled in one elementwise product, instead of diagonalizing demand
+        per measure.
+
+        Parameters:
+        -----------
+        df_io_cbs_2010_circular_coeff: DataFrame with import or margin
+        coefficients of circularity sectors in CBS classification.
+        df_y_cbs_circular: DataFrame with demand of circularity sectors in
+        CBS classification, with measures as columns.
+        list_tup_cbs_rep: list with repair sectors. Defaults to consumer
+        and machinery repairs.
+
+        Returns:
+        --------
+        df_y_cbs_circular_rep: DataFrame with repair sectors as index, and
+        measures as columns.
+
+    """
+    if list_tup_cbs_rep is None:
+        list_tup_cbs_rep = [cfg.TUP_CBS_REP_CONS, cfg.TUP_CBS_REP_MACH]
+    index_rep = pd.MultiIndex.from_tuples(list_tup_cbs_rep)
+    df_coeff_sum = df_io_cbs_2010_circular_coeff.sum()
+    array_y_cbs_circular_rep = (
+        df_coeff_sum.reindex(index_rep).values[:, np.newaxis] *
+        df_y_cbs_circular.reindex(index_rep).values)
+    df_y_cbs_circular_rep = pd.DataFrame(array_y_cbs_circular_rep,
+                                         index=index_rep,
+                                         columns=df_y_cbs_circular.columns)
+    return df_y_cbs_circular_rep
+
+
 def calc_y_base_cbs_circular_import(df_io_cbs_2010_circular_import_coeff,
                                     df_y_base_cbs_circular,
                                     tup_cbs_rep):
     """ Calculate imports for baseline of
         circularity activities in CBS classification.
     """
-    df_y_base_cbs_circular_diag = (
-        pd.DataFrame(np.diag(df_y_base_cbs_circular[0]),
-                     index=df_y_base_cbs_circular.index,
-                     columns=df_y_base_cbs_circular.index))
-    df_y_base_cbs_circular_import = df_io_cbs_2010_circular_import_coeff.dot(
-        df_y_base_cbs_circular_diag)
-    df_y_base_cbs_circular_import_sum = df_y_base_cbs_circular_import.sum()
-    df_y_base_cbs_circular_import_cons = df_y_base_cbs_circular_import_sum[(
-        tup_cbs_rep)]
-    return df_y_base_cbs_circular_import_cons
+    df_y_base_cbs_circular_import = calc_y_cbs_circular_rep(
+        df_io_cbs_2010_circular_import_coeff,
+        df_y_base_cbs_circular[[0]],
+        [tup_cbs_rep])
+    return df_y_base_cbs_circular_import.iloc[0, 0]
 
 
 def calc_y_base_cbs_circular_margin(df_io_cbs_2010_circular_margin_coeff,
@@ -68,38 +120,11 @@ def calc_y_base_cbs_circular_margin(df_io_cbs_2010_circular_margin_coeff,
     """ Calculate margins for baseline of
         circularity activities in CBS classification.
     """
-    df_y_base_cbs_circular_diag = (
-        pd.DataFrame(np.diag(df_y_base_cbs_circular[0]),
-                     index=df_y_base_cbs_circular.index,
-                     columns=df_y_base_cbs_circular.index))
-    df_y_base_cbs_circular_margin = df_io_cbs_2010_circular_margin_coeff.dot(
-        df_y_base_cbs_circular_diag)
-    df_y_base_cbs_circular_margin_sum = df_y_base_cbs_circular_margin.sum()
-    df_y_base_cbs_circular_margin_cons = df_y_base_cbs_circular_margin_sum[(
-        tup_cbs_rep)]
-    return df_y_base_cbs_circular_margin_cons
-
-
-def calc_y_delta_eb_circular_import(df_eb_ca_nl_rep_cons_reg_import,
-                                    dict_y_delta_cbs_circular_import_cons):
-    """ Calculate imports for changes in
-        circularity activities in EB classification.
-    """
-    df_y_delta_eb_circular_import_cons = pd.DataFrame()
-    for col in dict_y_delta_cbs_circular_import_cons:
-        df_y_delta_cbs_circular_col_import_cons = (
-            dict_y_delta_cbs_circular_import_cons[col])
-        df_y_delta_eb_circular_col_import_cons = pd.DataFrame(
-            df_eb_ca_nl_rep_cons_reg_import *
-            df_y_delta_cbs_circular_col_import_cons)
-        df_y_delta_eb_circular_col_import_cons.columns = [col]
-        if df_y_delta_eb_circular_import_cons.empty:
-            df_y_delta_eb_circular_import_cons = (
-                df_y_delta_eb_circular_col_import_cons)
-        else:
-            df_y_delta_eb_circular_import_cons[col] = (
-                df_y_delta_eb_circular_col_import_cons)
-    return df_y_delta_eb_circular_import_cons
+    df_y_base_cbs_circular_margin = calc_y_cbs_circular_rep(
+        df_io_cbs_2010_circular_margin_coeff,
+        df_y_base_cbs_circular[[0]],
+        [tup_cbs_rep])
+    return df_y_base_cbs_circular_margin.iloc[0, 0]
 
 
 def calc_y_delta_cbs_circular_import(df_io_cbs_2010_circular_import_coeff,
@@ -108,22 +133,11 @@ def calc_y_delta_cbs_circular_import(df_io_cbs_2010_circular_import_coeff,
     """ Calculate imports for changes in
         circularity activities in CBS classification.
     """
-    dict_y_delta_cbs_circular_import_cons = {}
-    for col in df_y_delta_cbs_circular:
-        df_y_delta_cbs_circular_col_diag = (
-            pd.DataFrame(np.diag(df_y_delta_cbs_circular[col]),
-                         index=df_y_delta_cbs_circular.index,
-                         columns=df_y_delta_cbs_circular.index))
-        df_y_delta_cbs_circular_col_import = (
-            df_io_cbs_2010_circular_import_coeff.dot(
-                df_y_delta_cbs_circular_col_diag))
-        df_y_delta_cbs_circular_col_import_sum = (
-            df_y_delta_cbs_circular_col_import.sum())
-        df_y_delta_cbs_circular_col_import_cons = (
-            df_y_delta_cbs_circular_col_import_sum[tup_cbs_rep])
-        dict_y_delta_cbs_circular_import_cons[col] = (
-            df_y_delta_cbs_circular_col_import_cons)
-    return dict_y_delta_cbs_circular_import_cons
+    df_y_delta_cbs_circular_import = calc_y_cbs_circular_rep(
+        df_io_cbs_2010_circular_import_coeff,
+        df_y_delta_cbs_circular,
+        [tup_cbs_rep])
+    return df_y_delta_cbs_circular_import.iloc[0].to_dict()
 
 
 def calc_y_delta_cbs_circular_margin(df_io_cbs_2010_circular_margin_coeff,
@@ -132,57 +146,48 @@ def calc_y_delta_cbs_circular_margin(df_io_cbs_2010_circular_margin_coeff,
     """ Calculate margins for changes in
         circularity activities in CBS classification.
     """
+    df_y_delta_cbs_circular_margin = calc_y_cbs_circular_rep(
+        df_io_cbs_2010_circular_margin_coeff,
+        df_y_delta_cbs_circular,
+        [tup_cbs_rep])
+    return df_y_delta_cbs_circular_margin.iloc[0].to_dict()
+
+
+def get_sr_y_margin():
+    """ Get final demand injection of margins per unit amount.
+
+        Margins are allocated to margin sector of EB, as given by
+        TUP_EB_MARGIN.
 
-    dict_y_delta_cbs_circular_margin_cons = {}
-    for col in df_y_delta_cbs_circular:
-        df_y_delta_cbs_circular_col_diag = (
-            pd.DataFrame(np.diag(df_y_delta_cbs_circular[col]),
-                         index=df_y_delta_cbs_circular.index,
-                         columns=df_y_delta_cbs_circular.index))
-        df_y_delta_cbs_circular_col_margin = (
-            df_io_cbs_2010_circular_margin_coeff.dot(
-                df_y_delta_cbs_circular_col_diag))
-        df_y_delta_cbs_circular_col_margin_sum = (
-            df_y_delta_cbs_circular_col_margin.sum())
-        df_y_delta_cbs_circular_col_margin_cons = (
-            df_y_delta_cbs_circular_col_margin_sum[tup_cbs_rep])
-        dict_y_delta_cbs_circular_margin_cons[col] = (
-            df_y_delta_cbs_circular_col_margin_cons)
-    return dict_y_delta_cbs_circular_margin_cons
-
-
-def calc_delta_eb_margin(df_y_base_eb_primary_source,
-                         dict_y_delta_cbs_circular_margin):
-    """ Calculate imports for changes in
-        circularity activities in EB classification.
     """
+    sr_y_margin = pd.Series(
+        [1.0],
+        index=pd.MultiIndex.from_tuples([cfg.TUP_EB_MARGIN]))
+    return sr_y_margin
 
-    df_margin = pd.DataFrame()
-    for meas_id in dict_y_delta_cbs_circular_margin:
-        margin = dict_y_delta_cbs_circular_margin[meas_id]
-        df_y_delta_eb_circular_margin_col = df_y_base_eb_primary_source.copy()
-        df_y_delta_eb_circular_margin_col[:] = 0
-        df_y_delta_eb_circular_margin_col.loc[cfg.TUP_EB_MARGIN] = (
-            margin)
-        df_y_delta_eb_circular_margin_col.columns = [meas_id]
-        if df_margin.empty:
-            df_margin = df_y_delta_eb_circular_margin_col
-        else:
-            df_margin[meas_id] = df_y_delta_eb_circular_margin_col
-    return df_margin
 
+def get_sr_y_import(df_eb_ca_import):
+    """ Get final demand injection of imports per unit amount, from nonzero
+        rows of production recipe of imports.
 
-def calc_base_eb_margin(df_y_base_eb_primary_source,
-                        df_y_base_cbs_circular_margin):
-    """ Calculate margins for baseline of
-        circularity activities in EB classification.
     """
+    return df_eb_ca_import[df_eb_ca_import != 0]
 
-    df_y_base_eb_circular_margin_cons = df_y_base_eb_primary_source.copy()
-    df_y_base_eb_circular_margin_cons[:] = 0
-    df_y_base_eb_circular_margin_cons.loc[cfg.TUP_EB_MARGIN] = (
-        df_y_base_cbs_circular_margin)
-    return df_y_base_eb_circular_margin_cons
+
+def get_x_inject(dict_io_eb_2010, sr_y_inject):
+    """ Get total output of sparse final demand injection per unit amount.
+        Solved on first request and kept in dict_io_eb_2010,
+        keyed on the injection.
+
+    """
+    tup_key = (tuple(sr_y_inject.index), tuple(sr_y_inject.values))
+    # Baseline and delta may ask for same injection concurrently.
+    with dict_lock['inject']:
+        dict_x_inject = dict_io_eb_2010.setdefault('cX_inject', {})
+        if tup_key not in dict_x_inject:
+            dict_x_inject[tup_key] = lt.calc_x_inject(
+                lt.get_lu(dict_io_eb_2010), sr_y_inject)
+    return dict_x_inject[tup_key]
 
 
 def calc_eb_ca_import(dict_io_eb_2010_proc, tup_cntr_prod):
@@ -205,17 +210,26 @@ def calc_eb_ca_import(dict_io_eb_2010_proc, tup_cntr_prod):
     return df_ca_nl_rep_cons_reg_import_scaled
 
 
-def calc_bridge_eb_source_reg_all(dict_io_eb_2010):
-    """ Calculate sourcing in EB classification.
-    """
+@ut.trace
+def calc_y_eb_cntr_nl(dict_io_eb_2010):
+    """ Calculate final demand of NL in EB classification, summed over
+        final demand categories. Shared by bridges of sourcing, and bridge
+        from SBI to EB classification.
 
+    """
     df_eb_y = dict_io_eb_2010['tY']
 
     # Sum final demand to country level.
     df_eb_y_cntr = df_eb_y.sum(axis=1, level=0)
 
     # Get final demand from NL.
-    df_eb_y_cntr_nl = df_eb_y_cntr['NL']
+    return df_eb_y_cntr['NL']
+
+
+@ut.trace
+def calc_bridge_eb_source_reg_all(df_eb_y_cntr_nl):
+    """ Calculate sourcing in EB classification.
+    """
 
     # Get total use per product.
     df_eb_y_cntr_nl_prod = df_eb_y_cntr_nl.sum(level=1)
@@ -234,18 +248,13 @@ def calc_bridge_eb_source_reg_all(dict_io_eb_2010):
     return df_eb_y_cntr_nl_frac_div
 
 
-def calc_bridge_eb_source_reg_nl(dict_io_eb_2010):
+@ut.trace
+def calc_bridge_eb_source_reg_nl(df_eb_y_cntr_nl):
     """ Calculate sourcing from NL in EB classification.
 
     """
 
-    df_eb_y = dict_io_eb_2010['tY']
-
-    # Sum final demand to country level.
-    df_eb_y_cntr = df_eb_y.sum(axis=1, level=0)
-
-    # Get final demand from NL.
-    df_eb_y_cntr_nl = df_eb_y_cntr['NL']
+    df_eb_y_cntr_nl = df_eb_y_cntr_nl.copy()
     df_eb_y_cntr_nl[:] = 0
 
     df_eb_y_cntr_nl.loc['NL'] = 1
@@ -262,60 +271,394 @@ def calc_y_eb(df_bridge_eb_cpa3, df_y_cpa3):
     return df_y_eb
 
 
+@ut.trace
 def calc_y_eb_source(df_bridge_eb_source, df_y_eb):
     """ Calculate sourcing of final demand.
 
     """
 
-    df_y_eb_source = pd.DataFrame()
-    for col in df_y_eb.columns:
-        df_y_eb_source[col] = (
-            df_bridge_eb_source.mul(
-                df_y_eb[col],
-                axis=0,
-                level=1))
+    # Broadcast sourcing fractions of (region, product) over demand of
+    # product for all columns at once.
+    array_y_eb = df_y_eb.reindex(
+        df_bridge_eb_source.index.get_level_values(1)).values
+    df_y_eb_source = pd.DataFrame(
+        df_bridge_eb_source.values[:, np.newaxis]*array_y_eb,
+        index=df_bridge_eb_source.index,
+        columns=df_y_eb.columns)
     return df_y_eb_source
 
 
-def calc_x_eb(dict_io_eb_2010, df_y_eb_source):
+def get_df_ident(index):
+    """ Get identity demand with one column per row of index.
+
+        Columns are numbered by position, such that chain functions of
+        demand that loop over columns can be applied to it.
+
+    """
+    df_ident = pd.DataFrame(np.eye(len(index)),
+                            index=index,
+                            columns=range(len(index)))
+    return df_ident
+
+
+def set_op_columns(df_op, columns):
+    """ Label columns of operator derived from identity demand.
+
+    """
+    df_op = df_op.reindex(columns=range(len(columns)))
+    df_op.columns = columns
+    return df_op
+
+
+def calc_op_primary(df_b_cpa_prim_eb, df_bridge_eb_source):
+    """ Calculate operator from primary sales in TNO classification to
+        sourced final demand in EB classification.
+
+    """
+    df_y_ident = get_df_ident(df_b_cpa_prim_eb.columns)
+    df_op = calc_y_eb_source(df_bridge_eb_source,
+                             calc_y_eb(df_b_cpa_prim_eb, df_y_ident))
+    return set_op_columns(df_op, df_b_cpa_prim_eb.columns)
+
+
+def calc_op_cbs_circular(df_b_cpa_circ_sbi):
+    """ Calculate operator from circularity activities in TNO classification
+        to circularity sectors in CBS classification.
+
+        Columns are numbered by position, such that operator is used as
+        identity demand for pathways of circularity activities.
+
+    """
+    df_y_ident = get_df_ident(df_b_cpa_circ_sbi.columns)
+    return df_b_cpa_circ_sbi.dot(df_y_ident)
+
+
+def calc_op_circular_domestic(df_op_cbs_circular,
+                              df_io_cbs_2010_circular_a,
+                              df_bridge_sbi_eb,
+                              df_bridge_eb_source_nl):
+    """ Calculate operator from circularity activities in TNO classification
+        to domestic production recipe in sourced EB classification.
+
+    """
+    df_op_eb_circular_a = df_bridge_sbi_eb.dot(
+        df_io_cbs_2010_circular_a.dot(df_op_cbs_circular))
+    return calc_y_eb_source(df_bridge_eb_source_nl, df_op_eb_circular_a)
+
+
+@ut.trace
+def calc_dict_op(dict_model):
+    """ Precompose bridges into operators from final demand in TNO
+        classification to sourced final demand in EB classification.
+
+        Each pathway is obtained by passing identity demand through
+        the same chain of functions used for demand of measures. Since all
+        chains are linear, evaluating demand reduces to one matrix product
+        per pathway.
+
+        Imports and margins of repair sectors put demand on one fixed
+        recipe, scaled per measure. These pathways are kept as sparse
+        injections, such that their total output or footprint is a rank-1
+        update.
+
+        Parameters:
+        -----------
+        dict_model: dictionary with invariants of the model.
+
+        Returns:
+        --------
+        dict_op: dictionary with operators, with TNO classification as
+        columns. Operators 'primary' and 'domestic' give sourced final
+        demand. Dictionary 'inject' has per import and margin pathway the
+        sparse final demand 'y' per unit amount, 'y_base' of baseline, and
+        operator 'amount' giving amount per measure. Operators 'cbs_va'
+        and 'cbs_emp' give direct value added and employment of repair
+        sectors.
+
+    """
+    ut.log('Precomposing bridges into operators per pathway.')
+    df_b_cpa_circ_sbi = dict_model['b_cpa_circ_sbi']
+
+    dict_op = {}
+    dict_op['primary'] = calc_op_primary(dict_model['b_cpa_prim_eb'],
+                                         dict_model['bridge_eb_source_all'])
+
+    df_op_cbs_circular = calc_op_cbs_circular(df_b_cpa_circ_sbi)
+
+    dict_op['domestic'] = set_op_columns(
+        calc_op_circular_domestic(df_op_cbs_circular,
+                                  dict_model['io_cbs_2010_circular_a'],
+                                  dict_model['bridge_sbi_eb'],
+                                  dict_model['bridge_eb_source_nl']),
+        df_b_cpa_circ_sbi.columns)
+
+    # Calculate imports and margins of both repair sectors at once.
+    df_op_cbs_circular_import = calc_y_cbs_circular_rep(
+        dict_model['io_cbs_2010_circular_import_coeff'],
+        df_op_cbs_circular)
+    df_op_cbs_circular_margin = calc_y_cbs_circular_rep(
+        dict_model['io_cbs_2010_circular_margin_coeff'],
+        df_op_cbs_circular)
+
+    # Imports of machinery repairs follow recipe of consumer repairs,
+    # as in original delta calculation. Baseline imports of machinery
+    # repairs follow their own recipe.
+    sr_y_import = get_sr_y_import(dict_model['eb_ca_nl_rep_cons_reg_import'])
+    sr_y_import_mach = get_sr_y_import(
+        dict_model['eb_ca_nl_rep_mach_reg_import'])
+    sr_y_margin = get_sr_y_margin()
+    dict_tup_inject = {
+        'import_cons': (sr_y_import, sr_y_import, df_op_cbs_circular_import,
+                        cfg.TUP_CBS_REP_CONS),
+        'import_mach': (sr_y_import, sr_y_import_mach,
+                        df_op_cbs_circular_import, cfg.TUP_CBS_REP_MACH),
+        'margin_cons': (sr_y_margin, sr_y_margin, df_op_cbs_circular_margin,
+                        cfg.TUP_CBS_REP_CONS),
+        'margin_mach': (sr_y_margin, sr_y_margin, df_op_cbs_circular_margin,
+                        cfg.TUP_CBS_REP_MACH)}
+
+    dict_op['inject'] = {}
+    for pathway in dict_tup_inject:
+        (sr_y_inject,
+         sr_y_inject_base,
+         df_op_cbs_rep,
+         tup_cbs_rep) = dict_tup_inject[pathway]
+        dict_inject = {}
+        dict_inject['y'] = sr_y_inject
+        dict_inject['y_base'] = sr_y_inject_base
+        dict_inject['amount'] = set_op_columns(
+            df_op_cbs_rep.loc[[tup_cbs_rep]],
+            df_b_cpa_circ_sbi.columns)
+        dict_op['inject'][pathway] = dict_inject
+
+    dict_op['cbs_va'] = set_op_columns(
+        dict_model['io_cbs_2010_circular_va_coeff'].dot(df_op_cbs_circular),
+        df_b_cpa_circ_sbi.columns)
+    dict_op['cbs_emp'] = set_op_columns(
+        dict_model['cbs_emp_2010_coeff'].dot(df_op_cbs_circular),
+        df_b_cpa_circ_sbi.columns)
+    return dict_op
+
+
+def get_sr_y_inject(dict_inject, variant):
+    """ Get final demand per unit amount of import or margin pathway of
+        variant. Baseline uses recipe 'y_base', delta and scenarios use
+        recipe 'y'.
+
+    """
+    if variant == 'base':
+        return dict_inject['y_base']
+    return dict_inject['y']
+
+
+def get_list_tup_y_inject(dict_op, df_y_tno_circular, variant='delta'):
+    """ Get final demand per unit amount and amount per measure of import
+        and margin pathways, for circularity activities in TNO
+        classification.
+
+    """
+    list_tup_y_inject = []
+    for pathway in dict_op['inject']:
+        dict_inject = dict_op['inject'][pathway]
+        sr_amount = apply_op(dict_inject['amount'], df_y_tno_circular).iloc[0]
+        list_tup_y_inject.append((get_sr_y_inject(dict_inject, variant),
+                                  sr_amount))
+    return list_tup_y_inject
+
+
+def apply_op(df_op, df_y):
+    """ Apply operator to final demand.
+
+        Parameters:
+        -----------
+        df_op: DataFrame with operator, as returned by calc_dict_op.
+        df_y: DataFrame with final demand per measure, indexed by columns
+        of operator. Missing rows are taken as zero.
+
+        Returns:
+        --------
+        df_y_op: DataFrame with operator applied to each measure.
+
+    """
+    index_unknown = df_y.index.difference(df_op.columns)
+    if len(index_unknown):
+        raise ValueError('Final demand not covered by operator: {}'.format(
+            list(index_unknown)))
+    array_y = df_y.reindex(df_op.columns, fill_value=0).values
+    df_y_op = pd.DataFrame(df_op.values.dot(array_y),
+                           index=df_op.index,
+                           columns=df_y.columns)
+    return df_y_op
+
+
+@ut.trace
+def calc_x_eb(dict_io_eb_2010, df_y_eb_source, list_tup_y_inject=None):
     """ Calculate total demand changes matrix in EXIOBASE classification.
 
+        Parameters:
+        -----------
+        dict_io_eb_2010: dictionary with processed EXIOBASE.
+        df_y_eb_source: DataFrame with sourced final demand per measure.
+        list_tup_y_inject: list with tuples of sparse final demand per unit
+        amount and amount per measure, added as rank-1 updates.
+
     """
     ut.log(('Calculate total demand changes matrix in EXIOBASE '
             'classification.'))
 
-    df_x_eb = dict_io_eb_2010['cL'].dot(df_y_eb_source)
+    df_x_eb = lt.calc_x(lt.get_lu(dict_io_eb_2010), df_y_eb_source)
+
+    if list_tup_y_inject:
+        for sr_y_inject, sr_amount in list_tup_y_inject:
+            sr_x_inject = get_x_inject(dict_io_eb_2010, sr_y_inject)
+            df_x_eb += np.outer(sr_x_inject.values,
+                                sr_amount.reindex(df_x_eb.columns).values)
 
     return df_x_eb
 
 
+def get_df_reg_ind(index):
+    """ Get indicator matrix of regions for index in EB classification.
+
+        Parameters:
+        -----------
+        index: MultiIndex with countries on first level.
+
+        Returns:
+        --------
+        df_reg_ind: DataFrame with 1 if country of row is in region of
+        column, else 0.
+
+    """
+    index_cntr = index.get_level_values(0)
+    df_reg_ind = pd.DataFrame(index=index)
+    for tup_reg in cfg.LIST_TUP_REG:
+        (reg, list_cntr) = tup_reg
+        df_reg_ind[reg] = index_cntr.isin(list_cntr).astype(float)
+    return df_reg_ind
+
+
+@ut.trace
 def get_dict_x_eb_source_diag_reg(df_x_delta_eb_source):
     """ Diagonalize final demand of regions in EB classification.
+        Equivalent to aggregating the diagonalized total output over the
+        countries of each region, without building the diagonal matrix.
 
     """
 
+    df_reg_ind = get_df_reg_ind(df_x_delta_eb_source.index)
+
     dict_x_eb_source_diag_reg = {}
     for col in df_x_delta_eb_source.columns:
-        df_x_delta_eb_source_col = df_x_delta_eb_source[col]
-        ar_x_delta_eb_source_col_diag = np.diag(df_x_delta_eb_source_col)
-        df_x_delta_eb_source_col_diag = pd.DataFrame(
-            ar_x_delta_eb_source_col_diag,
-            index=df_x_delta_eb_source_col.index,
-            columns=df_x_delta_eb_source_col.index)
-        df_x_delta_eb_source_col_diag_cntr = (
-            df_x_delta_eb_source_col_diag.sum(axis=1, level=0))
-        df_x_delta_eb_source_col_diag_reg = pd.DataFrame()
-        for tup_reg in cfg.LIST_TUP_REG:
-            (reg, list_cntr) = tup_reg
-            df_x_delta_eb_source_col_diag_reg[reg] = (
-                df_x_delta_eb_source_col_diag_cntr[list_cntr].sum(
-                    axis=1))
-
-        dict_x_eb_source_diag_reg[col] = df_x_delta_eb_source_col_diag_reg
+        dict_x_eb_source_diag_reg[col] = df_reg_ind.mul(
+            df_x_delta_eb_source[col], axis=0)
 
     return dict_x_eb_source_diag_reg
 
 
+def calc_qr(dict_io_eb_2010, dict_tup_fp):
+    """ Calculate footprint intensities Q.R stacked over all footprints.
+
+        Parameters:
+        -----------
+        dict_io_eb_2010: dictionary with processed version of EXIOBASE.
+        dict_tup_fp: dictionary with characterization factor rows per
+        footprint family.
+
+        Returns:
+        --------
+        df_qr: DataFrame with footprints in rows and products in columns.
+        dict_fp_index: dictionary with characterization index per footprint.
+
+    """
+    list_tup_fpm_qm_rm = [('e', 'cQe', 'cRe'),
+                          ('m', 'cQm', 'cRm'),
+                          ('r', 'cQr', 'cRr')]
+    list_df_qr = []
+    dict_fp_index = {}
+    for tup_fpm_qm_rm in list_tup_fpm_qm_rm:
+        fpm, qm, rm = tup_fpm_qm_rm
+        for fp in dict_tup_fp[fpm]:
+            q = dict_tup_fp[fpm][fp]
+            df_cq = dict_io_eb_2010[qm].loc[[q]]
+            df_cr = dict_io_eb_2010[rm]
+            df_qr = df_cq.dot(df_cr)
+            dict_fp_index[fp] = df_qr.index
+            df_qr.index = [fp]
+            list_df_qr.append(df_qr)
+    df_qr = pd.concat(list_df_qr)
+    return df_qr, dict_fp_index
+
+
+def get_qr(dict_io_eb_2010, dict_tup_fp):
+    """ Get footprint intensities Q.R.
+        Calculated on first request and kept in dict_io_eb_2010,
+        keyed on the requested footprints.
+
+    """
+    tup_key = tuple((fpm, fp, dict_tup_fp[fpm][fp])
+                    for fpm in dict_tup_fp
+                    for fp in dict_tup_fp[fpm])
+    with dict_lock['qr']:
+        dict_qr = dict_io_eb_2010.setdefault('cQR', {})
+        if tup_key not in dict_qr:
+            dict_qr[tup_key] = calc_qr(dict_io_eb_2010, dict_tup_fp)
+    return dict_qr[tup_key]
+
+
+def stack_x_eb_diag(dict_x_eb_diag):
+    """ Stack regional total output of all measures in one array.
+
+        Returns:
+        --------
+        array_x: array of product x measure x region.
+        index_x: index of products in EB classification.
+
+    """
+    list_reg = [reg for reg, list_cntr in cfg.LIST_TUP_REG]
+    list_meas_id = list(dict_x_eb_diag)
+    index_x = dict_x_eb_diag[list_meas_id[0]].index
+    array_x = np.stack([dict_x_eb_diag[meas_id][list_reg].values
+                        for meas_id in list_meas_id], axis=1)
+    return array_x, index_x
+
+
+def calc_ef_eb_cube(dict_io_eb_2010, dict_x_eb_diag, dict_tup_fp):
+    """ Calculate environmental footprints of all measures at once.
+
+        Parameters:
+        -----------
+        dict_io_eb_2010: dictionary with processed version of EXIOBASE.
+        dict_x_eb_diag: dictionary with regional total output per measure.
+        dict_tup_fp: dictionary with characterization factor rows per
+        footprint family.
+
+        Returns:
+        --------
+        dict_ef_cube: dictionary with array of footprint x measure x region,
+        and labels of each axis.
+
+    """
+    df_qr, dict_fp_index = get_qr(dict_io_eb_2010, dict_tup_fp)
+    list_meas_id = list(dict_x_eb_diag)
+
+    dict_ef_cube = {}
+    dict_ef_cube['fp'] = list(df_qr.index)
+    dict_ef_cube['fp_index'] = dict_fp_index
+    dict_ef_cube['meas_id'] = list_meas_id
+    dict_ef_cube['reg'] = [reg for reg, list_cntr in cfg.LIST_TUP_REG]
+    if not list_meas_id:
+        dict_ef_cube['array'] = np.zeros((len(df_qr), 0, len(
+            dict_ef_cube['reg'])))
+        return dict_ef_cube
+
+    array_x, index_x = stack_x_eb_diag(dict_x_eb_diag)
+    array_qr = df_qr.loc[:, index_x].values
+    dict_ef_cube['array'] = np.tensordot(array_qr, array_x, axes=1)
+    return dict_ef_cube
+
+
+@ut.trace
 def calc_ef_eb(dict_io_eb_2010, dict_x_eb_diag, dict_tup_fp):
     """ Calculate environmental footprints of total demand changes matrix
         in EXIOBASE classification.
@@ -324,24 +667,37 @@ def calc_ef_eb(dict_io_eb_2010, dict_x_eb_diag, dict_tup_fp):
     ut.log(('Calculate environmental footprints of total demand changes '
             'matrix in EXIOBASE classification.'))
 
-    dict_ef_eb = {}
+    dict_ef_cube = calc_ef_eb_cube(dict_io_eb_2010,
+                                   dict_x_eb_diag,
+                                   dict_tup_fp)
+    return get_dict_ef_eb(dict_ef_cube)
 
-    for meas_id in dict_x_eb_diag:
-        df_x_eb_diag = dict_x_eb_diag[meas_id]
 
-        list_tup_fpm_qm_rm = [('e', 'cQe', 'cRe'),
-                              ('m', 'cQm', 'cRm'),
-                              ('r', 'cQr', 'cRr')]
-        dict_ef_eb[meas_id] = {}
-        for tup_fpm_qm_rm in list_tup_fpm_qm_rm:
-            fpm, qm, rm = tup_fpm_qm_rm
-            for fp in dict_tup_fp[fpm]:
-                q = dict_tup_fp[fpm][fp]
-                df_cq = dict_io_eb_2010[qm].loc[[q]]
-                df_cr = dict_io_eb_2010[rm]
-                df_fp = df_cq.dot(df_cr.dot(df_x_eb_diag))
-                dict_ef_eb[meas_id][fp] = df_fp
+def get_dict_ef_eb(dict_ef_cube):
+    """ Arrange environmental footprints per measure and footprint.
 
+        Parameters:
+        -----------
+        dict_ef_cube: dictionary with array of footprint x measure x region,
+        and labels of each axis.
+
+        Returns:
+        --------
+        dict_ef_eb: dictionary with DataFrame of regions per measure and
+        footprint.
+
+    """
+    # Labels of regions are shared by all DataFrames.
+    index_reg = pd.Index(dict_ef_cube['reg'])
+    dict_ef_eb = {}
+    for meas_pos, meas_id in enumerate(dict_ef_cube['meas_id']):
+        dict_ef_eb[meas_id] = {}
+        for fp_pos, fp in enumerate(dict_ef_cube['fp']):
+            df_fp = pd.DataFrame(
+                dict_ef_cube['array'][fp_pos, [meas_pos]],
+                index=dict_ef_cube['fp_index'][fp],
+                columns=index_reg)
+            dict_ef_eb[meas_id][fp] = df_fp
     return dict_ef_eb
 
 
@@ -394,141 +750,756 @@ def calc_circular_prod_recipe(df_io_cbs_2010, dict_cbs_emp):
             )
 
 
-def calc_vf_eb_emp(dict_io_eb_2010, dict_x_eb_diag, dict_impact):
-    """ Calculate employment footprint of total demand changes matrix in
-        EXIOBASE classification.
+def get_cv_impact(dict_io_eb_2010, dict_impact):
+    """ Get rows of factor inputs cV of requested socio-economic impacts.
+        Sliced on first request and kept in dict_io_eb_2010,
+        keyed on the requested rows.
+
+    """
+    tup_key = tuple((fp_type, tuple(dict_impact[fp_type]))
+                    for fp_type in dict_impact)
+    with dict_lock['cv']:
+        dict_cv_impact = dict_io_eb_2010.setdefault('cV_impact', {})
+        if tup_key not in dict_cv_impact:
+            list_impact = []
+            for fp_type in dict_impact:
+                list_impact += dict_impact[fp_type]
+            dict_cv_impact[tup_key] = dict_io_eb_2010['cV'].loc[list_impact]
+    return dict_cv_impact[tup_key]
+
+
+@ut.trace
+def calc_vf_eb(dict_io_eb_2010, dict_x_eb_diag, dict_impact):
+    """ Calculate socio-economic footprints of total demand changes matrix
+        in EXIOBASE classification, for all impact types in one pass.
+
+        Parameters:
+        -----------
+        dict_io_eb_2010: dictionary with processed version of EXIOBASE.
+        dict_x_eb_diag: dictionary with regional total output per measure.
+        dict_impact: dictionary with rows of cV per impact type.
+
+        Returns:
+        --------
+        dict_vf_eb: dictionary with footprints per impact type and measure.
+
+    """
+    ut.log(('Calculate socio-economic footprints of total demand changes '
+            'matrix in EXIOBASE classification.'))
+    dict_vf_eb = {}
+    for fp_type in dict_impact:
+        dict_vf_eb[fp_type] = {}
+    if not dict_x_eb_diag:
+        return dict_vf_eb
+
+    df_cv_impact = get_cv_impact(dict_io_eb_2010, dict_impact)
+    array_x, index_x = stack_x_eb_diag(dict_x_eb_diag)
+    array_cv = df_cv_impact.loc[:, index_x].values
+    array_vf = np.tensordot(array_cv, array_x, axes=1)
+
+    return get_dict_vf_eb(array_vf,
+                          df_cv_impact.index,
+                          list(dict_x_eb_diag),
+                          dict_impact)
+
+
+def get_dict_vf_eb(array_vf, index_cv, list_meas_id, dict_impact):
+    """ Arrange socio-economic footprints per impact type and measure.
+
+        Parameters:
+        -----------
+        array_vf: array of impact x measure x region.
+        index_cv: index of impacts, grouped by impact type.
+        list_meas_id: list with measure IDs.
+        dict_impact: dictionary with rows of cV per impact type.
+
+        Returns:
+        --------
+        dict_vf_eb: dictionary with footprints per impact type and measure.
 
     """
-    ut.log(('Calculate employment footprint of total demand changes matrix in '
-            'EXIOBASE classification.'))
-    dict_vf_eb_emp = {}
+    index_reg = pd.Index([reg for reg, list_cntr in cfg.LIST_TUP_REG])
+    dict_vf_eb = {}
+    imp_start = 0
+    for fp_type in dict_impact:
+        dict_vf_eb[fp_type] = {}
+        imp_stop = imp_start+len(dict_impact[fp_type])
+        index_imp = index_cv[imp_start:imp_stop]
+        for meas_pos, meas_id in enumerate(list_meas_id):
+            dict_vf_eb[fp_type][meas_id] = pd.DataFrame(
+                array_vf[imp_start:imp_stop, meas_pos],
+                index=index_imp,
+                columns=index_reg)
+        imp_start = imp_stop
+    return dict_vf_eb
+
+
+@ut.trace
+def calc_mult(dict_io_eb_2010, dict_tup_fp, dict_impact):
+    """ Calculate regional footprint multipliers M = (F o mask)L.
+
+        Row of M for footprint or impact f and region r gives footprint of
+        unit final demand of each product, counting only output of
+        countries in r. All rows are solved at once from transposed system
+        (I-A)'M' = (F o mask)'. With power series, bound on relative error
+        is logged per footprint or impact.
+
+        Parameters:
+        -----------
+        dict_io_eb_2010: dictionary with processed version of EXIOBASE.
+        dict_tup_fp: dictionary with characterization factor rows per
+        footprint family.
+        dict_impact: dictionary with rows of cV per impact type.
+
+        Returns:
+        --------
+        dict_mult: dictionary with array of footprint x region x product,
+        and labels of each axis.
 
-    for meas_id in dict_x_eb_diag:
-        df_x_eb_diag = dict_x_eb_diag[meas_id]
+    """
+    ut.log('Calculating regional footprint multipliers.')
+    dict_lu = lt.get_lu(dict_io_eb_2010)
+    index_x = dict_lu['index']
+    df_qr, dict_fp_index = get_qr(dict_io_eb_2010, dict_tup_fp)
+    df_cv_impact = get_cv_impact(dict_io_eb_2010, dict_impact)
+    array_f = np.vstack([df_qr.loc[:, index_x].values,
+                         df_cv_impact.loc[:, index_x].values])
+    array_reg_ind = get_df_reg_ind(index_x).values
+
+    n_f, n_x = array_f.shape
+    n_reg = array_reg_ind.shape[1]
+    array_f_reg = (array_f[:, np.newaxis, :] *
+                   array_reg_ind.T[np.newaxis, :, :]).reshape(n_f*n_reg, n_x)
+    if dict_lu['method'] == 'series':
+        array_mult, n_tier, array_err = lt.solve_series(dict_lu,
+                                                        array_f_reg.T,
+                                                        trans=True)
+        array_mult = array_mult.T
+        list_fp = list(df_qr.index)+list(df_cv_impact.index)
+        array_err = array_err.reshape(n_f, n_reg).max(axis=1)
+        for fp, err in zip(list_fp, array_err):
+            ut.log('Calculated multipliers with power series.',
+                   indicator=fp,
+                   n_tier=n_tier,
+                   err=err)
+    else:
+        array_mult = lt.solve(dict_lu, array_f_reg.T, trans=True).T
+
+    dict_mult = {}
+    dict_mult['array'] = array_mult.reshape(n_f, n_reg, n_x)
+    dict_mult['fp'] = list(df_qr.index)
+    dict_mult['fp_index'] = dict_fp_index
+    dict_mult['cv_index'] = df_cv_impact.index
+    dict_mult['reg'] = [reg for reg, list_cntr in cfg.LIST_TUP_REG]
+    dict_mult['columns'] = dict_lu['columns']
+    return dict_mult
+
+
+def get_mult_key(dict_tup_fp, dict_impact):
+    """ Get key of regional footprint multipliers.
+
+    """
+    str_mult = repr((dict_tup_fp, dict_impact, cfg.LIST_TUP_REG))
+    return ut.get_hash([], '{} {}{}'.format(cfg.EB_MULT_STORE_VERSION,
+                                            str_mult,
+                                            lt.get_series_key()))
+
+
+def get_mult_dir_path(dict_io_eb_2010, mult_key):
+    """ Get directory of persisted multipliers, or None without store of
+        processed EXIOBASE.
+
+    """
+    if 'proc_dir_path' not in dict_io_eb_2010:
+        return None
+    return (dict_io_eb_2010['proc_dir_path'] +
+            cfg.EB_MULT_DIR_NAME+mult_key+'/')
 
-        df_vf_eb = dict_io_eb_2010['cV'].dot(df_x_eb_diag)
 
-        df_vf_eb_emp = df_vf_eb.loc[dict_impact['job']]
-        dict_vf_eb_emp[meas_id] = df_vf_eb_emp
-    return dict_vf_eb_emp
+def get_mult(dict_io_eb_2010, dict_tup_fp, dict_impact):
+    """ Get regional footprint multipliers.
+        Kept in dict_io_eb_2010, keyed on requested footprints, impacts,
+        and regions. Persisted next to store of processed EXIOBASE, such
+        that they are computed once per EXIOBASE version.
 
+    """
+    mult_key = get_mult_key(dict_tup_fp, dict_impact)
+    # Baseline and delta may ask for same multipliers concurrently.
+    with dict_lock['mult']:
+        dict_mult_key = dict_io_eb_2010.setdefault('cM', {})
+        if mult_key in dict_mult_key:
+            return dict_mult_key[mult_key]
+
+        dict_mult = None
+        mult_dir_path = get_mult_dir_path(dict_io_eb_2010, mult_key)
+        if mult_dir_path:
+            dict_mult = eb.load_mult(mult_dir_path)
+        if dict_mult is None:
+            dict_mult = calc_mult(dict_io_eb_2010, dict_tup_fp, dict_impact)
+            if mult_dir_path and cfg.SAVE_EB:
+                eb.save_mult(dict_mult, mult_dir_path)
+        dict_mult_key[mult_key] = dict_mult
+    return dict_mult
+
+
+def get_result_key(dict_model, calc_tno):
+    """ Get key of cached results of calc_tno.
+        Hash of invariants of model, regions, and code of calculation:
+        this module, module of calc_tno, read module with selection of final
+        demand per activity, and cfg. Processed EXIOBASE, and code of
+        exiobase and leontief, are keyed by its store, see
+        get_result_dir_path.
 
-def calc_vf_eb_va(dict_io_eb_2010, dict_x_eb_diag, dict_impact):
-    """ Calculate va footprint of total demand changes matrix in
-        EXIOBASE classification.
+    """
+    dict_model_inv = {}
+    for key in dict_model:
+        if key != 'io_eb_2010_proc':
+            dict_model_inv[key] = dict_model[key]
+    dir_path = os.path.dirname(os.path.abspath(__file__))
+    list_file_path = [os.path.abspath(__file__),
+                      os.path.abspath(inspect.getsourcefile(calc_tno)),
+                      os.path.join(dir_path, 'circular_measures_read.py'),
+                      os.path.abspath(cfg.__file__)]
+    str_code_version = '{} {} {}{}'.format(cfg.EB_RESULT_STORE_VERSION,
+                                           calc_tno.__name__,
+                                           cfg.LIST_TUP_REG,
+                                           lt.get_series_key())
+    return ut.get_hash_obj([dict_model_inv],
+                           ut.get_hash(list_file_path, str_code_version))
+
+
+def get_io_key(dict_io_eb_2010):
+    """ Get key of processed EXIOBASE: name of its store, or hash of raw
+        EXIOBASE without store.
 
     """
-    ut.log(('Calculate va footprint of total demand changes matrix in '
-            'EXIOBASE classification.'))
-    dict_vf_eb_va = {}
+    if 'proc_dir_path' in dict_io_eb_2010:
+        return os.path.basename(
+            os.path.normpath(dict_io_eb_2010['proc_dir_path']))
+    return eb.get_proc_key()
 
-    for meas_id in dict_x_eb_diag:
-        df_x_eb_diag = dict_x_eb_diag[meas_id]
-        df_vf_eb = dict_io_eb_2010['cV'].dot(
-            df_x_eb_diag)
 
-        df_vf_eb_va = df_vf_eb.loc[dict_impact['va']]
-        dict_vf_eb_va[meas_id] = df_vf_eb_va
-    return dict_vf_eb_va
+def get_result_dir_path(dict_model, result_key):
+    """ Get directory of cached results, or None without store of processed
+        EXIOBASE.
 
+    """
+    dict_io_eb_2010 = dict_model['io_eb_2010_proc']
+    if 'proc_dir_path' not in dict_io_eb_2010:
+        return None
+    return (dict_io_eb_2010['proc_dir_path'] +
+            cfg.EB_RESULT_DIR_NAME+result_key+'/')
 
-def calc_base(dict_io_eb_2010_proc,
-              df_y_base_eb_source,
-              dict_tup_fp,
-              dict_impact):
-    """ Calculate baseline.
+
+def get_meas_key(sr_y_tno):
+    """ Get key of cached results of measure, from its final demand in TNO
+        classification. Measure ID is not part of key. Variant is, if
+        measure is labelled by variant and measure ID.
 
     """
+    if isinstance(sr_y_tno.name, tuple):
+        return ut.get_hash_obj([sr_y_tno], str(sr_y_tno.name[0]))
+    return ut.get_hash_obj([sr_y_tno])
 
-    # Calculate total demand.
-    df_x_base_eb_source = calc_x_eb(dict_io_eb_2010_proc,
-                                    df_y_base_eb_source)
 
-    # Diagonalize total demand and aggregate over regions.
-    dict_x_base_eb_source_diag_reg = get_dict_x_eb_source_diag_reg(
-        df_x_base_eb_source)
+def split_result(dict_result, meas_id):
+    """ Split results of one measure from results of all measures.
+        Footprints are kept per measure in dictionaries, other results
+        have measures as columns.
 
-    # Calculate baseline environmental footprints.
-    dict_ef_eb_base = calc_ef_eb(dict_io_eb_2010_proc,
-                                 dict_x_base_eb_source_diag_reg,
-                                 dict_tup_fp)
+    """
+    dict_result_meas = {}
+    for key in dict_result:
+        dict_result_meas[key] = dict_result[key][meas_id]
+    return dict_result_meas
 
-    # Calculate baseline employment.
-    dict_vf_eb_base_emp = calc_vf_eb_emp(dict_io_eb_2010_proc,
-                                         dict_x_base_eb_source_diag_reg,
-                                         dict_impact)
 
-    # Calculate baseline va
-    dict_vf_eb_base_va = calc_vf_eb_va(dict_io_eb_2010_proc,
-                                       dict_x_base_eb_source_diag_reg,
-                                       dict_impact)
+def merge_result(dict_meas_result, list_meas_id):
+    """ Merge results per measure, inverse of split_result.
+
+    """
+    dict_result = {}
+    for key in dict_meas_result[list_meas_id[0]]:
+        list_result = [dict_meas_result[meas_id][key]
+                       for meas_id in list_meas_id]
+        if isinstance(list_result[0], pd.Series):
+            dict_result[key] = pd.concat(list_result,
+                                         axis=1,
+                                         keys=list_meas_id)
+        else:
+            dict_result[key] = dict(zip(list_meas_id, list_result))
+    return dict_result
+
+
+@ut.trace
+def calc_fp_mult(dict_io_eb_2010,
+                 df_y_eb_source,
+                 dict_tup_fp,
+                 dict_impact,
+                 list_tup_y_inject=None):
+    """ Calculate footprints of final demand with regional multipliers.
+
+        Parameters:
+        -----------
+        dict_io_eb_2010: dictionary with processed version of EXIOBASE.
+        df_y_eb_source: DataFrame with sourced final demand per measure.
+        dict_tup_fp: dictionary with characterization factor rows per
+        footprint family.
+        dict_impact: dictionary with rows of cV per impact type.
+        list_tup_y_inject: list with tuples of sparse final demand per unit
+        amount and amount per measure, added as rank-1 updates.
+
+        Returns:
+        --------
+        dict_ef_eb: dictionary with environmental footprints.
+        dict_vf_eb: dictionary with socio-economic footprints.
+
+    """
+    list_meas_id = list(df_y_eb_source.columns)
+    ut.log('Calculate footprints with regional multipliers.',
+           n_meas=len(list_meas_id))
+    dict_mult = get_mult(dict_io_eb_2010, dict_tup_fp, dict_impact)
+    array_mult = dict_mult['array']
+
+    array_y = np.asarray(df_y_eb_source.loc[dict_mult['columns']].values,
+                         dtype=float)
+    array_fp = np.tensordot(array_mult, array_y, axes=1)
+    if list_tup_y_inject:
+        for sr_y_inject, sr_amount in list_tup_y_inject:
+            array_pos = dict_mult['columns'].get_indexer(sr_y_inject.index)
+            if (array_pos < 0).any():
+                raise KeyError('Final demand not in EXIOBASE: {}'.format(
+                    list(sr_y_inject.index[array_pos < 0])))
+            array_fp_inject = array_mult[:, :, array_pos].dot(
+                sr_y_inject.values)
+            array_fp += np.multiply.outer(
+                array_fp_inject,
+                sr_amount.reindex(list_meas_id).values)
+
+    return get_dict_fp_eb(array_fp, dict_mult, list_meas_id, dict_impact)
+
+
+def get_dict_fp_eb(array_fp, dict_mult, list_meas_id, dict_impact):
+    """ Arrange footprints of multipliers per footprint and measure.
+
+        Parameters:
+        -----------
+        array_fp: array of footprint x region x measure, with rows of
+        footprints followed by rows of impacts.
+        dict_mult: dictionary with labels of multipliers.
+        list_meas_id: list with measure IDs.
+        dict_impact: dictionary with rows of cV per impact type.
+
+        Returns:
+        --------
+        dict_ef_eb: dictionary with environmental footprints.
+        dict_vf_eb: dictionary with socio-economic footprints.
+
+    """
+    # Footprint x region x measure to footprint x measure x region.
+    array_fp = array_fp.transpose(0, 2, 1)
+    n_ef = len(dict_mult['fp_index'])
+
+    dict_ef_cube = {}
+    dict_ef_cube['fp'] = list(dict_mult['fp_index'])
+    dict_ef_cube['fp_index'] = dict_mult['fp_index']
+    dict_ef_cube['meas_id'] = list_meas_id
+    dict_ef_cube['reg'] = dict_mult['reg']
+    dict_ef_cube['array'] = array_fp[:n_ef]
+    dict_ef_eb = get_dict_ef_eb(dict_ef_cube)
+
+    dict_vf_eb = get_dict_vf_eb(array_fp[n_ef:],
+                                dict_mult['cv_index'],
+                                list_meas_id,
+                                dict_impact)
+    return dict_ef_eb, dict_vf_eb
+
+
+@ut.trace
+def calc_base(dict_io_eb_2010_proc,
+              df_y_base_eb_source,
+              dict_tup_fp,
+              dict_impact,
+              list_tup_y_inject=None):
+    """ Calculate baseline.
 
-    return dict_ef_eb_base, dict_vf_eb_base_emp, dict_vf_eb_base_va
+    """
+    return calc_fp_exec(dict_io_eb_2010_proc,
+                        df_y_base_eb_source,
+                        dict_tup_fp,
+                        dict_impact,
+                        list_tup_y_inject)
 
 
+@ut.trace
 def calc_delta(dict_io_eb_2010_proc,
                df_y_delta_eb_source,
                dict_tup_fp,
-               dict_impact):
+               dict_impact,
+               list_tup_y_inject=None):
     """ Calculate delta.
 
     """
+    return calc_fp_exec(dict_io_eb_2010_proc,
+                        df_y_delta_eb_source,
+                        dict_tup_fp,
+                        dict_impact,
+                        list_tup_y_inject)
+
+
+def calc_fp(dict_io_eb_2010_proc,
+            df_y_eb_source,
+            dict_tup_fp,
+            dict_impact,
+            list_tup_y_inject=None):
+    """ Calculate environmental footprints, and employment and va, of
+        sourced final demand per measure.
+
+        Returns:
+        --------
+        dict_ef_eb: dictionary with environmental footprints.
+        dict_vf_eb_emp: dictionary with employment footprints.
+        dict_vf_eb_va: dictionary with va footprints.
+
+    """
+    # Evaluate footprints with regional multipliers, if enabled.
+    if cfg.FP_MULT:
+        dict_ef_eb, dict_vf_eb = calc_fp_mult(dict_io_eb_2010_proc,
+                                              df_y_eb_source,
+                                              dict_tup_fp,
+                                              dict_impact,
+                                              list_tup_y_inject)
+        return dict_ef_eb, dict_vf_eb['job'], dict_vf_eb['va']
 
-    # Calculate delta total demand.
-    df_x_delta_eb_source = calc_x_eb(dict_io_eb_2010_proc,
-                                     df_y_delta_eb_source)
+    # Calculate total demand.
+    df_x_eb_source = calc_x_eb(dict_io_eb_2010_proc,
+                               df_y_eb_source,
+                               list_tup_y_inject)
+    return calc_fp_x(dict_io_eb_2010_proc,
+                     df_x_eb_source,
+                     dict_tup_fp,
+                     dict_impact)
+
+
+@ut.trace
+def calc_fp_x(dict_io_eb_2010_proc,
+              df_x_eb_source,
+              dict_tup_fp,
+              dict_impact):
+    """ Calculate footprints of total demand per measure.
 
+    """
     # Diagonalize total demand and aggregate over regions.
-    dict_x_delta_eb_source_diag_reg = get_dict_x_eb_source_diag_reg(
-        df_x_delta_eb_source)
+    dict_x_eb_source_diag_reg = get_dict_x_eb_source_diag_reg(
+        df_x_eb_source)
+
+    # Calculate environmental footprints.
+    dict_ef_eb = calc_ef_eb(dict_io_eb_2010_proc,
+                            dict_x_eb_source_diag_reg,
+                            dict_tup_fp)
+
+    # Calculate employment and va in one pass.
+    dict_vf_eb = calc_vf_eb(dict_io_eb_2010_proc,
+                            dict_x_eb_source_diag_reg,
+                            dict_impact)
+    return dict_ef_eb, dict_vf_eb['job'], dict_vf_eb['va']
+
 
-    # Calculate delta environmental footprints.
-    dict_ef_eb_delta = calc_ef_eb(dict_io_eb_2010_proc,
-                                  dict_x_delta_eb_source_diag_reg,
-                                  dict_tup_fp)
+def init_worker(proc_dir_path, queue_log, time_start, dict_mult_key):
+    """ Load processed EXIOBASE memory-mapped in worker process.
+        Pages of arrays are shared with other processes on one host,
+        instead of pickling matrices to each worker. Regional multipliers
+        of parent process are passed in, since they are only persisted
+        with SAVE_EB. Log records are sent to log of run in parent process.
+
+    """
+    ut.init_log_worker(queue_log, time_start)
+    for lock_name in dict_lock:
+        dict_lock[lock_name] = threading.Lock()
+    lt.dict_lock['lu'] = threading.Lock()
+    dict_io_eb_2010_proc = eb.load_proc(proc_dir_path)
+    dict_io_eb_2010_proc['proc_dir_path'] = proc_dir_path
+    dict_io_eb_2010_proc['cM'] = dict(dict_mult_key)
+    dict_worker['io_eb_2010_proc'] = dict_io_eb_2010_proc
 
-    # Calculate delta employment.
-    dict_vf_eb_delta_emp = calc_vf_eb_emp(dict_io_eb_2010_proc,
-                                          dict_x_delta_eb_source_diag_reg,
-                                          dict_impact)
 
-    # Calculate delta va
-    dict_vf_eb_delta_va = calc_vf_eb_va(dict_io_eb_2010_proc,
-                                        dict_x_delta_eb_source_diag_reg,
-                                        dict_impact)
+def calc_fp_worker(func, *args):
+    """ Call footprint function with processed EXIOBASE of worker process.
 
-    return dict_ef_eb_delta, dict_vf_eb_delta_emp, dict_vf_eb_delta_va
+    """
+    return func(dict_worker['io_eb_2010_proc'], *args)
 
 
-def calc_ef_net(dict_fp_eb_prim, dict_fp_eb_circ):
-    """ Calculate net changes in EF.
+def get_list_meas_shard(list_meas_id, n_shard):
+    """ Split measures in contiguous shards of about equal size.
 
     """
+    n_meas = len(list_meas_id)
+    list_meas_shard = []
+    for shard_pos in range(n_shard):
+        meas_start = shard_pos*n_meas//n_shard
+        meas_stop = (shard_pos+1)*n_meas//n_shard
+        if meas_stop > meas_start:
+            list_meas_shard.append(list_meas_id[meas_start:meas_stop])
+    return list_meas_shard
+
+
+def get_executor(dict_io_eb_2010_proc, n_worker):
+    """ Get executor of CALC_EXECUTOR, and boolean for process workers.
+        Process workers map store of processed EXIOBASE, and receive
+        multipliers computed so far. Without store, threads are used
+        instead.
 
-    dict_fp_eb_net = {}
-    for meas_id in dict_fp_eb_prim:
-        dict_fp_eb_net[meas_id] = {}
-        for fp in dict_fp_eb_prim[meas_id]:
-            df_fp_prim = dict_fp_eb_prim[meas_id][fp]
-            df_fp_circ = dict_fp_eb_circ[meas_id][fp]
-            df_fp_net = df_fp_prim+df_fp_circ
-            dict_fp_eb_net[meas_id][fp] = df_fp_net
-    return dict_fp_eb_net
+    """
+    if cfg.CALC_EXECUTOR == 'process':
+        if 'proc_dir_path' in dict_io_eb_2010_proc:
+            return cf.ProcessPoolExecutor(
+                max_workers=n_worker,
+                initializer=init_worker,
+                initargs=(dict_io_eb_2010_proc['proc_dir_path'],
+                          ut.get_log_queue(),
+                          ut.dict_log['time_start'],
+                          dict_io_eb_2010_proc.get('cM', {}))), True
+        ut.log('No store of processed EXIOBASE to map in processes, '
+               'using threads.')
+    elif cfg.CALC_EXECUTOR != 'thread':
+        raise ValueError('Unknown executor: {}'.format(cfg.CALC_EXECUTOR))
+    return cf.ThreadPoolExecutor(max_workers=n_worker), False
+
+
+def calc_fp_exec(dict_io_eb_2010_proc,
+                 df_y_eb_source,
+                 dict_tup_fp,
+                 dict_impact,
+                 list_tup_y_inject=None):
+    """ Calculate footprints per measure with executor of CALC_EXECUTOR.
+
+        Measures are sharded over CALC_N_WORKER workers, and results are
+        merged in order of measures. With multipliers, shards of final
+        demand are evaluated by workers. Otherwise, total demand of all
+        measures is solved at once, and shards of total demand are
+        evaluated by workers.
+
+        Returns:
+        --------
+        dict_ef_eb: dictionary with environmental footprints.
+        dict_vf_eb_emp: dictionary with employment footprints.
+        dict_vf_eb_va: dictionary with va footprints.
 
+    """
+    list_meas_id = list(df_y_eb_source.columns)
+    n_worker = cfg.CALC_N_WORKER or os.cpu_count()
+    n_shard = min(n_worker, len(list_meas_id))
+    if cfg.CALC_EXECUTOR == 'serial' or n_shard < 2:
+        return calc_fp(dict_io_eb_2010_proc,
+                       df_y_eb_source,
+                       dict_tup_fp,
+                       dict_impact,
+                       list_tup_y_inject)
+
+    # Shared parts are computed once, before workers start.
+    if cfg.FP_MULT:
+        get_mult(dict_io_eb_2010_proc, dict_tup_fp, dict_impact)
+        func = calc_fp_mult
+        df_eb_source = df_y_eb_source
+        list_arg = [dict_tup_fp, dict_impact, list_tup_y_inject]
+    else:
+        func = calc_fp_x
+        df_eb_source = calc_x_eb(dict_io_eb_2010_proc,
+                                 df_y_eb_source,
+                                 list_tup_y_inject)
+        list_arg = [dict_tup_fp, dict_impact]
+
+    ut.log('Evaluating {} measures in {} shards with {} executor.'.format(
+        len(list_meas_id), n_shard, cfg.CALC_EXECUTOR),
+           n_meas=len(list_meas_id))
+    executor, bool_process = get_executor(dict_io_eb_2010_proc, n_shard)
+    with executor:
+        list_future = []
+        for list_meas_shard in get_list_meas_shard(list_meas_id, n_shard):
+            df_eb_source_shard = df_eb_source[list_meas_shard]
+            if bool_process:
+                future = executor.submit(calc_fp_worker,
+                                         func,
+                                         df_eb_source_shard,
+                                         *list_arg)
+            else:
+                future = executor.submit(func,
+                                         dict_io_eb_2010_proc,
+                                         df_eb_source_shard,
+                                         *list_arg)
+            list_future.append(future)
+
+        # Merge results of shards in order of measures.
+        dict_ef_eb = {}
+        dict_vf_eb_emp = {}
+        dict_vf_eb_va = {}
+        for future in list_future:
+            tup_fp_shard = future.result()
+            if cfg.FP_MULT:
+                dict_ef_eb_shard, dict_vf_eb_shard = tup_fp_shard
+                tup_fp_shard = (dict_ef_eb_shard,
+                                dict_vf_eb_shard['job'],
+                                dict_vf_eb_shard['va'])
+            dict_ef_eb.update(tup_fp_shard[0])
+            dict_vf_eb_emp.update(tup_fp_shard[1])
+            dict_vf_eb_va.update(tup_fp_shard[2])
+    return dict_ef_eb, dict_vf_eb_emp, dict_vf_eb_va
+
+
+def calc_fp_array(dict_io_eb_2010, df_y_eb_source, dict_tup_fp, dict_impact):
+    """ Calculate footprints and impacts of all columns of sourced final
+        demand at once.
+
+        Returns:
+        --------
+        array_fp: array of footprint x region x column, with rows of
+        footprints followed by rows of impacts.
+        dict_label: dictionary with labels of rows and regions, as of
+        multipliers, see get_dict_fp_eb.
 
-def calc_vf_net(dict_fp_eb_prim, dict_fp_eb_circ):
-    """ Calculate net changes in VF.
+    """
+    if cfg.FP_MULT:
+        dict_mult = get_mult(dict_io_eb_2010, dict_tup_fp, dict_impact)
+        array_y = np.asarray(df_y_eb_source.loc[dict_mult['columns']].values,
+                             dtype=float)
+        return np.tensordot(dict_mult['array'], array_y, axes=1), dict_mult
+
+    df_x_eb_source = calc_x_eb(dict_io_eb_2010, df_y_eb_source)
+    dict_x_eb_source_diag_reg = get_dict_x_eb_source_diag_reg(
+        df_x_eb_source)
+    dict_ef_cube = calc_ef_eb_cube(dict_io_eb_2010,
+                                   dict_x_eb_source_diag_reg,
+                                   dict_tup_fp)
+    df_cv_impact = get_cv_impact(dict_io_eb_2010, dict_impact)
+    array_x, index_x = stack_x_eb_diag(dict_x_eb_source_diag_reg)
+    array_vf = np.tensordot(df_cv_impact.loc[:, index_x].values,
+                            array_x,
+                            axes=1)
+
+    # Footprint x column x region to footprint x region x column.
+    array_fp = np.concatenate([dict_ef_cube['array'],
+                               array_vf]).transpose(0, 2, 1)
+    dict_label = {}
+    dict_label['fp_index'] = dict_ef_cube['fp_index']
+    dict_label['cv_index'] = df_cv_impact.index
+    dict_label['reg'] = dict_ef_cube['reg']
+    return array_fp, dict_label
+
+
+@ut.trace
+def calc_fp_block(dict_io_eb_2010,
+                  dict_op,
+                  dict_y_tno_act,
+                  dict_tup_fp,
+                  dict_impact):
+    """ Calculate footprints of all variants and pathways in one block.
+
+        Sourced final demand of primary sales and of domestic recipe of
+        circularity activities per variant and measure, and final demand
+        per unit amount of each import and margin pathway per variant, are
+        stacked as columns of one block. The block is solved and
+        characterized once. Footprints of import and margin pathways are
+        their footprint per unit amount times amount per measure.
+
+        Parameters:
+        -----------
+        dict_io_eb_2010: dictionary with processed version of EXIOBASE.
+        dict_op: dictionary with operators, as returned by calc_dict_op.
+        dict_y_tno_act: dictionary with per variant a tuple of final demand
+        of primary sales and of circularity activities in TNO
+        classification. Baseline imports use recipe 'y_base' of operator.
+        dict_tup_fp: dictionary with characterization factor rows per
+        footprint family.
+        dict_impact: dictionary with rows of cV per impact type.
+
+        Returns:
+        --------
+        dict_fp_block: dictionary with per variant environmental footprints
+        'ef_', employment 'vf_emp_', and va 'vf_va_' of each activity and
+        each pathway in DICT_ACT_LIST_PATHWAY, e.g. 'ef_circ' and
+        'ef_domestic'. Footprints of pathways of activity sum to footprints
+        of activity.
 
     """
+    index_eb = dict_op['primary'].index
+    list_array_y = []
+    dict_slice_col = {}
+    col_start = 0
+    for variant in dict_y_tno_act:
+        df_y_tno_primary, df_y_tno_circular = dict_y_tno_act[variant]
+        list_tup_array_y = [
+            ('primary', apply_op(dict_op['primary'],
+                                 df_y_tno_primary).values),
+            ('domestic', apply_op(dict_op['domestic'],
+                                  df_y_tno_circular).loc[index_eb].values)]
+        for pathway in dict_op['inject']:
+            sr_y_inject = get_sr_y_inject(dict_op['inject'][pathway],
+                                          variant)
+            array_pos = index_eb.get_indexer(sr_y_inject.index)
+            if (array_pos < 0).any():
+                raise KeyError('Final demand not in EXIOBASE: {}'.format(
+                    list(sr_y_inject.index[array_pos < 0])))
+            array_y_inject = np.zeros((len(index_eb), 1))
+            array_y_inject[array_pos, 0] = sr_y_inject.values
+            list_tup_array_y.append((pathway, array_y_inject))
+        for pathway, array_y in list_tup_array_y:
+            col_stop = col_start+array_y.shape[1]
+            dict_slice_col[(variant, pathway)] = slice(col_start, col_stop)
+            list_array_y.append(array_y)
+            col_start = col_stop
+
+    ut.log('Calculate footprints of all variants and pathways in one block.',
+           n_col=col_start)
+    df_y_block = pd.DataFrame(np.concatenate(list_array_y, axis=1),
+                              index=index_eb)
+    array_fp, dict_label = calc_fp_array(dict_io_eb_2010,
+                                         df_y_block,
+                                         dict_tup_fp,
+                                         dict_impact)
 
-    dict_fp_eb_net = {}
-    for meas_id in dict_fp_eb_prim:
-        dict_fp_eb_net[meas_id] = {}
-        df_fp_prim = dict_fp_eb_prim[meas_id]
-        df_fp_circ = dict_fp_eb_circ[meas_id]
-        df_fp_net = df_fp_prim+df_fp_circ
-        dict_fp_eb_net[meas_id] = df_fp_net
-    return dict_fp_eb_net
+    dict_fp_block = {}
+    for variant in dict_y_tno_act:
+        df_y_tno_primary, df_y_tno_circular = dict_y_tno_act[variant]
+        list_meas_id = list(df_y_tno_circular.columns)
+
+        # Slice pathways from block. Import and margin pathways are scaled
+        # from unit amount to amount per measure.
+        dict_array_fp = {}
+        for pathway in ['primary', 'domestic']:
+            dict_array_fp[pathway] = array_fp[
+                :, :, dict_slice_col[(variant, pathway)]]
+        for pathway in dict_op['inject']:
+            sr_amount = apply_op(dict_op['inject'][pathway]['amount'],
+                                 df_y_tno_circular).iloc[0]
+            dict_array_fp[pathway] = (
+                array_fp[:, :, dict_slice_col[(variant, pathway)]] *
+                sr_amount.reindex(list_meas_id).values)
+
+        dict_fp_block[variant] = {}
+        for act in cfg.DICT_ACT_LIST_PATHWAY:
+            list_pathway = cfg.DICT_ACT_LIST_PATHWAY[act]
+            list_tup_array_fp = [(act, sum(dict_array_fp[pathway]
+                                           for pathway in list_pathway))]
+            if len(list_pathway) > 1:
+                for pathway in list_pathway:
+                    list_tup_array_fp.append((pathway,
+                                              dict_array_fp[pathway]))
+            for key, array_fp_key in list_tup_array_fp:
+                dict_ef_eb, dict_vf_eb = get_dict_fp_eb(array_fp_key,
+                                                        dict_label,
+                                                        list_meas_id,
+                                                        dict_impact)
+                dict_fp_block[variant]['ef_'+key] = dict_ef_eb
+                dict_fp_block[variant]['vf_emp_'+key] = dict_vf_eb['job']
+                dict_fp_block[variant]['vf_va_'+key] = dict_vf_eb['va']
+
+            # Single pathway of activity shares its footprints.
+            if len(list_pathway) == 1:
+                for key_fp in ['ef_', 'vf_emp_', 'vf_va_']:
+                    dict_fp_block[variant][key_fp+list_pathway[0]] = (
+                        dict_fp_block[variant][key_fp+act])
+    return dict_fp_block
 
 
 def calc_fp_nl(dict_io_eb_2010_proc, df_y_nl, dict_tup_fp, dict_impact):
@@ -538,3 +1509,724 @@ def calc_fp_nl(dict_io_eb_2010_proc, df_y_nl, dict_tup_fp, dict_impact):
                                               df_y_nl,
                                               dict_tup_fp,
                                               dict_impact)
+
+
+def get_array_fp_agg(dict_mult, dict_impact, variant='delta'):
+    """ Get matrix aggregating footprints and impacts of multipliers to
+        reported footprints, scaled to units of results of variant.
+
+        Returns:
+        --------
+        array_fp_agg: array of reported footprint x footprint or impact.
+        list_t_fp: list with name and unit per reported footprint.
+
+    """
+    if variant == 'base':
+        d_fp_tup_scalar = cfg.DICT_FP_TUP_SCALAR_BASE
+        dict_fp_type_tup_scalar = {'job': cfg.TUP_JOB_SCALAR_BASE,
+                                   'va': cfg.TUP_VA_SCALAR_BASE}
+    else:
+        d_fp_tup_scalar = cfg.DICT_FP_TUP_SCALAR_DELTA
+        dict_fp_type_tup_scalar = {'job': cfg.TUP_JOB_SCALAR_DELTA,
+                                   'va': cfg.TUP_VA_SCALAR_DELTA}
+    n_ef = len(dict_mult['fp'])
+    n_f = n_ef+len(dict_mult['cv_index'])
+    list_t_fp = []
+    list_array_row = []
+    for fp_pos, fp in enumerate(dict_mult['fp']):
+        fp_plt, t_fp_txt, fp_scalar = d_fp_tup_scalar[fp]
+        array_row = np.zeros(n_f)
+        array_row[fp_pos] = 1/fp_scalar
+        list_t_fp.append(t_fp_txt)
+        list_array_row.append(array_row)
+
+    imp_start = n_ef
+    for fp_type in dict_impact:
+        imp_stop = imp_start+len(dict_impact[fp_type])
+        fp_plt, t_fp_txt, fp_scalar = dict_fp_type_tup_scalar[fp_type]
+        array_row = np.zeros(n_f)
+        array_row[imp_start:imp_stop] = 1/fp_scalar
+        list_t_fp.append(t_fp_txt)
+        list_array_row.append(array_row)
+        imp_start = imp_stop
+    return np.array(list_array_row), list_t_fp
+
+
+def get_array_mult(dict_mult, dict_impact, bool_agg, variant='delta'):
+    """ Get regional multipliers of rows reported by calc_mult_tno.
+
+    """
+    if bool_agg:
+        array_fp_agg, list_t_fp = get_array_fp_agg(dict_mult,
+                                                   dict_impact,
+                                                   variant)
+        array_mult = np.tensordot(array_fp_agg, dict_mult['array'], axes=1)
+    else:
+        list_t_fp = dict_mult['fp']+list(dict_mult['cv_index'])
+        array_mult = np.asarray(dict_mult['array'])
+    return array_mult, list_t_fp
+
+
+def compose_mult_tno(array_mult, dict_op, columns_eb, variant='delta'):
+    """ Compose multipliers of EXIOBASE final demand with pathway operators.
+
+        Parameters:
+        -----------
+        array_mult: array with multipliers, product of EXIOBASE last.
+        dict_op: dictionary with pathway operators, as returned by
+        calc_dict_op.
+        columns_eb: index with products of EXIOBASE.
+        variant: 'base' for recipes of imports and margins of baseline,
+        else 'delta'.
+
+        Returns:
+        --------
+        array_mult_prim: array with multipliers of primary sales.
+        array_mult_circ: array with multipliers of circularity activities,
+        without direct employment and value added of repair sectors.
+
+    """
+    # Primary sales.
+    array_mult_prim = np.tensordot(
+        array_mult, dict_op['primary'].loc[columns_eb].values, axes=1)
+
+    # Circularity activities, with rank-1 imports and margins.
+    array_mult_circ = np.tensordot(
+        array_mult, dict_op['domestic'].loc[columns_eb].values, axes=1)
+    for pathway in dict_op['inject']:
+        dict_inject = dict_op['inject'][pathway]
+        sr_y_inject = get_sr_y_inject(dict_inject, variant)
+        array_pos = columns_eb.get_indexer(sr_y_inject.index)
+        array_mult_circ += np.multiply.outer(
+            array_mult[:, :, array_pos].dot(sr_y_inject.values),
+            dict_inject['amount'].values[0])
+    return array_mult_prim, array_mult_circ
+
+
+@ut.trace
+def calc_mult_tno(dict_model, bool_agg=True, variant='delta'):
+    """ Calculate regional footprint multipliers of final demand in TNO
+        classification, per activity.
+
+        Composes regional multipliers of EXIOBASE with pathway operators,
+        including import and margin injections of variant. Footprint of a
+        measure is then multiplier times its column of TNO final demand.
+        Baseline imports of machinery repairs follow their own recipe, so
+        multipliers of baseline and delta differ for circularity
+        activities.
+
+        Parameters:
+        -----------
+        dict_model: dictionary with invariants of the model.
+        bool_agg: boolean to aggregate to reported footprints in units of
+        results, including direct value added and employment of repair
+        sectors in NL. Otherwise, rows are footprints and impacts of
+        calc_delta, with labels as in its results.
+        variant: 'base' for multipliers of baseline, else 'delta'.
+
+        Returns:
+        --------
+        dict_mult_tno: dictionary with array of footprint x region x TNO
+        final demand per activity 'Prim' and 'Circ', labels of each axis,
+        and variant.
+
+    """
+    ut.log('Calculating footprint multipliers of TNO final demand.')
+    dict_impact = dict_model['impact']
+    dict_op = dict_model['op']
+    dict_mult = get_mult(dict_model['io_eb_2010_proc'],
+                         dict_model['tup_fp'],
+                         dict_impact)
+    array_mult, list_t_fp = get_array_mult(dict_mult,
+                                           dict_impact,
+                                           bool_agg,
+                                           variant)
+    array_mult_prim, array_mult_circ = compose_mult_tno(array_mult,
+                                                        dict_op,
+                                                        dict_mult['columns'],
+                                                        variant)
+
+    # Direct employment and value added of repair sectors in NL.
+    list_reg = dict_mult['reg']
+    reg_pos_nl = list_reg.index(cfg.TUP_NL[0])
+    if bool_agg:
+        list_tup_op_scalar = [('cbs_emp', cfg.TUP_JOB_SCALAR_DELTA),
+                              ('cbs_va', cfg.TUP_VA_SCALAR_DELTA)]
+        if variant == 'base':
+            list_tup_op_scalar = [('cbs_emp', cfg.TUP_JOB_SCALAR_BASE),
+                                  ('cbs_va', cfg.TUP_VA_SCALAR_BASE)]
+        for op, tup_scalar in list_tup_op_scalar:
+            fp_plt, t_fp_txt, fp_scalar = tup_scalar
+            fp_pos = list_t_fp.index(t_fp_txt)
+            array_mult_circ[fp_pos, reg_pos_nl] += (
+                dict_op[op].values.sum(axis=0)/fp_scalar)
+
+    # Put activities on common TNO classification.
+    columns_prim = dict_op['primary'].columns
+    columns_circ = dict_op['domestic'].columns
+    columns_tno = columns_prim.append(columns_circ)
+    n_prim = len(columns_prim)
+    array_shape = (len(list_t_fp), len(list_reg), len(columns_tno))
+
+    dict_mult_tno = {}
+    dict_mult_tno['fp'] = list_t_fp
+    dict_mult_tno['n_prim'] = n_prim
+    dict_mult_tno['variant'] = variant
+    if not bool_agg:
+        dict_mult_tno['fp_index'] = dict_mult['fp_index']
+        dict_mult_tno['cv_index'] = dict_mult['cv_index']
+    dict_mult_tno['reg'] = list_reg
+    dict_mult_tno['columns'] = columns_tno
+    dict_mult_tno['array'] = {}
+    dict_mult_tno['array']['Prim'] = np.zeros(array_shape)
+    dict_mult_tno['array']['Prim'][:, :, :n_prim] = array_mult_prim
+    dict_mult_tno['array']['Circ'] = np.zeros(array_shape)
+    dict_mult_tno['array']['Circ'][:, :, n_prim:] = array_mult_circ
+    return dict_mult_tno
+
+
+def get_array_y_tno(dict_mult_tno, df_y_tno):
+    """ Get final demand in TNO classification aligned to multipliers.
+
+    """
+    index_unknown = df_y_tno.index.difference(dict_mult_tno['columns'])
+    if len(index_unknown):
+        raise ValueError('Final demand not covered by multipliers: {}'.format(
+            list(index_unknown)))
+    return df_y_tno.reindex(dict_mult_tno['columns'], fill_value=0).values
+
+
+def get_dict_y_delta_tno_end(dict_bound, list_meas_id):
+    """ Get delta of final demand at low and high end of price range.
+
+        With one price draw shared by baseline and scenario, delta moves
+        linearly from scenario minus baseline at low prices to scenario
+        minus baseline at high prices.
+
+    """
+    dict_y_delta_tno_end = {}
+    for bound in ['lo', 'hi']:
+        dict_y_delta_tno_end[bound] = (
+            dict_bound['scen'][bound][list_meas_id] -
+            dict_bound['base'][bound][list_meas_id])
+    return dict_y_delta_tno_end
+
+
+@ut.trace
+def calc_fp_tno_mc(dict_mult_tno, df_y_delta_tno, dict_bound):
+    """ Calculate percentiles of delta of footprints by Monte Carlo over
+        low and high bounds of final demand in TNO classification.
+
+        Price per product is drawn uniformly between its low and high
+        bound, with one draw shared by baseline and scenario of a measure.
+        Delta of a measure is then affine in the draws. Samples are pushed
+        through TNO multipliers in chunks of MC_CHUNK_SIZE, such that
+        memory of sampled demand is bounded.
+
+        Parameters:
+        -----------
+        dict_mult_tno: dictionary with TNO multipliers, as returned by
+        calc_mult_tno.
+        df_y_delta_tno: DataFrame with central delta of final demand.
+        dict_bound: dictionary with bounds, as returned by read_y_tno.
+
+        Returns:
+        --------
+        df_fp_mc: DataFrame with central value and percentiles of net
+        delta per footprint, region, and measure. Measure 'all' sums all
+        measures per sample.
+
+    """
+    ut.log('Calculating Monte Carlo percentiles of delta of footprints.')
+    array_mult = sum(dict_mult_tno['array'].values())
+    list_meas_id = list(df_y_delta_tno.columns)
+
+    dict_y_delta_tno_end = get_dict_y_delta_tno_end(dict_bound,
+                                                    list_meas_id)
+    array_y_lo = get_array_y_tno(dict_mult_tno, dict_y_delta_tno_end['lo'])
+    array_y_width = (
+        get_array_y_tno(dict_mult_tno, dict_y_delta_tno_end['hi']) -
+        array_y_lo)
+
+    n_fp, n_reg, n_tno = array_mult.shape
+    n_meas = len(list_meas_id)
+    array_fp = np.empty((n_fp, n_reg, n_meas+1, cfg.MC_N_SAMPLE))
+    rng = np.random.default_rng(cfg.MC_SEED)
+    for sample_start in range(0, cfg.MC_N_SAMPLE, cfg.MC_CHUNK_SIZE):
+        sample_stop = min(sample_start+cfg.MC_CHUNK_SIZE, cfg.MC_N_SAMPLE)
+        n_chunk = sample_stop-sample_start
+        array_draw = rng.random((n_tno, n_meas, n_chunk))
+        array_y = (array_y_lo[:, :, np.newaxis] +
+                   array_draw*array_y_width[:, :, np.newaxis])
+        array_fp_chunk = np.tensordot(array_mult, array_y, axes=1)
+        array_fp[:, :, :n_meas, sample_start:sample_stop] = array_fp_chunk
+        array_fp[:, :, n_meas, sample_start:sample_stop] = (
+            array_fp_chunk.sum(axis=2))
+
+    array_pct = np.percentile(array_fp, cfg.MC_LIST_PCT, axis=3)
+    array_y_central = get_array_y_tno(dict_mult_tno, df_y_delta_tno)
+    array_central = np.tensordot(array_mult, array_y_central, axes=1)
+    array_central = np.concatenate(
+        [array_central, array_central.sum(axis=2, keepdims=True)], axis=2)
+
+    index_fp_mc = pd.MultiIndex.from_tuples(
+        [(fp, unit, reg, meas_id)
+         for fp, unit in dict_mult_tno['fp']
+         for reg in dict_mult_tno['reg']
+         for meas_id in list_meas_id+['all']],
+        names=['Footprint', 'Unit', 'Region', 'Measure'])
+    df_fp_mc = pd.DataFrame(index=index_fp_mc)
+    df_fp_mc['central'] = array_central.ravel()
+    for pct_pos, pct in enumerate(cfg.MC_LIST_PCT):
+        df_fp_mc['p{}'.format(pct)] = array_pct[pct_pos].ravel()
+    return df_fp_mc
+
+
+def calc_bound(array_mult, array_y_lo, array_y_hi):
+    """ Calculate exact minimum and maximum of linear map over box.
+
+        Minimum takes low demand where multiplier is positive, and high
+        demand where it is negative. Maximum vice versa.
+
+        Parameters:
+        -----------
+        array_mult: array with TNO final demand on last axis.
+        array_y_lo: array of TNO final demand x measure with low bounds.
+        array_y_hi: array of TNO final demand x measure with high bounds.
+
+        Returns:
+        --------
+        array_min, array_max: arrays with measures on last axis.
+
+    """
+    array_mult_pos = np.maximum(array_mult, 0)
+    array_mult_neg = np.minimum(array_mult, 0)
+    array_min = (np.tensordot(array_mult_pos, array_y_lo, axes=1) +
+                 np.tensordot(array_mult_neg, array_y_hi, axes=1))
+    array_max = (np.tensordot(array_mult_pos, array_y_hi, axes=1) +
+                 np.tensordot(array_mult_neg, array_y_lo, axes=1))
+    return array_min, array_max
+
+
+def check_mult_tno_variant(dict_mult_tno, variant):
+    """ Check that TNO multipliers were composed for variant.
+
+    """
+    if dict_mult_tno['variant'] != variant:
+        raise ValueError(
+            'TNO multipliers of {} used for {}, see calc_mult_tno.'.format(
+                dict_mult_tno['variant'], variant))
+
+
+def get_dict_y_delta_tno_bound(dict_mult_tno, dict_bound, list_meas_id):
+    """ Get box of delta of final demand aligned to multipliers.
+
+        Returns:
+        --------
+        dict_array_y: dictionary with arrays of low and high delta of TNO
+        final demand x measure.
+
+    """
+    dict_y_delta_tno_end = get_dict_y_delta_tno_end(dict_bound,
+                                                    list_meas_id)
+    array_y_end_lo = get_array_y_tno(dict_mult_tno,
+                                     dict_y_delta_tno_end['lo'])
+    array_y_end_hi = get_array_y_tno(dict_mult_tno,
+                                     dict_y_delta_tno_end['hi'])
+    dict_array_y = {}
+    dict_array_y['lo'] = np.minimum(array_y_end_lo, array_y_end_hi)
+    dict_array_y['hi'] = np.maximum(array_y_end_lo, array_y_end_hi)
+    return dict_array_y
+
+
+@ut.trace
+def calc_delta_bound(dict_model, dict_mult_tno_ind, df_y_delta_tno,
+                     dict_bound):
+    """ Calculate exact envelopes of delta of footprints over low and high
+        bounds of final demand in TNO classification.
+
+        Each footprint of each measure, impact and region is bounded
+        separately, by splitting multipliers by sign.
+
+        Parameters:
+        -----------
+        dict_model: dictionary with invariants of the model.
+        dict_mult_tno_ind: dictionary with TNO multipliers, as returned by
+        calc_mult_tno without aggregation.
+        df_y_delta_tno: DataFrame with central delta of final demand.
+        dict_bound: dictionary with bounds, as returned by read_y_tno.
+
+        Returns:
+        --------
+        dict_delta_bound: dictionary with 'lo' and 'hi' results, each in
+        layout of results of calc_delta_tno.
+
+    """
+    ut.log('Calculating exact envelopes of delta of footprints.')
+    check_mult_tno_variant(dict_mult_tno_ind, 'delta')
+    list_meas_id = list(df_y_delta_tno.columns)
+    dict_array_y = get_dict_y_delta_tno_bound(dict_mult_tno_ind,
+                                              dict_bound,
+                                              list_meas_id)
+    return calc_bound_ind(dict_model,
+                          dict_mult_tno_ind,
+                          dict_array_y,
+                          list_meas_id)
+
+
+def get_dict_y_base_tno_bound(dict_mult_tno, dict_bound):
+    """ Get box of baseline final demand aligned to multipliers.
+
+        Returns:
+        --------
+        dict_array_y: dictionary with arrays of low and high baseline TNO
+        final demand x measure.
+
+    """
+    dict_array_y = {}
+    for bound in ['lo', 'hi']:
+        dict_array_y[bound] = get_array_y_tno(
+            dict_mult_tno, dict_bound['base_box'][bound].fillna(0))
+    return dict_array_y
+
+
+@ut.trace
+def calc_base_bound(dict_model, dict_mult_tno_ind, df_y_base_tno,
+                    dict_bound):
+    """ Calculate exact envelopes of baseline footprints over low and high
+        bounds of baseline final demand in TNO classification.
+
+        Parameters:
+        -----------
+        dict_model: dictionary with invariants of the model.
+        dict_mult_tno_ind: dictionary with TNO multipliers of baseline, as
+        returned by calc_mult_tno with variant 'base' without aggregation.
+        df_y_base_tno: DataFrame with central baseline final demand.
+        dict_bound: dictionary with bounds, as returned by read_y_tno.
+
+        Returns:
+        --------
+        dict_base_bound: dictionary with 'lo' and 'hi' results, each in
+        layout of results of calc_base_tno.
+
+    """
+    ut.log('Calculating exact envelopes of baseline footprints.')
+    check_mult_tno_variant(dict_mult_tno_ind, 'base')
+    dict_array_y = get_dict_y_base_tno_bound(dict_mult_tno_ind, dict_bound)
+    return calc_bound_ind(dict_model,
+                          dict_mult_tno_ind,
+                          dict_array_y,
+                          list(df_y_base_tno.columns))
+
+
+def calc_bound_ind(dict_model, dict_mult_tno_ind, dict_array_y,
+                   list_meas_id):
+    """ Calculate exact envelopes of footprints over box of TNO final
+        demand, per footprint or impact, region, and measure.
+
+        Parameters:
+        -----------
+        dict_model: dictionary with invariants of the model.
+        dict_mult_tno_ind: dictionary with TNO multipliers, as returned by
+        calc_mult_tno without aggregation.
+        dict_array_y: dictionary with arrays of low and high TNO final
+        demand x measure.
+        list_meas_id: list with measure IDs of columns of box.
+
+        Returns:
+        --------
+        dict_fp_bound: dictionary with 'lo' and 'hi' results, each in
+        layout of results of calc_delta_tno.
+
+    """
+    dict_op = dict_model['op']
+    dict_impact = dict_model['impact']
+    n_prim = dict_mult_tno_ind['n_prim']
+    n_tno = len(dict_mult_tno_ind['columns'])
+
+    dict_fp_bound = {'lo': {}, 'hi': {}}
+    for act in dict_mult_tno_ind['array']:
+        array_min, array_max = calc_bound(dict_mult_tno_ind['array'][act],
+                                          dict_array_y['lo'],
+                                          dict_array_y['hi'])
+        act_key = act.lower()
+        for bound, array_fp in [('lo', array_min), ('hi', array_max)]:
+            dict_ef_eb, dict_vf_eb = get_dict_fp_eb(array_fp,
+                                                    dict_mult_tno_ind,
+                                                    list_meas_id,
+                                                    dict_impact)
+            dict_fp_bound[bound]['ef_'+act_key] = dict_ef_eb
+            dict_fp_bound[bound]['vf_emp_'+act_key] = dict_vf_eb['job']
+            dict_fp_bound[bound]['vf_va_'+act_key] = dict_vf_eb['va']
+
+    # Direct value added and employment of repair sectors.
+    for op in ['cbs_va', 'cbs_emp']:
+        array_op = np.zeros((len(dict_op[op]), n_tno))
+        array_op[:, n_prim:] = dict_op[op].values
+        array_min, array_max = calc_bound(array_op,
+                                          dict_array_y['lo'],
+                                          dict_array_y['hi'])
+        for bound, array_fp in [('lo', array_min), ('hi', array_max)]:
+            dict_fp_bound[bound][op] = pd.DataFrame(
+                array_fp,
+                index=dict_op[op].index,
+                columns=list_meas_id)
+    return dict_fp_bound
+
+
+@ut.trace
+def calc_fp_tno_bound(dict_mult_tno, df_y_delta_tno, dict_bound):
+    """ Calculate exact envelopes of delta of reported footprints over low
+        and high bounds of final demand in TNO classification.
+
+        Measures have their own demand, such that envelope of total over
+        measures is total of envelopes per measure. Activities use disjoint
+        TNO final demand, such that envelope of net delta follows from sum
+        of multipliers of activities.
+
+        Parameters:
+        -----------
+        dict_mult_tno: dictionary with TNO multipliers, as returned by
+        calc_mult_tno.
+        df_y_delta_tno: DataFrame with central delta of final demand.
+        dict_bound: dictionary with bounds, as returned by read_y_tno.
+
+        Returns:
+        --------
+        df_fp_bound: DataFrame with minimum, central value, and maximum of
+        delta per activity, footprint, region, and measure. Measure 'all'
+        sums all measures.
+
+    """
+    ut.log('Calculating exact envelopes of delta of footprints.')
+    check_mult_tno_variant(dict_mult_tno, 'delta')
+    list_meas_id = list(df_y_delta_tno.columns)
+    dict_array_y = get_dict_y_delta_tno_bound(dict_mult_tno,
+                                              dict_bound,
+                                              list_meas_id)
+    array_y_central = get_array_y_tno(dict_mult_tno, df_y_delta_tno)
+    return get_df_fp_bound(dict_mult_tno,
+                           dict_array_y,
+                           array_y_central,
+                           list_meas_id)
+
+
+@ut.trace
+def calc_fp_tno_base_bound(dict_mult_tno, df_y_base_tno, dict_bound):
+    """ Calculate exact envelopes of reported baseline footprints over low
+        and high bounds of baseline final demand in TNO classification.
+
+        Parameters:
+        -----------
+        dict_mult_tno: dictionary with TNO multipliers of baseline, as
+        returned by calc_mult_tno with variant 'base'.
+        df_y_base_tno: DataFrame with central baseline final demand.
+        dict_bound: dictionary with bounds, as returned by read_y_tno.
+
+        Returns:
+        --------
+        df_fp_bound: DataFrame with minimum, central value, and maximum of
+        baseline per activity, footprint, region, and measure.
+
+    """
+    ut.log('Calculating exact envelopes of baseline footprints.')
+    check_mult_tno_variant(dict_mult_tno, 'base')
+    dict_array_y = get_dict_y_base_tno_bound(dict_mult_tno, dict_bound)
+    array_y_central = get_array_y_tno(dict_mult_tno, df_y_base_tno)
+    return get_df_fp_bound(dict_mult_tno,
+                           dict_array_y,
+                           array_y_central,
+                           list(df_y_base_tno.columns))
+
+
+def get_df_fp_bound(dict_mult_tno, dict_array_y, array_y_central,
+                    list_meas_id):
+    """ Get exact envelopes of reported footprints over box of TNO final
+        demand, per activity, footprint, region, and measure.
+
+    """
+    dict_array_mult = dict(dict_mult_tno['array'])
+    dict_array_mult['Net'] = sum(dict_mult_tno['array'].values())
+    list_df_fp_bound = []
+    for act, array_mult in dict_array_mult.items():
+        array_min, array_max = calc_bound(array_mult,
+                                          dict_array_y['lo'],
+                                          dict_array_y['hi'])
+        array_central = np.tensordot(array_mult, array_y_central, axes=1)
+        index_fp_bound = pd.MultiIndex.from_tuples(
+            [(act, fp, unit, reg, meas_id)
+             for fp, unit in dict_mult_tno['fp']
+             for reg in dict_mult_tno['reg']
+             for meas_id in list_meas_id+['all']],
+            names=['Activity', 'Footprint', 'Unit', 'Region', 'Measure'])
+        df_fp_bound = pd.DataFrame(index=index_fp_bound)
+        for col, array_fp in [('min', array_min),
+                              ('central', array_central),
+                              ('max', array_max)]:
+            array_fp = np.concatenate(
+                [array_fp, array_fp.sum(axis=2, keepdims=True)], axis=2)
+            df_fp_bound[col] = array_fp.ravel()
+        list_df_fp_bound.append(df_fp_bound)
+    return pd.concat(list_df_fp_bound)
+
+
+def get_tech_update(dict_io_eb_2010, df_tech_scen):
+    """ Get low-rank update of Leontief system for technology scenario.
+
+        Parameters:
+        -----------
+        dict_io_eb_2010: dictionary with processed version of EXIOBASE.
+        df_tech_scen: DataFrame with rows of one scenario, as returned by
+        read_tech. Factors on same coefficient multiply.
+
+        Returns:
+        --------
+        dict_update: dictionary with update, as returned by
+        leontief.calc_update.
+
+    """
+    df_ca = dict_io_eb_2010['cA']
+    array_ca = df_ca.values
+    array_row_reg = df_ca.index.get_level_values(0)
+    array_row_prod = df_ca.index.get_level_values(1)
+    dict_col_pos_ca = {}
+    for tup_tech in df_tech_scen.itertuples(index=False):
+        tup_col = (tup_tech.col_reg, tup_tech.col_prod)
+        if tup_col not in df_ca.columns:
+            raise KeyError('Column not in EXIOBASE: {}'.format(tup_col))
+        col_pos = df_ca.columns.get_loc(tup_col)
+        if col_pos not in dict_col_pos_ca:
+            dict_col_pos_ca[col_pos] = array_ca[:, col_pos].copy()
+        array_row_bool = np.ones(len(df_ca.index), dtype=bool)
+        if tup_tech.row_reg:
+            array_row_bool &= array_row_reg == tup_tech.row_reg
+        if tup_tech.row_prod:
+            array_row_bool &= array_row_prod == tup_tech.row_prod
+        if not array_row_bool.any():
+            raise KeyError('Rows not in EXIOBASE: {}'.format(
+                (tup_tech.row_reg, tup_tech.row_prod)))
+        dict_col_pos_ca[col_pos][array_row_bool] *= tup_tech.factor
+
+    array_pos = np.array(list(dict_col_pos_ca))
+    array_d = np.column_stack([dict_col_pos_ca[col_pos]-array_ca[:, col_pos]
+                               for col_pos in array_pos])
+    return lt.calc_update(lt.get_lu(dict_io_eb_2010), array_pos, array_d)
+
+
+def calc_mult_tno_tech(dict_model, dict_mult_tno, dict_update):
+    """ Calculate TNO multipliers with technology of update.
+
+        Updated multipliers are M+(MD)(I-E'LD)^-1E'L, see
+        leontief.calc_update. Second term is composed with pathway
+        operators like M, such that only k rows are composed. Operators
+        and direct employment and value added of repair sectors keep
+        baseline technology.
+
+        Parameters:
+        -----------
+        dict_model: dictionary with invariants of the model.
+        dict_mult_tno: dictionary with TNO multipliers of baseline
+        technology, as returned by calc_mult_tno.
+        dict_update: dictionary with update, as returned by
+        get_tech_update.
+
+        Returns:
+        --------
+        dict_mult_tno_tech: dictionary with TNO multipliers, with same
+        labels as dict_mult_tno.
+
+    """
+    dict_impact = dict_model['impact']
+    dict_op = dict_model['op']
+    dict_mult = get_mult(dict_model['io_eb_2010_proc'],
+                         dict_model['tup_fp'],
+                         dict_impact)
+    array_mult, list_t_fp = get_array_mult(dict_mult,
+                                           dict_impact,
+                                           'fp_index' not in dict_mult_tno,
+                                           dict_mult_tno['variant'])
+    array_mult_d = array_mult.dot(dict_update['d'])
+    array_el_prim, array_el_circ = compose_mult_tno(
+        dict_update['cap_el'][:, np.newaxis, :],
+        dict_op,
+        dict_mult['columns'],
+        dict_mult_tno['variant'])
+
+    n_prim = dict_mult_tno['n_prim']
+    dict_mult_tno_tech = dict(dict_mult_tno)
+    dict_mult_tno_tech['array'] = {}
+    for act, act_slice, array_el in [('Prim', slice(None, n_prim),
+                                      array_el_prim),
+                                     ('Circ', slice(n_prim, None),
+                                      array_el_circ)]:
+        array_mult_tno = dict_mult_tno['array'][act].copy()
+        array_mult_tno[:, :, act_slice] += np.tensordot(
+            array_mult_d, array_el[:, 0, :], axes=1)
+        dict_mult_tno_tech['array'][act] = array_mult_tno
+    return dict_mult_tno_tech
+
+
+def calc_fp_tno_act(dict_mult_tno, array_y):
+    """ Calculate footprints per activity and net, and of all measures.
+
+    """
+    dict_array_mult = dict(dict_mult_tno['array'])
+    dict_array_mult['Net'] = sum(dict_mult_tno['array'].values())
+    dict_array_fp = {}
+    for act, array_mult in dict_array_mult.items():
+        array_fp = np.tensordot(array_mult, array_y, axes=1)
+        dict_array_fp[act] = np.concatenate(
+            [array_fp, array_fp.sum(axis=2, keepdims=True)], axis=2)
+    return dict_array_fp
+
+
+@ut.trace
+def calc_fp_tno_tech(dict_model, dict_mult_tno, df_y_delta_tno, df_tech):
+    """ Calculate delta of reported footprints per technology scenario.
+
+        Each scenario is a low-rank update of the baseline Leontief system,
+        evaluated with the factorization of baseline technology.
+
+        Parameters:
+        -----------
+        dict_model: dictionary with invariants of the model.
+        dict_mult_tno: dictionary with TNO multipliers, as returned by
+        calc_mult_tno.
+        df_y_delta_tno: DataFrame with delta of final demand.
+        df_tech: DataFrame with technology scenarios, as returned by
+        read_tech.
+
+        Returns:
+        --------
+        df_fp_tech: DataFrame with delta with baseline technology, delta
+        with technology of scenario, and change, per scenario, activity,
+        footprint, region, and measure. Measure 'all' sums all measures.
+
+    """
+    ut.log('Calculating delta of footprints for {} technology '
+           'scenarios.'.format(df_tech['scen_id'].nunique()))
+    list_meas_id = list(df_y_delta_tno.columns)
+    array_y = get_array_y_tno(dict_mult_tno, df_y_delta_tno)
+    dict_array_fp = calc_fp_tno_act(dict_mult_tno, array_y)
+    list_df_fp_tech = []
+    for scen_id, df_tech_scen in df_tech.groupby('scen_id', sort=False):
+        dict_update = get_tech_update(dict_model['io_eb_2010_proc'],
+                                      df_tech_scen)
+        dict_mult_tno_tech = calc_mult_tno_tech(dict_model,
+                                                dict_mult_tno,
+                                                dict_update)
+        dict_array_fp_tech = calc_fp_tno_act(dict_mult_tno_tech, array_y)
+        for act in dict_array_fp:
+            index_fp_tech = pd.MultiIndex.from_tuples(
+                [(scen_id, act, fp, unit, reg, meas_id)
+                 for fp, unit in dict_mult_tno['fp']
+                 for reg in dict_mult_tno['reg']
+                 for meas_id in list_meas_id+['all']],
+                names=['Scenario', 'Activity', 'Footprint', 'Unit', 'Region',
+                       'Measure'])
+            df_fp_tech = pd.DataFrame(index=index_fp_tech)
+            df_fp_tech['delta'] = dict_array_fp[act].ravel()
+            df_fp_tech['delta_tech'] = dict_array_fp_tech[act].ravel()
+            df_fp_tech['change'] = df_fp_tech['delta_tech']-df_fp_tech['delta']
+            list_df_fp_tech.append(df_fp_tech)
+    return pd.concat(list_df_fp_tech)
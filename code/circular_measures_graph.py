@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+""" Task graph with stored results of tasks for script of paper on
+    Global environmental and socio-economic impacts of a transition to a
+    circular economy in metal and electrical products: a Dutch case-study
+
+    Copyright (c) 2020 Bertram F. de Boer
+
+    Bertram F. de Boer
+    Faculty of Science
+    Institute of Environmental Sciences (CML)
+    Department of Industrial Ecology
+    Einsteinweg 2
+    2333 CC Leiden
+    The Netherlands
+
+    +31 (0)71 527 1478
+    b.f.de.boer@cml.leidenuniv.nl
+
+    Permission is hereby granted, free of charge, to any person obtaining a
+    copy of this software and associated documentation files (the "Software"),
+    to deal in the Software without restriction, including without limitation
+    the rights to use, copy, modify, merge, publish, distribute, sublicense,
+    and/or sell copies of the Software, and to permit persons to whom the
+    Software is furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in
+    all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+    FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+    DEALINGS IN THE SOFTWARE.
+"""
+
+import concurrent.futures as cf
+import functools
+import inspect
+import os
+
+import pandas as pd
+
+import cfg
+import exiobase as eb
+import utils as ut
+
+
+def get_func_key(func):
+    """ Get key of code of task function.
+        Functions are keyed on name and content of their module file,
+        such that changes in helper functions are also detected. Partial
+        functions are keyed on their function and arguments.
+
+    """
+    if isinstance(func, functools.partial):
+        list_arg_key = [get_func_key(arg) if callable(arg) else repr(arg)
+                        for arg in func.args]
+        return '{} {} {}'.format(get_func_key(func.func),
+                                 list_arg_key,
+                                 sorted(func.keywords.items()))
+    module = inspect.getmodule(func)
+    if (module is None or not hasattr(module, '__file__') or
+            not hasattr(func, '__qualname__')):
+        return repr(func)
+    return '{}.{} {}'.format(module.__name__,
+                             func.__qualname__,
+                             ut.get_hash([module.__file__]))
+
+
+def add_name_sort(dict_task, name, list_name_sort):
+    """ Add task and its input tasks to list, inputs before tasks.
+
+    """
+    if name in list_name_sort:
+        return
+    if name not in dict_task:
+        raise ValueError('Unknown task: {}'.format(name))
+    for name_input in dict_task[name].get('list_input', []):
+        add_name_sort(dict_task, name_input, list_name_sort)
+    list_name_sort.append(name)
+
+
+def get_task_key(dict_task, name, dict_key, dict_result):
+    """ Get key of task.
+        Hash of code of task, its input files, keys of its input tasks, and
+        cfg. Tasks with 'func_key' are keyed on their result instead.
+
+    """
+    dict_spec = dict_task[name]
+    if 'func_key' in dict_spec:
+        return ut.get_hash_obj([name,
+                                dict_spec['func_key'](dict_result[name])])
+    list_file_path = [cfg.INPUT_DIR_PATH+file_name
+                      for file_name in dict_spec.get('list_file_name', [])]
+    list_file_path.append(cfg.__file__)
+    str_task = repr((cfg.GRAPH_STORE_VERSION,
+                     name,
+                     get_func_key(dict_spec['func']),
+                     cfg.LIST_TUP_REG,
+                     [dict_key[name_input]
+                      for name_input in dict_spec.get('list_input', [])]))
+    return ut.get_hash(list_file_path, str_task)
+
+
+def get_task_file_path(dict_task, name, task_key):
+    """ Get path of stored result of task, or None if task is not stored.
+
+    """
+    if not (cfg.GRAPH_STORE and dict_task[name].get('bool_store', True)):
+        return None
+    return '{}{}{}/{}.pkl'.format(cfg.INPUT_DIR_PATH,
+                                  cfg.GRAPH_DIR_NAME,
+                                  name,
+                                  task_key)
+
+
+def calc_task(dict_task, name, list_arg, file_path):
+    """ Run function of task, and store its result if file_path.
+
+    """
+    result = dict_task[name]['func'](*list_arg)
+    if file_path:
+        eb.save_result(result, file_path)
+    return result
+
+
+def init_index(obj):
+    """ Build lookup tables of indexes of DataFrames and Series in object.
+        Tables are built lazily by pandas, which is not thread-safe, so
+        results are initialized before they are shared by tasks.
+
+    """
+    if isinstance(obj, dict):
+        for key in obj:
+            init_index(obj[key])
+    elif isinstance(obj, (list, tuple)):
+        for obj_elem in obj:
+            init_index(obj_elem)
+    elif isinstance(obj, (pd.DataFrame, pd.Series)):
+        list_index = [obj.index]
+        if isinstance(obj, pd.DataFrame):
+            list_index.append(obj.columns)
+        for index in list(list_index):
+            if isinstance(index, pd.MultiIndex):
+                list_index.extend(index.levels)
+        for index in list_index:
+            index._engine.is_unique
+    return obj
+
+
+@ut.trace
+def run_graph(dict_task, list_name):
+    """ Get results of tasks in graph.
+
+        Results of stored tasks are loaded, without running their input
+        tasks. Other tasks are run as soon as their inputs are available,
+        concurrently on GRAPH_N_WORKER threads.
+
+        Parameters:
+        -----------
+        dict_task: dictionary with per task name a dictionary with
+        'func', and optionally 'list_input' with names of tasks whose
+        results are positional arguments of func, 'list_file_name' with
+        input files read by func, 'bool_store' to store result (default
+        True), and 'func_key' giving key of task from its result. Tasks with
+        'func_key' have no input tasks, and are always run.
+        list_name: list with names of tasks to get.
+
+        Returns:
+        --------
+        dict_result: dictionary with result per name in list_name.
+
+    """
+    list_name_sort = []
+    for name in list_name:
+        add_name_sort(dict_task, name, list_name_sort)
+
+    dict_result = {}
+    dict_key = {}
+    for name in list_name_sort:
+        if 'func_key' in dict_task[name]:
+            dict_result[name] = init_index(
+                calc_task(dict_task, name, [], None))
+        dict_key[name] = get_task_key(dict_task, name, dict_key, dict_result)
+
+    # Walk from requested tasks to inputs. Inputs of stored tasks are not
+    # needed.
+    dict_file_path = {}
+    list_name_load = []
+    list_name_calc = []
+    set_name_need = set(list_name)
+    for name in reversed(list_name_sort):
+        if name not in set_name_need or name in dict_result:
+            continue
+        dict_file_path[name] = get_task_file_path(dict_task,
+                                                  name,
+                                                  dict_key[name])
+        if dict_file_path[name] and os.path.isfile(dict_file_path[name]):
+            list_name_load.append(name)
+        else:
+            list_name_calc.insert(0, name)
+            set_name_need.update(dict_task[name].get('list_input', []))
+    ut.log('Running task graph.',
+           n_load=len(list_name_load),
+           n_calc=len(list_name_calc))
+
+    with cf.ThreadPoolExecutor(max_workers=cfg.GRAPH_N_WORKER) as executor:
+        dict_future = {}
+        for name in list_name_load:
+            future = executor.submit(eb.load_result, dict_file_path[name])
+            dict_future[future] = name
+        while dict_future or list_name_calc:
+            for name in list(list_name_calc):
+                list_name_input = dict_task[name].get('list_input', [])
+                if all(name_input in dict_result
+                       for name_input in list_name_input):
+                    list_name_calc.remove(name)
+                    future = executor.submit(
+                        calc_task,
+                        dict_task,
+                        name,
+                        [dict_result[name_input]
+                         for name_input in list_name_input],
+                        dict_file_path[name])
+                    dict_future[future] = name
+            set_future_done, _ = cf.wait(dict_future,
+                                         return_when=cf.FIRST_COMPLETED)
+            for future in set_future_done:
+                dict_result[dict_future.pop(future)] = init_index(
+                    future.result())
+
+    dict_result_name = {}
+    for name in list_name:
+        dict_result_name[name] = dict_result[name]
+    return dict_result_name
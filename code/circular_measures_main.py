@@ -36,323 +36,486 @@
 """
 
 import csv
+import functools
+import operator
+
 import pandas as pd
 
 import cfg
 import circular_measures_read as cmr
 import circular_measures_calc as cmc
+import circular_measures_graph as cmg
 import circular_measures_write as cmw
+import exiobase as eb
 
 import utils as ut
 
-def main():
-    """ Preprocessing.
+
+def read_dict_meas_id_short_long():
+    """ Read short and long names of measures.
 
     """
-    # Make directories for results, tests, and logs.
-    ut.makedirs()
+    dict_meas_id_short_long = {}
+    with open(cfg.INPUT_DIR_PATH+cfg.LIST_MEAS_ID_SHORT_LONG_FILE_NAME,
+              'r') as (read_file):
+        csv_file = csv.reader(read_file, delimiter='\t')
+        for row_id, row in enumerate(csv_file):
+            if row_id:
+                meas_id, meas_short, meas_long = row
+                dict_meas_id_short_long[meas_id] = {}
+                dict_meas_id_short_long[meas_id]['short'] = meas_short
+                dict_meas_id_short_long[meas_id]['long'] = meas_long
+    return dict_meas_id_short_long
+
+
+def get_dict_model(list_key, *tup_obj):
+    """ Get dictionary with invariants of the model from results of tasks.
+
+    """
+    return dict(zip(list_key, tup_obj))
+
+
+def add_op(dict_model, dict_op):
+    """ Add operators per pathway to invariants of the model.
+
+    """
+    dict_model_op = dict(dict_model)
+    dict_model_op['op'] = dict_op
+    return dict_model_op
+
+
+def get_dict_task():
+    """ Get task graph of model, baseline, and delta, see
+        circular_measures_graph.run_graph.
+
+        Processed EXIOBASE is kept in its own store, and is keyed on it.
+        Results of inexpensive selections, and of baseline and delta, which
+        are cached per measure, are not stored.
+
+    """
+    dict_task = {}
 
     # Read EXIOBASE.
-    dict_io_eb_2010_proc = cmr.read_io_eb_2010_proc()
+    dict_task['io_eb_2010_proc'] = {'func': cmr.read_io_eb_2010_proc,
+                                    'func_key': cmc.get_io_key,
+                                    'bool_store': False}
+
+    # Final demand of NL summed to country level, shared by bridges.
+    dict_task['y_eb_cntr_nl'] = {'func': cmc.calc_y_eb_cntr_nl,
+                                 'list_input': ['io_eb_2010_proc']}
 
     # Calculate sourcing fractions for all regions
-    df_bridge_eb_source_all = cmc.calc_bridge_eb_source_reg_all(
-        dict_io_eb_2010_proc)
+    dict_task['bridge_eb_source_all'] = {
+        'func': cmc.calc_bridge_eb_source_reg_all,
+        'list_input': ['y_eb_cntr_nl']}
 
     # Generate bridge matrix to allocate all to NL
-    df_bridge_eb_source_nl = cmc.calc_bridge_eb_source_reg_nl(
-        dict_io_eb_2010_proc)
-
-    # Read baseline, scenario, and delta of final demand in TNO classification.
-    df_y_base_tno, df_y_scen_tno, df_y_delta_tno = cmr.read_y_tno()
-    df_y_delta_tno.sum().sum()
+    dict_task['bridge_eb_source_nl'] = {
+        'func': cmc.calc_bridge_eb_source_reg_nl,
+        'list_input': ['y_eb_cntr_nl']}
 
     # Read footprints.
-    dict_tup_fp = cmr.read_footprint()
-    dict_impact = cmr.read_dict_impact()
+    dict_task['tup_fp'] = {'func': cmr.read_footprint,
+                           'list_file_name': [cfg.E_FP_FILE_NAME,
+                                              cfg.M_FP_FILE_NAME,
+                                              cfg.R_FP_FILE_NAME]}
+    dict_task['impact'] = {
+        'func': cmr.read_dict_impact,
+        'list_file_name': list(cfg.DICT_FP_FILE_NAME.values())}
 
     # Read bridge from TNO to CBS IO circularity sectors.
-    df_b_cpa_circ_sbi = cmr.read_b_cpa_circ_sbi()
+    dict_task['b_cpa_circ_sbi'] = {
+        'func': cmr.read_b_cpa_circ_sbi,
+        'list_file_name': [cfg.B_CPA_CIRC_SBI_FILE_NAME]}
 
     # Read bridge from TNO to EXIOBASE.
-    df_b_cpa_prim_eb = cmr.read_b_cpa_prim_eb()
+    dict_task['b_cpa_prim_eb'] = {
+        'func': cmr.read_b_cpa_prim_eb,
+        'list_file_name': [cfg.B_CPA_PRIM_EB_FILE_NAME]}
 
     # Read bridge from CBS to EXIOBASE.
-    df_bridge_sbi_eb = cmr.gen_bridge_sbi_eb(dict_io_eb_2010_proc)
+    dict_task['bridge_sbi_eb'] = {
+        'func': cmr.gen_bridge_sbi_eb,
+        'list_input': ['y_eb_cntr_nl'],
+        'list_file_name': [cfg.B_SBI_EB_FILE_NAME]}
 
     # Calculate production recipe of repair sectors.
-    df_io_cbs_2010 = cmr.read_io_cbs_2010()
-
-    dict_cbs_emp_2010 = cmr.read_cbs_emp_2010()
-
-    (df_io_cbs_2010_circular_a,
-     df_io_cbs_2010_circular_import_coeff,
-     df_io_cbs_2010_circular_margin_coeff,
-     df_io_cbs_2010_circular_va_coeff,
-     df_cbs_emp_2010_coeff) = (
-         cmc.calc_circular_prod_recipe(df_io_cbs_2010, dict_cbs_emp_2010))
-
-    """ Bridge primary sale baseline from TNO to EXIOBASE.
+    dict_task['io_cbs_2010'] = {
+        'func': cmr.read_io_cbs_2010,
+        'list_file_name': [cfg.IO_CBS_2010_FILE_NAME]}
+    dict_task['cbs_emp_2010'] = {
+        'func': cmr.read_cbs_emp_2010,
+        'list_file_name': [cfg.CBS_REP_EMP_2010_FILE_NAME]}
+    dict_task['circular_prod_recipe'] = {
+        'func': cmc.calc_circular_prod_recipe,
+        'list_input': ['io_cbs_2010', 'cbs_emp_2010']}
+    list_key_recipe = ['io_cbs_2010_circular_a',
+                       'io_cbs_2010_circular_import_coeff',
+                       'io_cbs_2010_circular_margin_coeff',
+                       'io_cbs_2010_circular_va_coeff',
+                       'cbs_emp_2010_coeff']
+    for recipe_id, key in enumerate(list_key_recipe):
+        dict_task[key] = {'func': operator.itemgetter(recipe_id),
+                          'list_input': ['circular_prod_recipe'],
+                          'bool_store': False}
+
+    # Calculate production recipes of imports of repair sectors.
+    dict_task['eb_ca_nl_rep_cons_reg_import'] = {
+        'func': functools.partial(cmc.calc_eb_ca_import,
+                                  tup_cntr_prod=cfg.TUP_EB_REP_CONS),
+        'list_input': ['io_eb_2010_proc']}
+    dict_task['eb_ca_nl_rep_mach_reg_import'] = {
+        'func': functools.partial(cmc.calc_eb_ca_import,
+                                  tup_cntr_prod=cfg.TUP_EB_REP_MACH),
+        'list_input': ['io_eb_2010_proc']}
+
+    # Precompose bridges into operators per pathway.
+    list_key_model = ['io_eb_2010_proc',
+                      'bridge_eb_source_all',
+                      'bridge_eb_source_nl',
+                      'tup_fp',
+                      'impact',
+                      'b_cpa_circ_sbi',
+                      'b_cpa_prim_eb',
+                      'bridge_sbi_eb']
+    list_key_model += list_key_recipe
+    list_key_model += ['eb_ca_nl_rep_cons_reg_import',
+                       'eb_ca_nl_rep_mach_reg_import']
+    dict_task['model_bridge'] = {
+        'func': functools.partial(get_dict_model, list_key_model),
+        'list_input': list_key_model,
+        'bool_store': False}
+    dict_task['op'] = {'func': cmc.calc_dict_op,
+                       'list_input': ['model_bridge']}
+    dict_task['model'] = {'func': add_op,
+                          'list_input': ['model_bridge', 'op'],
+                          'bool_store': False}
+
+    # Read baseline, scenario, and delta of final demand in TNO
+    # classification.
+    dict_task['y_tno'] = {'func': cmr.read_y_tno,
+                          'list_file_name': [cfg.SEC_FILE_NAME,
+                                             cfg.PROD_ID_FILE_NAME,
+                                             cfg.DELTA_FILE_NAME]}
+    dict_task['y_base_tno'] = {'func': operator.itemgetter(0),
+                               'list_input': ['y_tno'],
+                               'bool_store': False}
+    dict_task['y_delta_tno'] = {'func': operator.itemgetter(2),
+                                'list_input': ['y_tno'],
+                                'bool_store': False}
+
+    # Calculate baseline and delta of footprints, in one block or
+    # concurrently.
+    if cfg.CALC_BLOCK:
+        dict_task['y_block_tno'] = {'func': stack_y_tno,
+                                    'list_input': ['y_base_tno',
+                                                   'y_delta_tno'],
+                                    'bool_store': False}
+        dict_task['block'] = {
+            'func': functools.partial(calc_tno_cache, calc_block_tno,
+                                      'block'),
+            'list_input': ['model', 'y_block_tno'],
+            'bool_store': False}
+        for variant in ['base', 'delta']:
+            dict_task[variant] = {
+                'func': functools.partial(get_block_variant, variant),
+                'list_input': ['block'],
+                'bool_store': False}
+    else:
+        dict_task['base'] = {
+            'func': functools.partial(calc_tno_cache, calc_base_tno, 'base'),
+            'list_input': ['model', 'y_base_tno'],
+            'bool_store': False}
+        dict_task['delta'] = {
+            'func': functools.partial(calc_tno_cache, calc_delta_tno,
+                                      'delta'),
+            'list_input': ['model', 'y_delta_tno'],
+            'bool_store': False}
+    return dict_task
+
+
+@ut.trace
+def read_model():
+    """ Read EXIOBASE, and build sourcing and bridge matrices, production
+        recipes of repair sectors, and footprint definitions.
+        These do not depend on final demand of TNO, and are shared by the
+        baseline, the delta, and any scenario evaluated later.
+
+        Returns:
+        --------
+        dict_model: dictionary with invariants of the model.
 
     """
-    # Get baseline of primary sales.
-    df_y_base_tno_primary = cmr.get_y_tno_primary(df_y_base_tno)
-
-    # Bridge base demand from TNO to sourced EXIOBASE classification.
-    df_y_base_eb_primary = cmc.calc_y_eb(df_b_cpa_prim_eb,
-                                         df_y_base_tno_primary)
-
-    df_y_base_eb_primary_source = cmc.calc_y_eb_source(df_bridge_eb_source_all,
-                                                       df_y_base_eb_primary)
+    return cmg.run_graph(get_dict_task(), ['model'])['model']
 
-    """ Bridge circularity baseline from TNO via CBS to EXIOBASE.
 
-    """
-    # Get baseline of circularity sectors.
-    df_y_base_tno_circular = cmr.get_y_tno_circular(df_y_base_tno)
-    df_y_base_tno_circular.to_csv(
-        cfg.RESULT_TXT_DIR_PATH+'y_base_tno_circular.txt',
-        sep='\t')
+def calc_variant_tno(dict_model, df_y_tno, variant):
+    """ Calculate footprints of final demand of variant in TNO
+        classification, with precomposed pathway operators.
 
-    # Bridge baseline in circularity sectors from TNO to CBS IO.
-    df_y_base_cbs_circular = df_b_cpa_circ_sbi.dot(
-        df_y_base_tno_circular)
+        Parameters:
+        -----------
+        dict_model: dictionary with invariants of the model.
+        df_y_tno: DataFrame with final demand per measure, as returned by
+        read_y_tno.
+        variant: 'base' or 'delta'. Baseline imports of machinery repairs
+        follow their own recipe, see calc_dict_op.
 
-    df_y_base_cbs_circular_a = df_io_cbs_2010_circular_a.dot(
-        df_y_base_cbs_circular)
+        Returns:
+        --------
+        dict_tno: dictionary with footprints of primary sales and
+        circularity activities, and direct effects of repair sectors.
 
-    # Bridge circularity demand from CBS to EXIOBASE.
-    df_y_base_eb_circular_a = df_bridge_sbi_eb.dot(df_y_base_cbs_circular_a)
-
-    df_y_base_eb_circular_a_source_nl = cmc.calc_y_eb_source(
-        df_bridge_eb_source_nl,
-        df_y_base_eb_circular_a)
+    """
+    dict_io_eb_2010_proc = dict_model['io_eb_2010_proc']
+    dict_tup_fp = dict_model['tup_fp']
+    dict_impact = dict_model['impact']
+    dict_op = dict_model['op']
+    calc_fp = cmc.calc_delta
+    if variant == 'base':
+        calc_fp = cmc.calc_base
+
+    dict_tno = {}
+
+    # Get primary sales and circularity activities.
+    df_y_tno_primary = cmr.get_y_tno_primary(df_y_tno)
+
+    df_y_tno_circular = cmr.get_y_tno_circular(df_y_tno)
+
+    # Bridge primary sales from TNO to sourced EXIOBASE classification.
+    df_y_eb_source_primary = cmc.apply_op(dict_op['primary'],
+                                          df_y_tno_primary)
+
+    # Bridge circularity activities from TNO via CBS to sourced EXIOBASE
+    # classification. Imports and margins are applied as rank-1 updates of
+    # total output.
+    df_y_eb_source_circular = cmc.apply_op(dict_op['domestic'],
+                                           df_y_tno_circular)
+    list_tup_y_inject = cmc.get_list_tup_y_inject(dict_op,
+                                                  df_y_tno_circular,
+                                                  variant)
+
+    # Calculate direct value added and employment.
+    dict_tno['cbs_va'] = cmc.apply_op(dict_op['cbs_va'], df_y_tno_circular)
+    dict_tno['cbs_emp'] = cmc.apply_op(dict_op['cbs_emp'], df_y_tno_circular)
+
+    (dict_tno['ef_prim'],
+     dict_tno['vf_emp_prim'],
+     dict_tno['vf_va_prim']) = calc_fp(dict_io_eb_2010_proc,
+                                       df_y_eb_source_primary,
+                                       dict_tup_fp,
+                                       dict_impact)
+
+    (dict_tno['ef_circ'],
+     dict_tno['vf_emp_circ'],
+     dict_tno['vf_va_circ']) = calc_fp(dict_io_eb_2010_proc,
+                                       df_y_eb_source_circular,
+                                       dict_tup_fp,
+                                       dict_impact,
+                                       list_tup_y_inject)
+
+    return dict_tno
+
+
+@ut.trace
+def calc_base_tno(dict_model, df_y_base_tno):
+    """ Calculate footprints of baseline of final demand in TNO
+        classification.
+
+        Parameters:
+        -----------
+        dict_model: dictionary with invariants of the model.
+        df_y_base_tno: DataFrame with baseline of final demand, as returned
+        by read_y_tno.
+
+        Returns:
+        --------
+        dict_base: dictionary with footprints of primary sales and
+        circularity activities, and direct effects of repair sectors.
 
-    # Calculate baseline of import of consumer repairs.
-    y_base_cbs_circular_import_cons = cmc.calc_y_base_cbs_circular_import(
-        df_io_cbs_2010_circular_import_coeff,
-        df_y_base_cbs_circular,
-        cfg.TUP_CBS_REP_CONS)
+    """
+    return calc_variant_tno(dict_model, df_y_base_tno, 'base')
 
-    df_eb_ca_nl_rep_cons_reg_import = cmc.calc_eb_ca_import(
-        dict_io_eb_2010_proc,
-        cfg.TUP_EB_REP_CONS)
 
-    df_y_base_eb_circular_import_cons = pd.DataFrame(
-        df_eb_ca_nl_rep_cons_reg_import*y_base_cbs_circular_import_cons)
-    df_y_base_eb_circular_import_cons.columns = (
-        df_y_base_eb_primary_source.columns)
+@ut.trace
+def calc_delta_tno(dict_model, df_y_delta_tno):
+    """ Calculate footprints of delta of final demand in TNO classification.
 
-    # Calculate baseline of import of machinery repairs.
-    y_base_cbs_circular_import_mach = cmc.calc_y_base_cbs_circular_import(
-        df_io_cbs_2010_circular_import_coeff,
-        df_y_base_cbs_circular,
-        cfg.TUP_CBS_REP_MACH)
+        Parameters:
+        -----------
+        dict_model: dictionary with invariants of the model.
+        df_y_delta_tno: DataFrame with delta of final demand per measure,
+        as returned by read_y_tno.
 
-    df_eb_ca_nl_rep_mach_reg_import = cmc.calc_eb_ca_import(
-        dict_io_eb_2010_proc,
-        cfg.TUP_EB_REP_MACH)
+        Returns:
+        --------
+        dict_delta: dictionary with footprints of primary sales and
+        circularity activities, and direct effects of repair sectors.
 
-    df_y_base_eb_circular_import_mach = pd.DataFrame(
-        df_eb_ca_nl_rep_mach_reg_import*y_base_cbs_circular_import_mach)
-    df_y_base_eb_circular_import_mach.columns = (
-        df_y_base_eb_primary_source.columns)
+    """
+    return calc_variant_tno(dict_model, df_y_delta_tno, 'delta')
 
-    # Calculate baseline of margin of consumer repairs
-    y_base_cbs_circular_margin_cons = cmc.calc_y_base_cbs_circular_margin(
-        df_io_cbs_2010_circular_margin_coeff,
-        df_y_base_cbs_circular,
-        cfg.TUP_CBS_REP_CONS)
 
-    # Calculate direct value added of consumer repairs
-    df_base_cbs_va = df_io_cbs_2010_circular_va_coeff.dot(
-        df_y_base_cbs_circular)
+def stack_y_tno(df_y_base_tno, df_y_delta_tno):
+    """ Stack baseline and delta of final demand in TNO classification as
+        columns, labelled by variant and measure. Rows missing in one
+        variant are taken as zero.
 
-    # Calculate direct employment of baseline.
-    df_base_cbs_emp = df_cbs_emp_2010_coeff.dot(df_y_base_cbs_circular)
+    """
+    return pd.concat([df_y_base_tno, df_y_delta_tno],
+                     axis=1,
+                     keys=['base', 'delta']).fillna(0)
 
-    df_y_base_eb_circular_margin_cons = cmc.calc_base_eb_margin(
-        df_y_base_eb_primary_source, y_base_cbs_circular_margin_cons)
 
-    # Calculate baseline of margin of machinery repairs
-    y_base_cbs_circular_margin_mach = cmc.calc_y_base_cbs_circular_margin(
-        df_io_cbs_2010_circular_margin_coeff,
-        df_y_base_cbs_circular,
-        cfg.TUP_CBS_REP_MACH)
+@ut.trace
+def calc_block_tno(dict_model, df_y_block_tno):
+    """ Calculate footprints of baseline and delta of final demand in TNO
+        classification in one block, see
+        circular_measures_calc.calc_fp_block.
 
-    df_y_base_eb_circular_margin_mach = cmc.calc_base_eb_margin(
-        df_y_base_eb_primary_source, y_base_cbs_circular_margin_mach)
+        Parameters:
+        -----------
+        dict_model: dictionary with invariants of the model.
+        df_y_block_tno: DataFrame with final demand per variant and
+        measure, as returned by stack_y_tno.
 
-    """ Calculate baseline of footprints from primary sales and circularity.
+        Returns:
+        --------
+        dict_block: dictionary with results of calc_base_tno, and
+        footprints per pathway, e.g. 'ef_domestic', with tuples of variant
+        and measure in place of measures.
 
     """
-    (dict_ef_eb_base_prim,
-     dict_vf_eb_base_emp_prim,
-     dict_vf_eb_base_va_prim) = cmc.calc_base(dict_io_eb_2010_proc,
-                                              df_y_base_eb_primary_source,
-                                              dict_tup_fp,
-                                              dict_impact)
-
-    df_y_base_eb_source_circular = (df_y_base_eb_circular_a_source_nl +
-                                    df_y_base_eb_circular_import_cons +
-                                    df_y_base_eb_circular_import_mach +
-                                    df_y_base_eb_circular_margin_cons +
-                                    df_y_base_eb_circular_margin_mach)
-
-    (dict_ef_eb_base_circ,
-     dict_vf_eb_base_emp_circ,
-     dict_vf_eb_base_va_circ) = cmc.calc_base(dict_io_eb_2010_proc,
-                                              df_y_base_eb_source_circular,
-                                              dict_tup_fp,
-                                              dict_impact)
-
-    df_y_base_eb_source_net = (df_y_base_eb_primary_source +
-                               df_y_base_eb_circular_a_source_nl +
-                               df_y_base_eb_circular_import_cons +
-                               df_y_base_eb_circular_import_mach +
-                               df_y_base_eb_circular_margin_cons +
-                               df_y_base_eb_circular_margin_mach)
-
-    dict_ef_eb_base_net = cmc.calc_ef_net(dict_ef_eb_base_prim,
-                                          dict_ef_eb_base_circ)
-    dict_vf_eb_base_emp_net = cmc.calc_vf_net(dict_vf_eb_base_emp_prim,
-                                              dict_vf_eb_base_emp_circ)
-    dict_vf_eb_base_va_net = cmc.calc_vf_net(dict_vf_eb_base_va_prim,
-                                             dict_vf_eb_base_va_circ)
-
-    """ Bridge primary sale delta from TNO to EXIOBASE.
+    dict_op = dict_model['op']
+
+    dict_y_tno_act = {}
+    dict_list_df_cbs = {'cbs_va': [], 'cbs_emp': []}
+    for variant in df_y_block_tno.columns.unique(0):
+        df_y_tno_circular = cmr.get_y_tno_circular(df_y_block_tno[variant])
+        dict_y_tno_act[variant] = (
+            cmr.get_y_tno_primary(df_y_block_tno[variant]),
+            df_y_tno_circular)
+
+        # Calculate direct value added and employment.
+        for key in dict_list_df_cbs:
+            dict_list_df_cbs[key].append(cmc.apply_op(dict_op[key],
+                                                  df_y_tno_circular))
+
+    dict_block = {}
+    for key in dict_list_df_cbs:
+        dict_block[key] = pd.concat(dict_list_df_cbs[key],
+                                    axis=1,
+                                    keys=list(dict_y_tno_act))
+
+    dict_fp_block = cmc.calc_fp_block(dict_model['io_eb_2010_proc'],
+                                      dict_op,
+                                      dict_y_tno_act,
+                                      dict_model['tup_fp'],
+                                      dict_model['impact'])
+    for variant in dict_fp_block:
+        for key in dict_fp_block[variant]:
+            dict_fp = dict_block.setdefault(key, {})
+            for meas_id in dict_fp_block[variant][key]:
+                dict_fp[(variant, meas_id)] = (
+                    dict_fp_block[variant][key][meas_id])
+    return dict_block
+
+
+def get_block_variant(variant, dict_block):
+    """ Get results of variant from results of calc_block_tno.
 
     """
-    # Get delta of primary sales.
-    df_y_delta_tno_primary = cmr.get_y_tno_primary(df_y_delta_tno)
-
-    # Bridge base demand from TNO to sourced EXIOBASE classification.
-    df_y_delta_eb_primary = cmc.calc_y_eb(df_b_cpa_prim_eb,
-                                          df_y_delta_tno_primary)
+    dict_tno = {}
+    for key in dict_block:
+        if isinstance(dict_block[key], pd.DataFrame):
+            dict_tno[key] = dict_block[key][variant]
+        else:
+            dict_tno[key] = {}
+            for variant_block, meas_id in dict_block[key]:
+                if variant_block == variant:
+                    dict_tno[key][meas_id] = (
+                        dict_block[key][(variant_block, meas_id)])
+    return dict_tno
+
+
+@ut.trace
+def calc_tno_cache(calc_tno, variant, dict_model, df_y_tno):
+    """ Calculate footprints of final demand in TNO classification with
+        calc_tno, reusing cached results of measures with unchanged final
+        demand. Results of evaluated measures are added to cache.
+
+        Parameters:
+        -----------
+        calc_tno: function calc_base_tno, calc_delta_tno, or
+        calc_block_tno.
+        variant: string with name of variant, used in log.
+        dict_model: dictionary with invariants of the model.
+        df_y_tno: DataFrame with final demand per measure.
+
+        Returns:
+        --------
+        dict_tno: dictionary with results of calc_tno for all measures.
 
+    """
+    result_dir_path = None
+    if cfg.RESULT_CACHE:
+        result_dir_path = cmc.get_result_dir_path(
+            dict_model,
+            cmc.get_result_key(dict_model, calc_tno))
+    if result_dir_path is None:
+        return calc_tno(dict_model, df_y_tno)
+
+    list_meas_id = list(df_y_tno.columns)
+    dict_meas_file_path = {}
+    dict_meas_result = {}
+    for meas_id in list_meas_id:
+        dict_meas_file_path[meas_id] = '{}{}.pkl'.format(
+            result_dir_path,
+            cmc.get_meas_key(df_y_tno[meas_id]))
+        dict_result = eb.load_result(dict_meas_file_path[meas_id])
+        if dict_result is not None:
+            dict_meas_result[meas_id] = dict_result
+
+    list_meas_id_calc = [meas_id for meas_id in list_meas_id
+                         if meas_id not in dict_meas_result]
+    ut.log('Reusing cached results of {} of {} measures of {}.'.format(
+        len(dict_meas_result), len(list_meas_id), variant),
+           n_calc=len(list_meas_id_calc))
+    if list_meas_id_calc:
+        dict_tno = calc_tno(dict_model, df_y_tno[list_meas_id_calc])
+        for meas_id in list_meas_id_calc:
+            dict_meas_result[meas_id] = cmc.split_result(dict_tno, meas_id)
+            if cfg.SAVE_EB:
+                eb.save_result(dict_meas_result[meas_id],
+                               dict_meas_file_path[meas_id])
+    return cmc.merge_result(dict_meas_result, list_meas_id)
 
-    df_y_delta_eb_primary_source = cmc.calc_y_eb_source(
-        df_bridge_eb_source_all,
-        df_y_delta_eb_primary)
 
-    """ Bridge circularity delta from TNO via CBS to EXIOBASE.
+def main():
+    """ Preprocessing.
 
     """
-    # Get delta of circularity sectors.
-    df_y_delta_tno_circular = cmr.get_y_tno_circular(df_y_delta_tno)
+    # Make directories for results, tests, and logs.
+    ut.makedirs()
 
-    # Bridge shifts in circularity sectors from TNO to CBS IO.
-    df_y_delta_cbs_circular = df_b_cpa_circ_sbi.dot(
-        df_y_delta_tno_circular)
+    # Run task graph of model, and of baseline and delta of footprints
+    # from primary sales and circularity. Measures with unchanged
+    # fingerprint are taken from result cache.
+    dict_graph = cmg.run_graph(get_dict_task(), ['y_tno', 'base', 'delta'])
+    df_y_base_tno, df_y_scen_tno, df_y_delta_tno = dict_graph['y_tno']
 
-    # Calculate production recipe of repair sectors.
-    df_y_delta_cbs_circular_a = df_io_cbs_2010_circular_a.dot(
-        df_y_delta_cbs_circular)
-
-    # Calculate delta of circularity import of consumer repairs.
-    dict_y_delta_cbs_circular_import_cons = (
-        cmc.calc_y_delta_cbs_circular_import(
-            df_io_cbs_2010_circular_import_coeff,
-            df_y_delta_cbs_circular,
-            cfg.TUP_CBS_REP_CONS))
-
-    df_y_delta_eb_circular_import_cons = cmc.calc_y_delta_eb_circular_import(
-        df_eb_ca_nl_rep_cons_reg_import,
-        dict_y_delta_cbs_circular_import_cons)
-
-    # Calculate delta of circularity import of machinery repairs.
-    dict_y_delta_cbs_circular_import_mach = (
-        cmc.calc_y_delta_cbs_circular_import(
-            df_io_cbs_2010_circular_import_coeff,
-            df_y_delta_cbs_circular,
-            cfg.TUP_CBS_REP_MACH))
-
-    df_y_delta_eb_circular_import_mach = cmc.calc_y_delta_eb_circular_import(
-        df_eb_ca_nl_rep_cons_reg_import,
-        dict_y_delta_cbs_circular_import_mach)
-
-    # Calculate delta of circularity margin of consumer repairs.
-    dict_y_delta_cbs_circular_margin_cons = (
-        cmc.calc_y_delta_cbs_circular_margin(
-            df_io_cbs_2010_circular_margin_coeff,
-            df_y_delta_cbs_circular,
-            cfg.TUP_CBS_REP_CONS))
-
-    df_y_delta_eb_circular_margin_cons = cmc.calc_delta_eb_margin(
-        df_y_base_eb_primary_source,
-        dict_y_delta_cbs_circular_margin_cons)
-
-    # Calculate delta of circularity margin of machinery repairs.
-    dict_y_delta_cbs_circular_margin_mach = (
-        cmc.calc_y_delta_cbs_circular_margin(
-            df_io_cbs_2010_circular_margin_coeff,
-            df_y_delta_cbs_circular,
-            cfg.TUP_CBS_REP_MACH))
-
-    df_y_delta_eb_circular_margin_mach = cmc.calc_delta_eb_margin(
-        df_y_base_eb_primary_source,
-        dict_y_delta_cbs_circular_margin_mach)
-
-    # Calculate direct value added of delta.
-    df_delta_cbs_va = df_io_cbs_2010_circular_va_coeff.dot(
-        df_y_delta_cbs_circular)
-
-    # Calculate direct employment of delta.
-    df_delta_cbs_emp = df_cbs_emp_2010_coeff.dot(df_y_delta_cbs_circular)
-
-    # Bridge circularity demand from CBS to EXIOBASE.
-    df_y_delta_eb_circular_a = df_bridge_sbi_eb.dot(df_y_delta_cbs_circular_a)
-    df_y_delta_eb_circular_a_source_nl = cmc.calc_y_eb_source(
-        df_bridge_eb_source_nl,
-        df_y_delta_eb_circular_a)
-
-    df_y_delta_eb_source_primary = (df_y_delta_eb_primary_source)
-
-    (dict_ef_eb_delta_prim,
-     dict_vf_eb_delta_emp_prim,
-     dict_vf_eb_delta_va_prim) = cmc.calc_delta(dict_io_eb_2010_proc,
-                                                df_y_delta_eb_source_primary,
-                                                dict_tup_fp,
-                                                dict_impact)
-
-    df_y_delta_eb_source_circular = (df_y_delta_eb_circular_a_source_nl +
-                                     df_y_delta_eb_circular_import_cons +
-                                     df_y_delta_eb_circular_import_mach +
-                                     df_y_delta_eb_circular_margin_cons +
-                                     df_y_delta_eb_circular_margin_mach)
-
-    (dict_ef_eb_delta_circ,
-     dict_vf_eb_delta_emp_circ,
-     dict_vf_eb_delta_va_circ) = cmc.calc_delta(
-         dict_io_eb_2010_proc,
-         df_y_delta_eb_source_circular,
-         dict_tup_fp,
-         dict_impact)
-
-    df_y_delta_eb_source_net = (df_y_delta_eb_primary_source +
-                                df_y_delta_eb_circular_a_source_nl +
-                                df_y_delta_eb_circular_import_cons +
-                                df_y_delta_eb_circular_import_mach +
-                                df_y_delta_eb_circular_margin_cons +
-                                df_y_delta_eb_circular_margin_mach)
-
-    dict_ef_eb_delta_net = cmc.calc_ef_net(dict_ef_eb_delta_prim,
-                                           dict_ef_eb_delta_circ)
-    dict_vf_eb_delta_emp_net = cmc.calc_vf_net(dict_vf_eb_delta_emp_prim,
-                                               dict_vf_eb_delta_emp_circ)
-    dict_vf_eb_delta_va_net = cmc.calc_vf_net(dict_vf_eb_delta_va_prim,
-                                              dict_vf_eb_delta_va_circ)
+    dict_base = dict_graph['base']
+    df_y_base_tno_primary = cmr.get_y_tno_primary(df_y_base_tno)
+    df_y_base_tno_circular = cmr.get_y_tno_circular(df_y_base_tno)
+    df_y_base_tno_circular.to_csv(
+        cfg.RESULT_TXT_DIR_PATH+'y_base_tno_circular.txt',
+        sep='\t')
 
-    dict_meas_id_short_long = {}
-    with open(cfg.INPUT_DIR_PATH+cfg.LIST_MEAS_ID_SHORT_LONG_FILE_NAME,
-              'r') as (read_file):
-        csv_file = csv.reader(read_file, delimiter='\t')
-        for row_id, row in enumerate(csv_file):
-            if row_id:
-                meas_id, meas_short, meas_long = row
-                dict_meas_id_short_long[meas_id] = {}
-                dict_meas_id_short_long[meas_id]['short'] = meas_short
-                dict_meas_id_short_long[meas_id]['long'] = meas_long
+    dict_delta = dict_graph['delta']
+    df_y_delta_tno_primary = cmr.get_y_tno_primary(df_y_delta_tno)
+    df_y_delta_tno_circular = cmr.get_y_tno_circular(df_y_delta_tno)
+
+    dict_meas_id_short_long = read_dict_meas_id_short_long()
 
     cmw.write_y_tno(df_y_base_tno, dict_meas_id_short_long, 'base',
                     'all')
@@ -368,34 +531,42 @@ def main():
                     'all')
 
     '''Write results.'''
-    df_base_plt_prim, df_base_txt_prim = cmw.write_base(
-        dict_ef_eb_base_prim,
-        dict_vf_eb_base_emp_prim,
-        dict_vf_eb_base_va_prim)
-
-    df_base_plt_circ, df_base_txt_circ = cmw.write_base(
-        dict_ef_eb_base_circ,
-        dict_vf_eb_base_emp_circ,
-        dict_vf_eb_base_va_circ)
-
-    df_base_txt_circ_inc_direct = cmw.add_direct(df_base_txt_circ,
-                                                 df_base_cbs_emp,
-                                                 df_base_cbs_va)
-
-
-    d_cat_base = cmw.cat_base(df_base_txt_prim, df_base_txt_circ_inc_direct)
-    cmw.write_cat_base(d_cat_base)
-
-    d_cat_delta = cmw.cat_delta(dict_ef_eb_delta_prim,
-                                dict_vf_eb_delta_emp_prim,
-                                dict_vf_eb_delta_va_prim,
-                                dict_ef_eb_delta_circ,
-                                dict_vf_eb_delta_emp_circ,
-                                dict_vf_eb_delta_va_circ,
-                                df_delta_cbs_emp,
-                                df_delta_cbs_va)
-
-    cmw.write_cat_delta(d_cat_delta)
+    df_result = pd.concat(
+        [cmw.get_df_result('base',
+                           dict_base['ef_prim'],
+                           dict_base['vf_emp_prim'],
+                           dict_base['vf_va_prim'],
+                           dict_base['ef_circ'],
+                           dict_base['vf_emp_circ'],
+                           dict_base['vf_va_circ'],
+                           dict_base['cbs_emp'],
+                           dict_base['cbs_va']),
+         cmw.get_df_result('delta',
+                           dict_delta['ef_prim'],
+                           dict_delta['vf_emp_prim'],
+                           dict_delta['vf_va_prim'],
+                           dict_delta['ef_circ'],
+                           dict_delta['vf_emp_circ'],
+                           dict_delta['vf_va_circ'],
+                           dict_delta['cbs_emp'],
+                           dict_delta['cbs_va'])],
+        ignore_index=True)
+    cmw.write_result(df_result)
+
+    # Write attribution of footprints to pathways of block evaluation.
+    if cfg.CALC_BLOCK:
+        df_attr = pd.concat([cmw.get_df_attr('base', dict_base),
+                             cmw.get_df_attr('delta', dict_delta)],
+                            ignore_index=True)
+        cmw.write_result(df_attr, cfg.RESULT_ATTR_STORE_DIR_PATH)
+
+    # Text files of totals are derived from long-format results.
+    for variant in ['base', 'delta']:
+        df_cat = cmw.cat_result(df_result, variant)
+        cmw.write_cat_result(df_cat, variant)
+
+    # Write trace of stages, if enabled.
+    ut.write_trace()
 
 if __name__ == '__main__':
     main()
@@ -39,7 +39,6 @@ import csv
 import numpy as np
 
 import os
-import pickle
 
 import pandas as pd
 
@@ -65,9 +64,24 @@ def read_cbs_emp_2010():
     return dict_cbs_emp
 
 
-def read_y_tno():
+@ut.trace
+def read_y_tno(bool_bound=False):
     """ Read final demand baseline, scenario, and changes matrix
         in TNO classification.
+
+        Parameters:
+        -----------
+        bool_bound: boolean to also return low and high bounds of baseline
+        and scenario per measure. Bounds are number of products times low
+        and high price per product.
+
+        Returns:
+        --------
+        df_base, df_scen, df_delta: DataFrames with final demand.
+        dict_bound: dictionary with DataFrame per 'base' or 'scen', and
+        'lo' or 'hi', with measures as columns. Key 'base_box' has low and
+        high bounds of df_base, with same first occurrence per product.
+        Only if bool_bound.
     """
     ut.log(('Reading final demand baseline, scenario, and changes matrix '
             'in TNO classification.'))
@@ -177,12 +191,20 @@ def read_y_tno():
 
     dict_base_df_dict_meas_prod_sec = {}
     dict_scen_df_dict_meas_prod_sec = {}
+    dict_bound_dict_meas_prod_sec = {}
+    for time in ['base', 'scen']:
+        dict_bound_dict_meas_prod_sec[time] = {}
+        for bound in ['lo', 'hi']:
+            dict_bound_dict_meas_prod_sec[time][bound] = {}
     dict_delta_df_dict_meas_prod_sec = {}
 
     # For each measure, for each circularity sector, read rows.
     for meas_id in dict_meas_id_sec_row:
         dict_base_df_dict_meas_prod_sec[meas_id] = {}
         dict_scen_df_dict_meas_prod_sec[meas_id] = {}
+        for time in dict_bound_dict_meas_prod_sec:
+            for bound in dict_bound_dict_meas_prod_sec[time]:
+                dict_bound_dict_meas_prod_sec[time][bound][meas_id] = {}
         dict_delta_df_dict_meas_prod_sec[meas_id] = {}
         for sec_nl in dict_meas_id_sec_row[meas_id]:
             prod_iter = 0
@@ -262,6 +284,24 @@ def read_y_tno():
                                                               sec_en] = (
                                                                   delta_mon)
 
+                    # Low and high bounds from price range per product.
+                    dict_tup_bound = {}
+                    dict_tup_bound['base'] = (str_base_unit,
+                                              str_base_mon_lo,
+                                              str_base_mon_hi)
+                    dict_tup_bound['scen'] = (str_scen_unit,
+                                              str_scen_mon_lo,
+                                              str_scen_mon_hi)
+                    for time in dict_tup_bound:
+                        str_unit, str_lo, str_hi = dict_tup_bound[time]
+                        dict_bound_meas = dict_bound_dict_meas_prod_sec[time]
+                        dict_bound_meas['lo'][meas_id][prod_en, sec_en] = (
+                            float(str_unit)*float(str_lo) /
+                            cfg.TNO_EURO_KILO2MEGA_SCALAR)
+                        dict_bound_meas['hi'][meas_id][prod_en, sec_en] = (
+                            float(str_unit)*float(str_hi) /
+                            cfg.TNO_EURO_KILO2MEGA_SCALAR)
+
     dict_base = {}
     dict_base[0] = {}
     for meas_id in dict_base_df_dict_meas_prod_sec:
@@ -278,7 +318,33 @@ def read_y_tno():
     df_delta = pd.DataFrame.from_dict(dict_delta_df_dict_meas_prod_sec)
     df_delta = df_delta.fillna(0)
 
-    return df_base, df_scen, df_delta
+    if not bool_bound:
+        return df_base, df_scen, df_delta
+
+    dict_bound = {}
+    for time in dict_bound_dict_meas_prod_sec:
+        dict_bound[time] = {}
+        for bound in dict_bound_dict_meas_prod_sec[time]:
+            df_bound = pd.DataFrame.from_dict(
+                dict_bound_dict_meas_prod_sec[time][bound])
+            dict_bound[time][bound] = df_bound.reindex(
+                index=df_delta.index,
+                columns=df_delta.columns).fillna(0)
+
+    # Box of baseline, collapsed over measures like df_base.
+    dict_bound['base_box'] = {}
+    for bound in dict_bound_dict_meas_prod_sec['base']:
+        dict_base_bound = {}
+        dict_base_bound[0] = {}
+        dict_bound_meas = dict_bound_dict_meas_prod_sec['base'][bound]
+        for meas_id in dict_bound_meas:
+            for tup_prod_sec in dict_bound_meas[meas_id]:
+                val = dict_bound_meas[meas_id][tup_prod_sec]
+                if tup_prod_sec not in dict_base_bound[0]:
+                    dict_base_bound[0][tup_prod_sec] = val
+        dict_bound['base_box'][bound] = pd.DataFrame.from_dict(
+            dict_base_bound).reindex(index=df_base.index)
+    return df_base, df_scen, df_delta, dict_bound
 
 
 def get_y_tno_primary(df_y_tno):
@@ -317,23 +383,37 @@ def get_y_tno_circular(df_y_tno):
     return df_y_tno_primary
 
 
+@ut.trace
 def read_io_eb_2010_proc():
     """ Read Input-Output tables from EXIOBASE 2010.'
 
     """
     ut.log('Reading Input-Output tables from EXIOBASE 2010.')
-    # If EXIOBASE has already been parsed, read the pickle.
-    if cfg.DICT_EB_PROC_FILE_NAME in os.listdir(cfg.INPUT_DIR_PATH):
-        dict_io_eb_2010 = pickle.load(
-            open(cfg.INPUT_DIR_PATH+cfg.DICT_EB_PROC_FILE_NAME,
-                 'rb'))
-    # Else, parse and process EXIOBASE and optionally save for future runs
-    else:
+    # Processed EXIOBASE is stored under a key of raw EXIOBASE and
+    # processing code, such that changes in either trigger a rebuild.
+    eb_proc_dir_path = cfg.INPUT_DIR_PATH+cfg.EB_PROC_DIR_NAME
+    eb_proc_key = eb.get_proc_key()
+    eb_proc_key_dir_path = eb_proc_dir_path+eb_proc_key+'/'
+
+    # If EXIOBASE has already been processed, open the store memory-mapped.
+    dict_io_eb_2010 = eb.load_proc(eb_proc_key_dir_path)
+    if dict_io_eb_2010 is not None:
+        dict_io_eb_2010['proc_dir_path'] = eb_proc_key_dir_path
+        return dict_io_eb_2010
+
+    # Else, parse and process EXIOBASE, and optionally save for future runs.
+    # Other runs wait for the lock, and then reuse the store.
+    os.makedirs(eb_proc_dir_path, exist_ok=True)
+    with ut.lock_file(eb_proc_dir_path+cfg.EB_PROC_LOCK_FILE_NAME):
+        dict_io_eb_2010 = eb.load_proc(eb_proc_key_dir_path)
+        if dict_io_eb_2010 is not None:
+            ut.log('Processed EXIOBASE was built by other run.')
+            dict_io_eb_2010['proc_dir_path'] = eb_proc_key_dir_path
+            return dict_io_eb_2010
         dict_io_eb_2010 = eb.process(eb.parse())
         if cfg.SAVE_EB:
-            pickle.dump(dict_io_eb_2010,
-                        open(cfg.INPUT_DIR_PATH+cfg.DICT_EB_PROC_FILE_NAME,
-                             'wb'))
+            eb.save_proc(dict_io_eb_2010, eb_proc_key_dir_path)
+            dict_io_eb_2010['proc_dir_path'] = eb_proc_key_dir_path
     return dict_io_eb_2010
 
 
@@ -378,7 +458,8 @@ def read_dict_impact():
     return dict_impact
 
 
-def gen_bridge_sbi_eb(dict_io_eb_2010):
+@ut.trace
+def gen_bridge_sbi_eb(df_eb_y_cntr_nl):
     """ Generate bridge matrix from SBI to EB classification.
 
     """
@@ -388,12 +469,7 @@ def gen_bridge_sbi_eb(dict_io_eb_2010):
         sep = '\t',
         index_col = [0],
         header = [0,1])
-    df_eb_y = dict_io_eb_2010['tY']
-
-    # Sum final demand to country level.
-    df_eb_y_cntr = df_eb_y.sum(axis=1, level=0)
-    df_eb_y_nl = df_eb_y_cntr['NL']
-    df_eb_y_nl_nl = df_eb_y_nl['NL']
+    df_eb_y_nl_nl = df_eb_y_cntr_nl['NL']
     df_eb_y_nl_nl_diag = pd.DataFrame(np.diag(df_eb_y_nl_nl),
                                       index = df_eb_y_nl_nl.index,
                                       columns = df_eb_y_nl_nl.index)
@@ -450,3 +526,24 @@ def read_b_cpa_prim_eb():
         index_col=0,
         sep='\t')
     return df_b_cpa_prim_eb
+
+
+def read_tech():
+    """ Read technology scenarios, one factor on technical coefficients
+        of EXIOBASE per row.
+
+        Returns:
+        --------
+        df_tech: DataFrame with columns TECH_LIST_COL. Empty row region or
+        product applies to all regions or products.
+
+    """
+    ut.log('Reading technology scenarios.')
+    df_tech = pd.read_csv(cfg.INPUT_DIR_PATH+cfg.TECH_FILE_NAME,
+                          sep='\t',
+                          header=0,
+                          names=cfg.TECH_LIST_COL,
+                          dtype=str,
+                          keep_default_na=False)
+    df_tech['factor'] = df_tech['factor'].astype(float)
+    return df_tech
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+""" Local scenario server for paper on
+    Global environmental and socio-economic impacts of a transition to a
+    circular economy in metal and electrical products: a Dutch case-study
+
+    Copyright (c) 2020 Bertram F. de Boer
+
+    Bertram F. de Boer
+    Faculty of Science
+    Institute of Environmental Sciences (CML)
+    Department of Industrial Ecology
+    Einsteinweg 2
+    2333 CC Leiden
+    The Netherlands
+
+    +31 (0)71 527 1478
+    b.f.de.boer@cml.leidenuniv.nl
+
+    Permission is hereby granted, free of charge, to any person obtaining a
+    copy of this software and associated documentation files (the "Software"),
+    to deal in the Software without restriction, including without limitation
+    the rights to use, copy, modify, merge, publish, distribute, sublicense,
+    and/or sell copies of the Software, and to permit persons to whom the
+    Software is furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in
+    all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+    FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+    DEALINGS IN THE SOFTWARE.
+"""
+
+import http.server
+import io
+import json
+import time
+
+import pandas as pd
+
+import cfg
+import circular_measures_main as cmm
+import circular_measures_write as cmw
+
+import utils as ut
+
+
+def read_y_tno_text(str_y_tno):
+    """ Read delta of final demand in TNO classification from text.
+
+        Parameters:
+        -----------
+        str_y_tno: tab separated table in layout of read_y_tno output,
+        with product and sector as index, and measure IDs as columns.
+
+        Returns:
+        --------
+        df_y_tno: DataFrame with delta of final demand per measure.
+
+    """
+    df_y_tno = pd.read_csv(io.StringIO(str_y_tno),
+                           sep='\t',
+                           index_col=[0, 1])
+    df_y_tno.columns = [int(meas_id) for meas_id in df_y_tno.columns]
+    return df_y_tno.astype(float)
+
+
+def get_list_dict_cat(df_cat):
+    """ Flatten totals per activity, footprint, and region to records.
+
+        Parameters:
+        -----------
+        df_cat: DataFrame with totals, as returned by cat_result.
+
+    """
+    list_dict_cat = []
+    for row in df_cat.itertuples(index=False):
+        list_dict_cat.append({'activity': row.Activity,
+                              'footprint': row.Footprint,
+                              'unit': row.Unit,
+                              'region': row.Region,
+                              'value': float(row.Value)})
+    return list_dict_cat
+
+
+def calc_result(dict_model, df_y_delta_tno):
+    """ Calculate totals of delta of footprints, overall and per measure.
+        Totals are derived from long-format results, as in main.
+
+        Parameters:
+        -----------
+        dict_model: dictionary with invariants of the model.
+        df_y_delta_tno: DataFrame with delta of final demand per measure.
+
+        Returns:
+        --------
+        dict_result: dictionary with records of totals, and records per
+        measure.
+
+    """
+    dict_delta = cmm.calc_delta_tno(dict_model, df_y_delta_tno)
+    df_result = cmw.get_df_result('delta',
+                                  dict_delta['ef_prim'],
+                                  dict_delta['vf_emp_prim'],
+                                  dict_delta['vf_va_prim'],
+                                  dict_delta['ef_circ'],
+                                  dict_delta['vf_emp_circ'],
+                                  dict_delta['vf_va_circ'],
+                                  dict_delta['cbs_emp'],
+                                  dict_delta['cbs_va'])
+
+    dict_result = {}
+    dict_result['total'] = get_list_dict_cat(
+        cmw.cat_result(df_result, 'delta'))
+    dict_result['meas'] = {}
+    for meas_id, df_result_meas in df_result.groupby('measure', sort=False):
+        dict_result['meas'][str(meas_id)] = get_list_dict_cat(
+            cmw.cat_result(df_result_meas, 'delta'))
+    return dict_result
+
+
+def make_handler(dict_model):
+    """ Make request handler serving the model.
+
+        GET /health reports the server is up. POST /delta takes a tab
+        separated delta of final demand, and returns totals as JSON.
+
+    """
+    class Handler(http.server.BaseHTTPRequestHandler):
+
+        def send_json(self, status, dict_body):
+            bytes_body = json.dumps(dict_body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(bytes_body)))
+            self.end_headers()
+            self.wfile.write(bytes_body)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self.send_json(200, {'status': 'ok'})
+            else:
+                self.send_json(404, {'error': 'Unknown path.'})
+
+        def do_POST(self):
+            if self.path != '/delta':
+                self.send_json(404, {'error': 'Unknown path.'})
+                return
+            length = int(self.headers.get('Content-Length', 0))
+            str_y_tno = self.rfile.read(length).decode('utf-8')
+            time_start = time.time()
+            try:
+                df_y_delta_tno = read_y_tno_text(str_y_tno)
+                dict_result = calc_result(dict_model, df_y_delta_tno)
+            except Exception as error:
+                # Keep serving, and report malformed tables to client.
+                ut.log('Failed to evaluate delta: {!r}'.format(error))
+                self.send_json(400, {'error': repr(error)})
+                return
+            dict_result['seconds'] = time.time()-time_start
+            self.send_json(200, dict_result)
+
+        def log_message(self, format, *args):
+            ut.log('{} {}'.format(self.address_string(), format % args))
+
+    return Handler
+
+
+def main():
+    """ Build model once and serve scenario requests.
+
+    """
+    ut.makedirs()
+    dict_model = cmm.read_model()
+    server = http.server.HTTPServer((cfg.SERVER_HOST, cfg.SERVER_PORT),
+                                    make_handler(dict_model))
+    ut.log('Serving scenarios on http://{}:{}'.format(cfg.SERVER_HOST,
+                                                     cfg.SERVER_PORT))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
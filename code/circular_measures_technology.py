@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+""" Technology scenarios for paper on
+    Global environmental and socio-economic impacts of a transition to a
+    circular economy in metal and electrical products: a Dutch case-study
+
+    Copyright (c) 2020 Bertram F. de Boer
+
+    Bertram F. de Boer
+    Faculty of Science
+    Institute of Environmental Sciences (CML)
+    Department of Industrial Ecology
+    Einsteinweg 2
+    2333 CC Leiden
+    The Netherlands
+
+    +31 (0)71 527 1478
+    b.f.de.boer@cml.leidenuniv.nl
+
+    Permission is hereby granted, free of charge, to any person obtaining a
+    copy of this software and associated documentation files (the "Software"),
+    to deal in the Software without restriction, including without limitation
+    the rights to use, copy, modify, merge, publish, distribute, sublicense,
+    and/or sell copies of the Software, and to permit persons to whom the
+    Software is furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in
+    all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+    FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+    DEALINGS IN THE SOFTWARE.
+"""
+
+import circular_measures_calc as cmc
+import circular_measures_main as cmm
+import circular_measures_read as cmr
+import circular_measures_write as cmw
+
+import utils as ut
+
+
+def main():
+    """ Evaluate delta of footprints under technology scenarios.
+
+    """
+    ut.makedirs()
+    dict_model = cmm.read_model()
+    df_y_base_tno, df_y_scen_tno, df_y_delta_tno = cmr.read_y_tno()
+    df_tech = cmr.read_tech()
+
+    # Compose multipliers of baseline technology once, then update them
+    # per scenario with the factorization of baseline technology.
+    dict_mult_tno = cmc.calc_mult_tno(dict_model)
+    df_fp_tech = cmc.calc_fp_tno_tech(dict_model,
+                                      dict_mult_tno,
+                                      df_y_delta_tno,
+                                      df_tech)
+    cmw.write_delta_tech(df_fp_tech)
+
+    # Write trace of stages, if enabled.
+    ut.write_trace()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+""" Uncertainty analysis for paper on
+    Global environmental and socio-economic impacts of a transition to a
+    circular economy in metal and electrical products: a Dutch case-study
+
+    Copyright (c) 2020 Bertram F. de Boer
+
+    Bertram F. de Boer
+    Faculty of Science
+    Institute of Environmental Sciences (CML)
+    Department of Industrial Ecology
+    Einsteinweg 2
+    2333 CC Leiden
+    The Netherlands
+
+    +31 (0)71 527 1478
+    b.f.de.boer@cml.leidenuniv.nl
+
+    Permission is hereby granted, free of charge, to any person obtaining a
+    copy of this software and associated documentation files (the "Software"),
+    to deal in the Software without restriction, including without limitation
+    the rights to use, copy, modify, merge, publish, distribute, sublicense,
+    and/or sell copies of the Software, and to permit persons to whom the
+    Software is furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in
+    all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+    FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+    DEALINGS IN THE SOFTWARE.
+"""
+
+import cfg
+import circular_measures_calc as cmc
+import circular_measures_main as cmm
+import circular_measures_read as cmr
+import circular_measures_write as cmw
+
+import utils as ut
+
+
+def main():
+    """ Propagate low and high bounds of TNO final demand to footprints.
+
+    """
+    ut.makedirs()
+    dict_model = cmm.read_model()
+
+    # Read delta of final demand with low and high bounds per measure.
+    df_y_base_tno, df_y_scen_tno, df_y_delta_tno, dict_bound = (
+        cmr.read_y_tno(bool_bound=True))
+
+    # Compose multipliers of TNO final demand once, then sample.
+    dict_mult_tno = cmc.calc_mult_tno(dict_model)
+    ut.log('Sampling {} realizations of final demand per measure.'.format(
+        cfg.MC_N_SAMPLE))
+    df_fp_mc = cmc.calc_fp_tno_mc(dict_mult_tno, df_y_delta_tno, dict_bound)
+    cmw.write_delta_mc(df_fp_mc)
+
+    # Exact envelopes, by splitting multipliers by sign.
+    df_fp_bound = cmc.calc_fp_tno_bound(dict_mult_tno,
+                                        df_y_delta_tno,
+                                        dict_bound)
+    cmw.write_delta_bound(df_fp_bound)
+    dict_mult_tno_ind = cmc.calc_mult_tno(dict_model, bool_agg=False)
+    dict_delta_bound = cmc.calc_delta_bound(dict_model,
+                                            dict_mult_tno_ind,
+                                            df_y_delta_tno,
+                                            dict_bound)
+    cmw.write_delta_bound_ind(dict_delta_bound)
+
+    # Exact envelopes of baseline, over box of collapsed baseline, with
+    # multipliers of baseline recipes.
+    dict_mult_tno_base = cmc.calc_mult_tno(dict_model, variant='base')
+    df_fp_base_bound = cmc.calc_fp_tno_base_bound(dict_mult_tno_base,
+                                                  df_y_base_tno,
+                                                  dict_bound)
+    cmw.write_base_bound(df_fp_base_bound)
+    dict_mult_tno_base_ind = cmc.calc_mult_tno(dict_model,
+                                               bool_agg=False,
+                                               variant='base')
+    dict_base_bound = cmc.calc_base_bound(dict_model,
+                                          dict_mult_tno_base_ind,
+                                          df_y_base_tno,
+                                          dict_bound)
+    cmw.write_base_bound_ind(dict_base_bound)
+
+    # Write trace of stages, if enabled.
+    ut.write_trace()
+
+
+if __name__ == '__main__':
+    main()
@@ -35,322 +35,21 @@
     DEALINGS IN THE SOFTWARE.
 """
 import csv
-import pandas as pd
-
-import cfg
-
-
-def arrange_ef_result(dict_ef_eb_delta):
-    """ Arrange EF results.
-
-    """
-    dict_ef_eb_delta_prep = {}
-    for meas_id in dict_ef_eb_delta:
-        for fp_cat in dict_ef_eb_delta[meas_id]:
-            df_fp = dict_ef_eb_delta[meas_id][fp_cat]
-            dict_fp = df_fp.to_dict()
-            for reg in dict_fp:
-                for fp in dict_fp[reg]:
-                    val = dict_fp[reg][fp]
-                    if reg not in dict_ef_eb_delta_prep:
-                        dict_ef_eb_delta_prep[reg] = {}
-                    if fp_cat not in dict_ef_eb_delta_prep[reg]:
-                        dict_ef_eb_delta_prep[reg][fp_cat] = {}
-                    if meas_id not in dict_ef_eb_delta_prep[reg][fp_cat]:
-                        dict_ef_eb_delta_prep[reg][fp_cat][meas_id] = {}
-                    dict_ef_eb_delta_prep[reg][fp_cat][meas_id][fp] = val
-
-    dict_ef_eb_delta_prep_df = {}
-    for reg in dict_ef_eb_delta_prep:
-        dict_ef_eb_delta_prep_df[reg] = {}
-        for fp_cat in dict_ef_eb_delta_prep[reg]:
-            df_fp = pd.DataFrame(dict_ef_eb_delta_prep[reg][fp_cat])
-            dict_ef_eb_delta_prep_df[reg][fp_cat] = df_fp
-    return dict_ef_eb_delta_prep_df
-
-
-def arrange_vf_result(dict_vf_eb_delta):
-    """ Arrange VF results.
-
-    """
-    dict_vf_eb_delta_prep = {}
-    dict_df_meas_id_fp = {}
-    for meas_id in dict_vf_eb_delta:
-        dict_df_meas_id_fp[meas_id] = {}
-        df_fp = dict_vf_eb_delta[meas_id]
-        dict_fp = df_fp.to_dict()
-        for reg in dict_fp:
-            for fp in dict_fp[reg]:
-                val = dict_fp[reg][fp]
-                if reg not in dict_vf_eb_delta_prep:
-                    dict_vf_eb_delta_prep[reg] = {}
-                if meas_id not in dict_vf_eb_delta_prep[reg]:
-                    dict_vf_eb_delta_prep[reg][meas_id] = {}
-                dict_vf_eb_delta_prep[reg][meas_id][fp] = val
-
-    dict_vf_eb_delta_prep_df = {}
-    for reg in dict_vf_eb_delta_prep:
-        dict_vf_eb_delta_prep_df[reg] = {}
-        df_fp = pd.DataFrame(dict_vf_eb_delta_prep[reg])
-        dict_vf_eb_delta_prep_df[reg] = df_fp
-    return dict_vf_eb_delta_prep_df
-
-
-def prepare_base_results(dict_ef_eb_base,
-                         dict_vf_eb_base_emp,
-                         dict_vf_eb_base_va):
-    """ Prepare baseline results.
-
-    """
-
-    df_base_plt = pd.DataFrame()
-    for tup_reg in cfg.LIST_TUP_REG:
-        (reg, list_cntr) = tup_reg
-
-        cf_total = dict_ef_eb_base[reg]['Carbon'].sum()
-        mf_total = dict_ef_eb_base[reg]['Material use'].sum()
-        wf_total = dict_ef_eb_base[reg]['Water consumption'].sum()
-        lf_total = dict_ef_eb_base[reg]['Land use'].sum()
-        emp_total = dict_vf_eb_base_emp[reg].sum()
-        va_total = dict_vf_eb_base_va[reg].sum()
-
-        cf_col_name_plt, cf_col_name_txt, cf_scalar = cfg.TUP_CF_SCALAR_BASE
-        mf_col_name_plt, mf_col_name_txt, mf_scalar = cfg.TUP_MF_SCALAR_BASE
-        wf_col_name_plt, wf_col_name_txt, wf_scalar = cfg.TUP_WF_SCALAR_BASE
-        lf_col_name_plt, lf_col_name_txt, lf_scalar = cfg.TUP_LF_SCALAR_BASE
-        job_col_name_plt, job_col_name_txt, job_scalar = (
-            cfg.TUP_JOB_SCALAR_BASE)
-        va_col_name_plt, va_col_name_txt, va_scalar = (
-            cfg.TUP_VA_SCALAR_BASE)
-
-        cf_total = cf_total/cf_scalar
-        mf_total = mf_total/mf_scalar
-        wf_total = wf_total/wf_scalar
-        lf_total = lf_total/lf_scalar
-        emp_total = emp_total/job_scalar
-        va_total = va_total/va_scalar
-
-        df_plt = pd.concat([cf_total,
-                            mf_total,
-                            wf_total,
-                            lf_total,
-                            emp_total,
-                            va_total], axis=1)
-        df_plt.columns = [cf_col_name_plt,
-                          mf_col_name_plt,
-                          wf_col_name_plt,
-                          lf_col_name_plt,
-                          job_col_name_plt,
-                          va_col_name_plt]
-        df_plt.index = [reg]
-        df_base_plt = df_base_plt.append(df_plt)
-
-    df_base_txt = df_base_plt.copy()
-    df_base_txt.columns = [cf_col_name_txt,
-                           mf_col_name_txt,
-                           wf_col_name_txt,
-                           lf_col_name_txt,
-                           job_col_name_txt,
-                           va_col_name_txt]
-    return df_base_plt, df_base_txt
-
-
-def prepare_delta_result(dict_ef_eb_delta,
-                         dict_vf_eb_delta_emp,
-                         dict_vf_eb_delta_va):
-    """ Prepare delta results.
-
-    """
-
-    list_df_result_plt = []
-    list_df_result_txt = []
-
-    list_fp_tup_ef_scalar = [('Carbon', cfg.TUP_CF_SCALAR_DELTA),
-                             ('Material use', cfg.TUP_MF_SCALAR_DELTA),
-                             ('Water consumption', cfg.TUP_WF_SCALAR_DELTA),
-                             ('Land use', cfg.TUP_LF_SCALAR_DELTA)]
-
-    for fp_tup_ef_scalar in list_fp_tup_ef_scalar:
-        df_result_ef_plt = pd.DataFrame()
-        df_result_ef_txt = pd.DataFrame()
-        fp_cat, tup_ef_scalar = fp_tup_ef_scalar
-        fp_plt, fp_txt, fp_scalar = tup_ef_scalar
-        for tup_reg in cfg.LIST_TUP_REG:
-            (reg, list_cntr) = tup_reg
-            if df_result_ef_plt.empty:
-                df_result_ef_plt = dict_ef_eb_delta[reg][fp_cat].copy()
-                df_result_ef_plt = df_result_ef_plt.T/fp_scalar
-                df_result_ef_plt.columns = [(reg, fp_plt)]
-                df_result_ef_txt = df_result_ef_plt.copy()
-                df_result_ef_txt.columns = [(reg, fp_txt)]
-            else:
-                df_result_ef_plt[(reg, fp_plt)] = (
-                    dict_ef_eb_delta[reg][fp_cat].T/fp_scalar)
-                df_result_ef_txt[(reg, fp_txt)] = (
-                    dict_ef_eb_delta[reg][fp_cat].T/fp_scalar)
-
-        list_df_result_plt.append(df_result_ef_plt)
-        list_df_result_txt.append(df_result_ef_txt)
-
-    dict_vf_eb_sum = {}
-    for reg in dict_vf_eb_delta_emp:
-        df = pd.DataFrame(dict_vf_eb_delta_emp[reg].sum(axis=0).T)
-        df.columns = [(reg, 'Employment [k]')]
-        dict_vf_eb_sum[reg] = df
-
-    df_result_vf_plt = pd.DataFrame()
-    df_result_vf_txt = pd.DataFrame()
-    fp_plt, fp_txt, fp_scalar = cfg.TUP_JOB_SCALAR_DELTA
-    for tup_reg in cfg.LIST_TUP_REG:
-        (reg, list_cntr) = tup_reg
-        if df_result_vf_plt.empty:
-            df_result_vf_plt = dict_vf_eb_sum[reg].copy()/fp_scalar
-            df_result_vf_plt.columns = [(reg, fp_plt)]
-            df_result_vf_txt = df_result_vf_plt.copy()
-            df_result_vf_txt.columns = [(reg, fp_txt)]
-        else:
-            df_result_vf_plt[reg, fp_plt] = dict_vf_eb_sum[reg]/fp_scalar
-            df_result_vf_txt[reg, fp_txt] = dict_vf_eb_sum[reg]/fp_scalar
-
-    list_df_result_plt.append(df_result_vf_plt)
-    list_df_result_txt.append(df_result_vf_txt)
-
-    dict_vf_eb_va_sum = {}
-    for reg in dict_vf_eb_delta_va:
-        df = pd.DataFrame(dict_vf_eb_delta_va[reg].sum(axis=0).T)
-        df.columns = [(reg, 'Value added [M€]')]
-        dict_vf_eb_va_sum[reg] = df
-
-    df_result_vf_va_plt = pd.DataFrame()
-    df_result_vf_va_txt = pd.DataFrame()
-    fp_plt, fp_txt, fp_scalar = cfg.TUP_VA_SCALAR_DELTA
-
-    for tup_reg in cfg.LIST_TUP_REG:
-        (reg, list_cntr) = tup_reg
-        if df_result_vf_va_plt.empty:
-            df_result_vf_va_plt = dict_vf_eb_va_sum[reg].copy()/fp_scalar
-            df_result_vf_va_plt.columns = [(reg, fp_plt)]
-            df_result_vf_va_txt = df_result_vf_va_plt.copy()
-            df_result_vf_va_txt.columns = [(reg, fp_txt)]
-        else:
-            df_result_vf_va_plt[reg, fp_plt] = (
-                dict_vf_eb_va_sum[reg]/fp_scalar)
-            df_result_vf_va_txt[reg, fp_txt] = (
-                dict_vf_eb_va_sum[reg]/fp_scalar)
-
-    list_df_result_plt.append(df_result_vf_va_plt)
-    list_df_result_txt.append(df_result_vf_va_txt)
-
-    return list_df_result_plt, list_df_result_txt
-
-
-def store_base(df_base_txt, file_name_pattern):
-    """ Store base results.
-
-    """
-
-    dict_base_txt = df_base_txt.to_dict()
-
-    file_name = '{}.txt'.format(file_name_pattern)
-
-    dict_base_sum = {}
-    for tup_fp in dict_base_txt:
-        dict_base_sum[tup_fp] = 0
-        for reg in dict_base_txt[tup_fp]:
-            val = dict_base_txt[tup_fp][reg]
-            dict_base_sum[tup_fp] += val
-
-    with open(cfg.RESULT_TXT_DIR_PATH+file_name, 'w') as write_file:
-        csv_file = csv.writer(write_file, delimiter='\t', lineterminator='\n')
-        row_write = ['Impact category',
-                     'Unit',
-                     'Region',
-                     'Value abs']
-        csv_file.writerow(row_write)
-        for tup_imp_cat_unit in dict_base_txt:
-            imp_cat, unit = tup_imp_cat_unit
-            for reg in dict_base_txt[tup_imp_cat_unit]:
-                val_abs = dict_base_txt[tup_imp_cat_unit][reg]
-                row_write = [imp_cat, unit, reg, val_abs]
-                csv_file.writerow(row_write)
-
-
-def store_delta(list_df_delta_txt, file_name_pattern):
-    """ Store delta results.
-
-    """
+import os
+import shutil
 
-    delta_file_name = '{}.txt'.format(file_name_pattern)
-    with open(cfg.RESULT_TXT_DIR_PATH+delta_file_name, 'w') as write_file:
-        csv_file = csv.writer(write_file, delimiter='\t', lineterminator='\n')
-        row_write = ['Measure ID',
-                     'Impact category',
-                     'Unit',
-                     'Region',
-                     'Value']
-        csv_file.writerow(row_write)
-        for df_delta_txt in list_df_delta_txt:
-            dict_delta_txt = df_delta_txt.to_dict()
-            for tup_reg_fp in dict_delta_txt:
-                reg, tup_fp = tup_reg_fp
-                fp, fp_unit = tup_fp
-                for meas_id in dict_delta_txt[tup_reg_fp]:
-                    val = dict_delta_txt[tup_reg_fp][meas_id]
-                    row_write = [meas_id, fp, fp_unit, reg, val]
-                    csv_file.writerow(row_write)
-
-
-def add_direct(df_base_txt,
-               df_base_cbs_emp,
-               df_base_cbs_va):
-    df_base_txt_incl_direct = df_base_txt.copy()
-    df_base_txt_incl_direct[cfg.TUP_JOB_SCALAR_BASE[1]][cfg.TUP_NL[0]] = (
-        df_base_txt[cfg.TUP_JOB_SCALAR_BASE[1]][cfg.TUP_NL[0]]+float(
-            df_base_cbs_emp.values))
-    df_base_txt_incl_direct[cfg.TUP_VA_SCALAR_BASE[1]][cfg.TUP_NL[0]] = (
-        df_base_txt[cfg.TUP_VA_SCALAR_BASE[1]][cfg.TUP_NL[0]]+float(
-            df_base_cbs_va.values)/cfg.TUP_VA_SCALAR_BASE[2])
-
-    return df_base_txt_incl_direct
-
-
-def write_base(dict_ef_eb_base,
-               dict_vf_eb_base_emp,
-               dict_vf_eb_base_va):
-    """ Write base results.
-
-    """
-
-    dict_ef_eb_base_prep = arrange_ef_result(dict_ef_eb_base)
-    dict_vf_eb_base_emp_prep = arrange_vf_result(dict_vf_eb_base_emp)
-    dict_vf_eb_base_va_prep = arrange_vf_result(dict_vf_eb_base_va)
-
-    df_base_plt, df_base_txt = prepare_base_results(dict_ef_eb_base_prep,
-                                                    dict_vf_eb_base_emp_prep,
-                                                    dict_vf_eb_base_va_prep)
-
-    return df_base_plt, df_base_txt
-
-
-def write_delta(dict_ef_eb_delta,
-                dict_vf_eb_delta_emp,
-                dict_vf_eb_delta_va):
-    """ Write delta results.
-
-    """
-
-    dict_ef_eb_delta_prep = arrange_ef_result(dict_ef_eb_delta)
-    dict_vf_eb_delta_emp_prep = arrange_vf_result(dict_vf_eb_delta_emp)
-    dict_vf_eb_delta_va_prep = arrange_vf_result(dict_vf_eb_delta_va)
+import pandas as pd
 
-    list_df_delta_plt, list_df_delta_txt = (
-        prepare_delta_result(dict_ef_eb_delta_prep,
-                             dict_vf_eb_delta_emp_prep,
-                             dict_vf_eb_delta_va_prep))
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
 
-    return list_df_delta_plt, list_df_delta_txt
+import cfg
+import utils as ut
 
 
+@ut.trace
 def write_y_tno(df, dict_meas_id_short_long, time, sector):
     """ Write final demand in TNO classification.
 
@@ -432,180 +131,346 @@ def write_va_direct(df_va, time):
                 csv_file.writerow(row_write)
 
 
-def cat_base(df_base_txt_prim, df_base_txt_circ_inc_direct):
-    d_cat_base = {}
-    d_cat_base['Prim'] = {}
-    d_base_txt_prim = df_base_txt_prim.to_dict()
-    for t_fp in d_base_txt_prim:
-        d_cat_base['Prim'][t_fp] = {}
-        for reg in d_base_txt_prim[t_fp]:
-            val = d_base_txt_prim[t_fp][reg]
-            d_cat_base['Prim'][t_fp][reg] = val
-
-    d_cat_base['Circ'] = {}
-    d_base_txt_circ_inc_direct = df_base_txt_circ_inc_direct.to_dict()
-    for t_fp in d_base_txt_circ_inc_direct:
-        d_cat_base['Circ'][t_fp] = {}
-        for reg in d_base_txt_circ_inc_direct[t_fp]:
-            val = d_base_txt_circ_inc_direct[t_fp][reg]
-            d_cat_base['Circ'][t_fp][reg] = val
-    return d_cat_base
-
-def write_cat_base(d_cat_base):
-    with open(cfg.RESULT_TXT_DIR_PATH+'d_cat_base.txt', 'w') as write_file:
-        csv_file = csv.writer(write_file, delimiter='\t', lineterminator='\n')
-        row_write = ['Region',
-                     'Activity',
-                     'Footprint ID',
-                     'Footprint',
-                     'Value',
-                     'Unit']
-        csv_file.writerow(row_write)
-        for act in d_cat_base:
-            for t_fp_id, t_fp in enumerate(d_cat_base[act]):
-                fp, unit = t_fp
-                for reg in d_cat_base[act][t_fp]:
-                    val = d_cat_base[act][t_fp][reg]
-                    row_write = [reg, act, t_fp_id, fp, val, unit]
-                    csv_file.writerow(row_write)
+@ut.trace
+def get_tup_scalar(variant):
+    """ Get scalars and labels of footprints, employment, and value added
+        in reporting units of variant.
 
-def cat_delta(dict_ef_eb_delta_prim,
-              dict_vf_eb_delta_emp_prim,
-              dict_vf_eb_delta_va_prim,
-              dict_ef_eb_delta_circ,
-              dict_vf_eb_delta_emp_circ,
-              dict_vf_eb_delta_va_circ,
-              df_delta_cbs_emp,
-              df_delta_cbs_va):
-    d_fp_tup_ef_scalar = {'Carbon': cfg.TUP_CF_SCALAR_DELTA,
-                      'Material use': cfg.TUP_MF_SCALAR_DELTA,
-                      'Water consumption': cfg.TUP_WF_SCALAR_DELTA,
-                      'Land use': cfg.TUP_LF_SCALAR_DELTA}
-    d_cat_delta = {}
+    """
+    if variant == 'base':
+        return (cfg.DICT_FP_TUP_SCALAR_BASE,
+                cfg.TUP_JOB_SCALAR_BASE,
+                cfg.TUP_VA_SCALAR_BASE)
+    return (cfg.DICT_FP_TUP_SCALAR_DELTA,
+            cfg.TUP_JOB_SCALAR_DELTA,
+            cfg.TUP_VA_SCALAR_DELTA)
+
+
+def get_list_row_fp(variant, list_tup_pathway):
+    """ Get long-format rows of footprints of variant per pathway.
+        Impacts of each footprint are summed, and scaled to reporting
+        units.
+
+        Parameters:
+        -----------
+        variant: 'base' or 'delta'.
+        list_tup_pathway: list with tuples of pathway, and dictionaries
+        with environmental footprints, employment, and value added per
+        measure.
+
+        Returns:
+        --------
+        list_row: list with tuples of values of LIST_RESULT_COL.
 
-    act = 'Prim'
-    d_cat_delta[act] = {}
-    for meas_id in dict_ef_eb_delta_prim:
-        for imp_cat in dict_ef_eb_delta_prim[meas_id]:
-            df = dict_ef_eb_delta_prim[meas_id][imp_cat]
-            d_df = df.to_dict()
-            t_fp = d_fp_tup_ef_scalar[imp_cat]
-            fp_plt, t_fp_txt, fp_scalar = t_fp
+    """
+    d_fp_tup_scalar, t_emp_scalar, t_va_scalar = get_tup_scalar(variant)
+    emp_plt, t_emp_txt, emp_scalar = t_emp_scalar
+    va_plt, t_va_txt, va_scalar = t_va_scalar
+
+    list_row = []
+    for pathway, d_ef, d_vf_emp, d_vf_va in list_tup_pathway:
+        list_tup_meas_fp = []
+        for meas_id in d_ef:
+            for fp_cat in d_ef[meas_id]:
+                fp_plt, t_fp_txt, fp_scalar = d_fp_tup_scalar[fp_cat]
+                list_tup_meas_fp.append(
+                    (meas_id, d_ef[meas_id][fp_cat], t_fp_txt, fp_scalar))
+        for meas_id in d_vf_emp:
+            list_tup_meas_fp.append(
+                (meas_id, d_vf_emp[meas_id], t_emp_txt, emp_scalar))
+        for meas_id in d_vf_va:
+            list_tup_meas_fp.append(
+                (meas_id, d_vf_va[meas_id], t_va_txt, va_scalar))
+        for meas_id, df_fp, t_fp_txt, fp_scalar in list_tup_meas_fp:
             fp, unit = t_fp_txt
-            if t_fp_txt not in d_cat_delta[act]:
-                d_cat_delta[act][t_fp_txt] = {}
-            for reg in d_df:
-                if reg not in d_cat_delta[act][t_fp_txt]:
-                    d_cat_delta[act][t_fp_txt][reg] = 0
-                for imp_cat in d_df[reg]:
-                    val = d_df[reg][imp_cat]
-                    val_scalar = val/fp_scalar
-                    d_cat_delta[act][t_fp_txt][reg] += val_scalar
-
-    emp_plt, t_emp_txt, emp_scalar =  cfg.TUP_JOB_SCALAR_DELTA
-    emp, emp_unit = t_emp_txt
-    d_cat_delta[act][t_emp_txt] = {}
-    for meas_id in dict_vf_eb_delta_emp_prim:
-        df = dict_vf_eb_delta_emp_prim[meas_id]
-        d_df = df.to_dict()
-        for reg in d_df:
-            if reg not in d_cat_delta[act][t_emp_txt]:
-                d_cat_delta[act][t_emp_txt][reg] = 0
-            for t_imp_cat in d_df[reg]:
-                val = d_df[reg][t_imp_cat]/emp_scalar
-                d_cat_delta[act][t_emp_txt][reg] += val
+            sr_fp = df_fp.sum()/fp_scalar
+            for reg, val in sr_fp.items():
+                list_row.append((cfg.RUN_ID, variant, pathway, meas_id, reg,
+                                 fp, unit, val))
+    return list_row
+
+
+@ut.trace
+def get_df_result(variant,
+                  dict_ef_eb_prim,
+                  dict_vf_eb_emp_prim,
+                  dict_vf_eb_va_prim,
+                  dict_ef_eb_circ,
+                  dict_vf_eb_emp_circ,
+                  dict_vf_eb_va_circ,
+                  df_cbs_emp,
+                  df_cbs_va):
+    """ Get long-format results of variant.
+
+        Impacts of each footprint are summed, and scaled to reporting
+        units. Net pathway is sum of primary sales, circularity
+        activities, and direct effects.
+
+        Parameters:
+        -----------
+        variant: 'base' or 'delta'.
+        dict_ef_eb_prim: dictionary with environmental footprints per
+        measure of primary sales.
+        dict_vf_eb_emp_prim: dictionary with employment per measure of
+        primary sales.
+        dict_vf_eb_va_prim: dictionary with value added per measure of
+        primary sales.
+        dict_ef_eb_circ, dict_vf_eb_emp_circ, dict_vf_eb_va_circ: same, of
+        circularity activities.
+        df_cbs_emp: DataFrame with direct employment per measure.
+        df_cbs_va: DataFrame with direct value added per measure.
+
+        Returns:
+        --------
+        df_result: DataFrame with columns LIST_RESULT_COL.
 
-    va_plt, t_va_txt, va_scalar = cfg.TUP_VA_SCALAR_DELTA
-    va, va_unit = t_va_txt
-    d_cat_delta[act][t_va_txt] = {}
-    for meas_id in dict_vf_eb_delta_va_prim:
-        df = dict_vf_eb_delta_va_prim[meas_id]
-        d_df = df.to_dict()
-        for reg in d_df:
-            if reg not in d_cat_delta[act][t_va_txt]:
-                d_cat_delta[act][t_va_txt][reg] = 0
-            for t_imp_cat in d_df[reg]:
-                val = d_df[reg][t_imp_cat]/va_scalar
-                d_cat_delta[act][t_va_txt][reg] += val
+    """
+    d_fp_tup_scalar, t_emp_scalar, t_va_scalar = get_tup_scalar(variant)
+    emp_plt, t_emp_txt, emp_scalar = t_emp_scalar
+    va_plt, t_va_txt, va_scalar = t_va_scalar
+
+    list_tup_pathway = [('prim',
+                         dict_ef_eb_prim,
+                         dict_vf_eb_emp_prim,
+                         dict_vf_eb_va_prim),
+                        ('circ',
+                         dict_ef_eb_circ,
+                         dict_vf_eb_emp_circ,
+                         dict_vf_eb_va_circ)]
+    list_row = get_list_row_fp(variant, list_tup_pathway)
+
+    # Direct effects of repair sectors in NL.
+    for df_cbs, t_fp_txt, fp_scalar in [(df_cbs_emp, t_emp_txt, emp_scalar),
+                                        (df_cbs_va, t_va_txt, va_scalar)]:
+        fp, unit = t_fp_txt
+        sr_cbs = df_cbs.sum()/fp_scalar
+        for meas_id, val in sr_cbs.items():
+            list_row.append((cfg.RUN_ID, variant, 'direct', meas_id,
+                             cfg.TUP_NL[0], fp, unit, val))
+
+    df_result = pd.DataFrame(list_row, columns=cfg.LIST_RESULT_COL)
+    list_col_key = [col for col in cfg.LIST_RESULT_COL
+                    if col not in ['pathway', 'value']]
+    df_net = df_result.groupby(list_col_key, sort=False)['value'].sum()
+    df_net = df_net.reset_index()
+    df_net['pathway'] = 'net'
+    return pd.concat([df_result, df_net[cfg.LIST_RESULT_COL]],
+                     ignore_index=True)
+
+
+@ut.trace
+def get_df_attr(variant, dict_tno):
+    """ Get long-format attribution of footprints of variant to pathways
+        of final demand in DICT_ACT_LIST_PATHWAY, from results of block
+        evaluation. Pathways of each activity sum to its results in
+        get_df_result, without direct effects.
+
+        Returns:
+        --------
+        df_attr: DataFrame with columns LIST_RESULT_COL.
 
-    act = 'Circ'
-    d_cat_delta[act] = {}
-    for meas_id in dict_ef_eb_delta_circ:
-        for imp_cat in dict_ef_eb_delta_circ[meas_id]:
-            df = dict_ef_eb_delta_circ[meas_id][imp_cat]
-            d_df = df.to_dict()
-            t_fp = d_fp_tup_ef_scalar[imp_cat]
-            fp_plt, t_fp_txt, fp_scalar = t_fp
-            fp, unit = t_fp_txt
-            if t_fp_txt not in d_cat_delta[act]:
-                d_cat_delta[act][t_fp_txt] = {}
-            for reg in d_df:
-                if reg not in d_cat_delta[act][t_fp_txt]:
-                    d_cat_delta[act][t_fp_txt][reg] = 0
-                for imp_cat in d_df[reg]:
-                    val = d_df[reg][imp_cat]
-                    val_scalar = val/fp_scalar
-                    d_cat_delta[act][t_fp_txt][reg] += val_scalar
-                    # print(meas_id, fp, unit, reg, imp_cat, val, val_scalar)
-
-    emp_plt, t_emp_txt, emp_scalar =  cfg.TUP_JOB_SCALAR_DELTA
-    emp, emp_unit = t_emp_txt
-    d_cat_delta[act][t_emp_txt] = {}
-    for meas_id in dict_vf_eb_delta_emp_circ:
-        df = dict_vf_eb_delta_emp_circ[meas_id]
-        d_df = df.to_dict()
-        for reg in d_df:
-            if reg not in d_cat_delta[act][t_emp_txt]:
-                d_cat_delta[act][t_emp_txt][reg] = 0
-            for t_imp_cat in d_df[reg]:
-                val = d_df[reg][t_imp_cat]
-                d_cat_delta[act][t_emp_txt][reg] += val
-
-    d_delta_cbs_emp = df_delta_cbs_emp.to_dict()
-    for meas_id in d_delta_cbs_emp:
-        for fp_emp in d_delta_cbs_emp[meas_id]:
-            val = d_delta_cbs_emp[meas_id][fp_emp]
-            d_cat_delta['Circ'][t_emp_txt]['NL'] += val/emp_scalar
-
-    va_plt, t_va_txt, va_scalar = cfg.TUP_VA_SCALAR_DELTA
-    va, va_unit = t_va_txt
-    d_cat_delta[act][t_va_txt] = {}
-    for meas_id in dict_vf_eb_delta_va_circ:
-        df = dict_vf_eb_delta_va_circ[meas_id]
-        d_df = df.to_dict()
-        for reg in d_df:
-            if reg not in d_cat_delta[act][t_va_txt]:
-                d_cat_delta[act][t_va_txt][reg] = 0
-            for t_imp_cat in d_df[reg]:
-                val = d_df[reg][t_imp_cat]/va_scalar
-                d_cat_delta[act][t_va_txt][reg] += val
+    """
+    list_tup_pathway = []
+    for act in cfg.DICT_ACT_LIST_PATHWAY:
+        for pathway in cfg.DICT_ACT_LIST_PATHWAY[act]:
+            list_tup_pathway.append((pathway,
+                                     dict_tno['ef_'+pathway],
+                                     dict_tno['vf_emp_'+pathway],
+                                     dict_tno['vf_va_'+pathway]))
+    return pd.DataFrame(get_list_row_fp(variant, list_tup_pathway),
+                        columns=cfg.LIST_RESULT_COL)
+
+
+@ut.trace
+def write_result(df_result, store_dir_path=None):
+    """ Write long-format results to store_dir_path, partitioned by
+        variant. Previous store of run is replaced.
+
+        Parameters:
+        -----------
+        df_result: DataFrame with columns LIST_RESULT_COL.
+        store_dir_path: string with directory of store, default
+        RESULT_STORE_DIR_PATH.
+
+    """
+    if store_dir_path is None:
+        store_dir_path = cfg.RESULT_STORE_DIR_PATH
+    shutil.rmtree(store_dir_path, ignore_errors=True)
+    if pyarrow is not None:
+        df_result.to_parquet(store_dir_path,
+                             partition_cols=['variant'],
+                             compression=cfg.RESULT_STORE_COMPRESSION,
+                             index=False)
+    else:
+        # Same layout of partitions as Parquet, so readers can select
+        # variants by directory.
+        for variant, df_variant in df_result.groupby('variant', sort=False):
+            dir_path = '{}variant={}/'.format(store_dir_path, variant)
+            os.makedirs(dir_path, exist_ok=True)
+            df_variant.drop(columns='variant').to_csv(
+                dir_path+cfg.RESULT_STORE_TXT_FILE_NAME,
+                sep='\t',
+                index=False,
+                compression='gzip')
+
+
+@ut.trace
+def cat_result(df_result, variant):
+    """ Total long-format results of variant over measures, per activity,
+        footprint, and region.
+
+        Returns:
+        --------
+        df_cat: DataFrame with columns of text file of totals.
+
+    """
+    df_variant = df_result[(df_result['variant'] == variant) &
+                           (df_result['pathway'] != 'net')]
+    sr_act = df_variant['pathway'].map(cfg.DICT_PATHWAY_ACT)
+    df_cat = df_variant.groupby([sr_act.rename('activity'),
+                                 'indicator',
+                                 'unit',
+                                 'region'],
+                                sort=False)['value'].sum().reset_index()
+    df_cat['fp_id'] = df_cat.groupby('activity', sort=False)[
+        'indicator'].transform(lambda sr_fp: pd.factorize(sr_fp)[0])
+    df_cat = df_cat[['region',
+                     'activity',
+                     'fp_id',
+                     'indicator',
+                     'value',
+                     'unit']]
+    df_cat.columns = ['Region',
+                      'Activity',
+                      'Footprint ID',
+                      'Footprint',
+                      'Value',
+                      'Unit']
+    return df_cat
+
+
+@ut.trace
+def write_cat_result(df_cat, variant):
+    """ Write totals of variant per activity, footprint, and region.
+
+    """
+    with open(cfg.RESULT_TXT_DIR_PATH+cfg.CAT_FILE_NAME_PATTERN.format(
+            variant), 'w') as write_file:
+        df_cat.to_csv(write_file,
+                      sep='\t',
+                      index=False,
+                      lineterminator='\n')
 
-    d_delta_cbs_va = df_delta_cbs_va.to_dict()
-    for meas_id in d_delta_cbs_va:
-        for fp_va in d_delta_cbs_va[meas_id]:
-            val = d_delta_cbs_va[meas_id][fp_va]
-            d_cat_delta['Circ'][t_va_txt]['NL'] += val/va_scalar
 
-    return d_cat_delta
+@ut.trace
+def write_delta_mc(df_fp_mc):
+    """ Write central value and Monte Carlo percentiles of delta.
 
-def write_cat_delta(d_cat_delta):
-    with open(cfg.RESULT_TXT_DIR_PATH+'d_cat_delta.txt', 'w') as write_file:
+    """
+    df_fp_mc.to_csv(cfg.RESULT_TXT_DIR_PATH+cfg.DELTA_MC_FILE_NAME,
+                    sep='\t')
+
+
+@ut.trace
+def write_delta_bound(df_fp_bound):
+    """ Write exact envelopes of delta of reported footprints.
+
+    """
+    df_fp_bound.to_csv(cfg.RESULT_TXT_DIR_PATH+cfg.DELTA_BOUND_FILE_NAME,
+                       sep='\t')
+
+
+@ut.trace
+def write_base_bound(df_fp_bound):
+    """ Write exact envelopes of reported baseline footprints.
+
+    """
+    df_fp_bound.to_csv(cfg.RESULT_TXT_DIR_PATH+cfg.BASE_BOUND_FILE_NAME,
+                       sep='\t')
+
+
+@ut.trace
+def write_delta_bound_ind(dict_delta_bound):
+    """ Write exact envelopes of delta per measure, footprint or impact,
+        and region.
+
+    """
+    write_bound_ind(dict_delta_bound, cfg.DELTA_BOUND_IND_FILE_NAME)
+
+
+@ut.trace
+def write_base_bound_ind(dict_base_bound):
+    """ Write exact envelopes of baseline per footprint or impact, and
+        region.
+
+    """
+    write_bound_ind(dict_base_bound, cfg.BASE_BOUND_IND_FILE_NAME)
+
+
+def write_bound_ind(dict_fp_bound, file_name):
+    """ Write exact envelopes per measure, footprint or impact, and region,
+        as returned by calc_bound_ind, to file_name.
+
+    """
+    list_tup_act_key = [('Prim', 'prim'), ('Circ', 'circ')]
+    with open(cfg.RESULT_TXT_DIR_PATH+file_name, 'w') as write_file:
         csv_file = csv.writer(write_file, delimiter='\t', lineterminator='\n')
-        row_write = ['Region',
-                     'Activity',
-                     'Footprint ID',
+        row_write = ['Activity',
+                     'Measure ID',
                      'Footprint',
-                     'Value',
-                     'Unit']
+                     'Row',
+                     'Region',
+                     'Min',
+                     'Max']
         csv_file.writerow(row_write)
-        for act in d_cat_delta:
-            for t_fp_id, t_fp in enumerate(d_cat_delta[act]):
-                fp, unit = t_fp
-                for reg in d_cat_delta[act][t_fp]:
-                    val = d_cat_delta[act][t_fp][reg]
-                    row_write = [reg, act, t_fp_id, fp, val, unit]
+        d_lo = dict_fp_bound['lo']
+        d_hi = dict_fp_bound['hi']
+        for act, act_key in list_tup_act_key:
+            list_tup_fp_lo_hi = []
+            for meas_id in d_lo['ef_'+act_key]:
+                for fp in d_lo['ef_'+act_key][meas_id]:
+                    list_tup_fp_lo_hi.append(
+                        (meas_id, fp,
+                         d_lo['ef_'+act_key][meas_id][fp],
+                         d_hi['ef_'+act_key][meas_id][fp]))
+            for fp_type in ['emp', 'va']:
+                vf_key = 'vf_{}_{}'.format(fp_type, act_key)
+                for meas_id in d_lo[vf_key]:
+                    list_tup_fp_lo_hi.append(
+                        (meas_id, fp_type,
+                         d_lo[vf_key][meas_id],
+                         d_hi[vf_key][meas_id]))
+            for meas_id, fp, df_lo, df_hi in list_tup_fp_lo_hi:
+                d_df_lo = df_lo.to_dict()
+                d_df_hi = df_hi.to_dict()
+                for reg in d_df_lo:
+                    for row in d_df_lo[reg]:
+                        row_write = [act, meas_id, fp, row, reg,
+                                     d_df_lo[reg][row], d_df_hi[reg][row]]
+                        csv_file.writerow(row_write)
+
+        # Direct effects of repair sectors in NL.
+        act = 'Circ'
+        for op in ['cbs_emp', 'cbs_va']:
+            d_df_lo = d_lo[op].to_dict()
+            d_df_hi = d_hi[op].to_dict()
+            for meas_id in d_df_lo:
+                for row in d_df_lo[meas_id]:
+                    row_write = [act, meas_id, op, row, cfg.TUP_NL[0],
+                                 d_df_lo[meas_id][row],
+                                 d_df_hi[meas_id][row]]
                     csv_file.writerow(row_write)
 
+
+@ut.trace
+def write_delta_tech(df_fp_tech):
+    """ Write delta of reported footprints per technology scenario.
+
+    """
+    df_fp_tech.to_csv(cfg.RESULT_TXT_DIR_PATH+cfg.DELTA_TECH_FILE_NAME,
+                      sep='\t')
+
+
 def write_b_sbi_eb_weighted(df_bridge_sbi_eb):
     d_bridge_sbi_eb_header = {}
     d_bridge_sbi_eb = df_bridge_sbi_eb.to_dict()
@@ -34,13 +34,20 @@
     FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
     DEALINGS IN THE SOFTWARE.
 """
+import concurrent.futures as cf
 import csv
+import json
 import os
+import pickle
+import shutil
+import tempfile
+import time
 
 import numpy as np
 import pandas as pd
 
 import cfg
+import leontief as lt
 import utils as ut
 
 
@@ -152,35 +159,170 @@ def fill_unit(df_source, df_target):
     return df_target
 
 
-def parse():
-    """ Parse EXIOBASE.
+def get_dict_eb_file_path(dict_eb_parse_meta):
+    """ Get dictionary with file paths of raw EXIOBASE tables.
 
     """
-
-    ut.log('Parsing EXIOBASE')
-    dict_eb_parse_meta = get_dict_eb_parse_meta()
-    dict_eb_raw = {}
+    dict_eb_file_path = {}
 
     # Get file names of exiobase.
     list_eb_file_name = os.listdir(cfg.EB_DIR_PATH)
 
-    # Pattern match file names to fill dictionary with raw exiobase data.
+    # Pattern match file names to tables.
     for eb_file_name in list_eb_file_name:
         for table in dict_eb_parse_meta['table']:
             if dict_eb_parse_meta['table'][table]['file_name_pattern'] in (
                     eb_file_name):
-                eb_file_path = cfg.EB_DIR_PATH+eb_file_name
-                dict_eb_raw[table] = pd.read_csv(
-                    eb_file_path,
-                    sep='\t',
-                    header=dict_eb_parse_meta['table'][table]['header'],
-                    index_col=dict_eb_parse_meta['table'][table]['index_col'],
-                    low_memory=False)
+                dict_eb_file_path[table] = cfg.EB_DIR_PATH+eb_file_name
+    return dict_eb_file_path
+
+
+def get_list_cq_file_path():
+    """ Get list with file paths of characterization factors.
+
+    """
+    return [cfg.EB_DATA_DIR_PATH+cfg.CQE_FILE_NAME,
+            cfg.EB_DATA_DIR_PATH+cfg.CQM_FILE_NAME,
+            cfg.EB_DATA_DIR_PATH+cfg.CQR_FILE_NAME]
+
+
+def get_proc_key_latest():
+    """ Get key of newest store of processed EXIOBASE of current version,
+        or None if there is no such store.
+
+    """
+    eb_proc_dir_path = cfg.INPUT_DIR_PATH+cfg.EB_PROC_DIR_NAME
+    if not os.path.isdir(eb_proc_dir_path):
+        return None
+    list_tup_mtime_key = []
+    for proc_key in os.listdir(eb_proc_dir_path):
+        meta_file_path = os.path.join(eb_proc_dir_path,
+                                      proc_key,
+                                      cfg.EB_PROC_META_FILE_NAME)
+        if not os.path.isfile(meta_file_path):
+            continue
+        with open(meta_file_path) as read_file:
+            dict_meta = json.load(read_file)
+        if dict_meta['version'] == cfg.EB_PROC_STORE_VERSION:
+            list_tup_mtime_key.append((os.path.getmtime(meta_file_path),
+                                       proc_key))
+    if not list_tup_mtime_key:
+        return None
+    return max(list_tup_mtime_key)[1]
+
+
+def get_proc_key():
+    """ Get key of processed EXIOBASE.
+        Hash of raw EXIOBASE tables, characterization factors, and code
+        used for processing. Changes if any of these change. Raw files are
+        hashed by manifest of sizes and modification times, or by content
+        if EB_PROC_HASH_CONTENT. Without raw EXIOBASE, key of newest store.
+
+    """
+    list_file_path = get_list_cq_file_path()
+    if not (os.path.isdir(cfg.EB_DIR_PATH) and
+            all(os.path.isfile(file_path) for file_path in list_file_path)):
+        proc_key = get_proc_key_latest()
+        if proc_key is None:
+            raise FileNotFoundError(
+                'Raw EXIOBASE not found in {}, and no processed store.'.format(
+                    cfg.EB_DIR_PATH))
+        ut.log('Raw EXIOBASE not found, using newest processed store.',
+               proc_key=proc_key)
+        return proc_key
+
+    dict_eb_file_path = get_dict_eb_file_path(get_dict_eb_parse_meta())
+    list_file_path = [dict_eb_file_path[table]
+                      for table in sorted(dict_eb_file_path)]+list_file_path
+    if cfg.EB_PROC_HASH_CONTENT:
+        data_key = ut.get_hash(list_file_path)
+    else:
+        data_key = ut.get_hash_stat(list_file_path)
+    list_code_file_path = [os.path.abspath(__file__),
+                           os.path.abspath(lt.__file__)]
+    str_code_version = '{} {} {}'.format(cfg.EB_PROC_STORE_VERSION,
+                                         cfg.CALC_CL,
+                                         data_key)
+    return ut.get_hash(list_code_file_path, str_code_version)
+
+
+def parse_table(eb_file_path, list_header, list_index_col, npy_file_path):
+    """ Parse raw EXIOBASE table into array file.
+        Table is read in one pass, with numeric body typed as float64.
+        Empty cells are kept as NaN. Body is saved to npy_file_path, such
+        that only labels are pickled back to the parent process.
+
+        Parameters:
+        -----------
+        eb_file_path: string with path to raw table.
+        list_header: list with row numbers of header.
+        list_index_col: list with column numbers of index.
+        npy_file_path: string with path to array file of body.
+
+        Returns:
+        --------
+        index: index of raw table.
+        columns: columns of raw table.
+        time_table: float with seconds used for parsing.
+
+    """
+    time_start = time.time()
+
+    # Count columns from first line of header.
+    with open(eb_file_path, encoding='utf-8') as read_file:
+        n_col = len(read_file.readline().rstrip('\r\n').split('\t'))
+
+    dict_dtype = {}
+    for col_id in range(n_col):
+        if col_id not in list_index_col:
+            dict_dtype[col_id] = np.float64
+    df_table = pd.read_csv(eb_file_path,
+                           sep='\t',
+                           header=list_header,
+                           index_col=list_index_col,
+                           dtype=dict_dtype)
+    np.save(npy_file_path, df_table.values)
+    return df_table.index, df_table.columns, time.time()-time_start
+
+
+@ut.trace
+def parse():
+    """ Parse EXIOBASE.
+
+    """
+
+    ut.log('Parsing EXIOBASE')
+    dict_eb_parse_meta = get_dict_eb_parse_meta()
+    dict_eb_raw = {}
+
+    # Fill dictionary with raw exiobase data.
+    # Tables are parsed concurrently in a process pool. Bodies are passed
+    # back through array files in a temporary directory.
+    dict_eb_file_path = get_dict_eb_file_path(dict_eb_parse_meta)
+    time_start = time.time()
+    with tempfile.TemporaryDirectory() as dir_path, cf.ProcessPoolExecutor(
+            max_workers=cfg.EB_PARSE_N_WORKER) as executor:
+        dict_future = {}
+        for table in dict_eb_file_path:
+            dict_future[table] = executor.submit(
+                parse_table,
+                dict_eb_file_path[table],
+                dict_eb_parse_meta['table'][table]['header'],
+                dict_eb_parse_meta['table'][table]['index_col'],
+                os.path.join(dir_path, table+'.npy'))
+        for table in dict_future:
+            index, columns, time_table = dict_future[table].result()
+            dict_eb_raw[table] = pd.DataFrame(
+                np.load(os.path.join(dir_path, table+'.npy')),
+                index=index,
+                columns=columns,
+                copy=False)
+            ut.log('    Parsed {} in {:.1f} s.'.format(table, time_table))
+    ut.log('    Parsed EXIOBASE tables in {:.1f} s.'.format(
+        time.time()-time_start))
 
     # Define file paths for characteristion factors.
-    cqe_file_path = cfg.EB_DATA_DIR_PATH+cfg.CQE_FILE_NAME
-    cqm_file_path = cfg.EB_DATA_DIR_PATH+cfg.CQM_FILE_NAME
-    cqr_file_path = cfg.EB_DATA_DIR_PATH+cfg.CQR_FILE_NAME
+    cqe_file_path, cqm_file_path, cqr_file_path = get_list_cq_file_path()
 
     # Read characterisation factors into pandas.
     df_cqe = pd.read_csv(cqe_file_path,
@@ -205,6 +347,7 @@ def parse():
     return dict_eb_raw
 
 
+@ut.trace
 def process(dict_eb_raw):
     """ Process EB.
 
@@ -227,13 +370,6 @@ def process(dict_eb_raw):
     # Construct Technical Coefficient Matrix.
     df_ca = dict_eb_raw['tZ']*array_tx_inv
 
-    # Construct Leontief Inverse.
-    array_ci = np.eye(df_ca.shape[0])
-    array_cl = np.linalg.inv(array_ci-df_ca)
-    df_cl = pd.DataFrame(array_cl,
-                         index=df_ca.index,
-                         columns=df_ca.columns)
-    df_cl.index = df_cl.index.droplevel(2)
     df_cre = dict_eb_raw['tRe']*array_tx_inv
     df_crm = fill_unit(dict_eb_raw['cQe'], df_cre)
     df_crm = dict_eb_raw['tRm']*array_tx_inv
@@ -250,16 +386,177 @@ def process(dict_eb_raw):
     dict_eb_proc['cRe'] = df_cre
     dict_eb_proc['cRm'] = df_crm
     dict_eb_proc['cRr'] = df_crr
-    dict_eb_proc['cL'] = df_cl
     dict_eb_proc['tY'] = df_ty
     dict_eb_proc['tHe'] = dict_eb_raw['tHe']
     dict_eb_proc['tHm'] = dict_eb_raw['tHm']
     dict_eb_proc['tHr'] = dict_eb_raw['tHr']
     dict_eb_proc['cV'] = df_cv
     dict_eb_proc['cA'] = df_ca
+
+    # Construct Leontief Inverse only on request. Total output is solved
+    # from the LU factorization of I-A, see leontief.py.
+    if cfg.CALC_CL:
+        dict_eb_proc['cL'] = lt.calc_cl(lt.factorize(df_ca))
     return dict_eb_proc
 
 
+@ut.trace
+def save_proc(dict_eb_proc, dir_path):
+    """ Save processed EXIOBASE as raw arrays with separate index metadata.
+        Store is written to a temporary directory that is renamed when
+        complete, such that readers never see a partial store.
+
+        Parameters:
+        -----------
+        dict_eb_proc: dictionary with processed version of EXIOBASE.
+        dir_path: string with path to directory of store.
+
+    """
+    ut.log('Saving processed EXIOBASE to {}'.format(dir_path))
+    dir_path = os.path.normpath(dir_path)
+    tmp_dir_path = '{}.tmp{}'.format(dir_path, os.getpid())
+    os.makedirs(tmp_dir_path)
+    dict_meta = {}
+    dict_meta['version'] = cfg.EB_PROC_STORE_VERSION
+    dict_meta['table'] = []
+    for table in dict_eb_proc:
+        df_table = dict_eb_proc[table]
+        # Skip derived entries, such as factorizations kept for reuse.
+        if not isinstance(df_table, pd.DataFrame):
+            continue
+        array_table = np.ascontiguousarray(df_table.values, dtype=np.float64)
+        np.save(os.path.join(tmp_dir_path, table+'.npy'), array_table)
+        with open(os.path.join(tmp_dir_path, table+'_label.pkl'),
+                  'wb') as write_file:
+            pickle.dump((df_table.index, df_table.columns), write_file)
+        dict_meta['table'].append(table)
+
+    with open(os.path.join(tmp_dir_path, cfg.EB_PROC_META_FILE_NAME),
+              'w') as write_file:
+        json.dump(dict_meta, write_file, indent=4)
+
+    # Remove incomplete store of aborted runs, then publish.
+    if os.path.isdir(dir_path):
+        shutil.rmtree(dir_path)
+    os.rename(tmp_dir_path, dir_path)
+
+
+@ut.trace
+def load_proc(dir_path):
+    """ Load processed EXIOBASE from store with memory-mapped arrays.
+        Pages of arrays are only read when touched, and are shared between
+        processes on one host.
+
+        Parameters:
+        -----------
+        dir_path: string with path to directory of store.
+
+        Returns:
+        --------
+        dict_eb_proc: dictionary with processed version of EXIOBASE, or None
+        if no complete store of current version is found.
+
+    """
+    meta_file_path = os.path.join(dir_path, cfg.EB_PROC_META_FILE_NAME)
+    if not os.path.isfile(meta_file_path):
+        return None
+    with open(meta_file_path) as read_file:
+        dict_meta = json.load(read_file)
+    if dict_meta['version'] != cfg.EB_PROC_STORE_VERSION:
+        ut.log('Processed EXIOBASE store has version {}, expected {}.'.format(
+            dict_meta['version'], cfg.EB_PROC_STORE_VERSION))
+        return None
+
+    dict_eb_proc = {}
+    for table in dict_meta['table']:
+        array_table = np.load(os.path.join(dir_path, table+'.npy'),
+                              mmap_mode='r')
+        with open(os.path.join(dir_path, table+'_label.pkl'),
+                  'rb') as read_file:
+            index, columns = pickle.load(read_file)
+        dict_eb_proc[table] = pd.DataFrame(array_table,
+                                           index=index,
+                                           columns=columns,
+                                           copy=False)
+    return dict_eb_proc
+
+
+def save_mult(dict_mult, dir_path):
+    """ Save regional footprint multipliers as raw array with separate
+        labels, next to store of processed EXIOBASE.
+
+        Parameters:
+        -----------
+        dict_mult: dictionary with array of multipliers and labels.
+        dir_path: string with path to directory of multipliers.
+
+    """
+    ut.log('Saving regional footprint multipliers to {}'.format(dir_path))
+    dir_path = os.path.normpath(dir_path)
+    tmp_dir_path = '{}.tmp{}'.format(dir_path, os.getpid())
+    os.makedirs(tmp_dir_path)
+    np.save(os.path.join(tmp_dir_path, 'mult.npy'),
+            np.ascontiguousarray(dict_mult['array'], dtype=np.float64))
+    dict_label = {}
+    for key in dict_mult:
+        if key != 'array':
+            dict_label[key] = dict_mult[key]
+    with open(os.path.join(tmp_dir_path, 'mult_label.pkl'),
+              'wb') as write_file:
+        pickle.dump(dict_label, write_file)
+
+    # Publish, unless other run published same multipliers meanwhile.
+    try:
+        os.rename(tmp_dir_path, dir_path)
+    except OSError:
+        shutil.rmtree(tmp_dir_path)
+
+
+def load_mult(dir_path):
+    """ Load regional footprint multipliers memory-mapped.
+
+        Returns:
+        --------
+        dict_mult: dictionary with array of multipliers and labels, or None
+        if multipliers are not stored.
+
+    """
+    label_file_path = os.path.join(dir_path, 'mult_label.pkl')
+    if not os.path.isfile(label_file_path):
+        return None
+    with open(label_file_path, 'rb') as read_file:
+        dict_mult = pickle.load(read_file)
+    dict_mult['array'] = np.load(os.path.join(dir_path, 'mult.npy'),
+                                 mmap_mode='r')
+    return dict_mult
+
+
+def save_result(dict_result, file_path):
+    """ Save cached results of measure as pickle.
+
+    """
+    tmp_file_path = '{}.tmp{}'.format(file_path, os.getpid())
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(tmp_file_path, 'wb') as write_file:
+        pickle.dump(dict_result, write_file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file_path, file_path)
+
+
+def load_result(file_path):
+    """ Load cached results of measure.
+
+        Returns:
+        --------
+        dict_result: dictionary with results of measure, or None if not
+        cached.
+
+    """
+    if not os.path.isfile(file_path):
+        return None
+    with open(file_path, 'rb') as read_file:
+        return pickle.load(read_file)
+
+
 if __name__ == "__main__":
 
     DICT_EB_RAW = parse()
@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+""" Leontief solver module for script of paper on
+    Global environmental and socio-economic impacts of a transition to a
+    circular economy in metal and electrical products: a Dutch case-study
+
+    Copyright (c) 2020 Bertram F. de Boer
+
+    Bertram F. de Boer
+    Faculty of Science
+    Institute of Environmental Sciences (CML)
+    Department of Industrial Ecology
+    Einsteinweg 2
+    2333 CC Leiden
+    The Netherlands
+
+    +31 (0)71 527 1478
+    b.f.de.boer@cml.leidenuniv.nl
+
+    Permission is hereby granted, free of charge, to any person obtaining a
+    copy of this software and associated documentation files (the "Software"),
+    to deal in the Software without restriction, including without limitation
+    the rights to use, copy, modify, merge, publish, distribute, sublicense,
+    and/or sell copies of the Software, and to permit persons to whom the
+    Software is furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in
+    all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+    FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+    DEALINGS IN THE SOFTWARE.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+import scipy.linalg as sla
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+
+import cfg
+import utils as ut
+
+# Lock to factorize I-A once per process, if baseline and delta request it
+# concurrently. Renewed in worker processes, see circular_measures_calc.
+dict_lock = {'lu': threading.Lock()}
+
+
+def get_method(array_ca):
+    """ Get method to factorize Leontief system.
+
+        Parameters:
+        -----------
+        array_ca: array with technical coefficient matrix.
+
+        Returns:
+        --------
+        string with 'dense', 'sparse', or 'series'.
+
+    """
+    if cfg.LEONTIEF_METHOD != 'auto':
+        return cfg.LEONTIEF_METHOD
+    fill = np.count_nonzero(array_ca)/array_ca.size
+    if fill <= cfg.LEONTIEF_SPARSE_FILL_MAX:
+        return 'sparse'
+    return 'dense'
+
+
+@ut.trace
+def factorize(df_ca):
+    """ Factorize Leontief system I-A with LU decomposition.
+
+        Parameters:
+        -----------
+        df_ca: DataFrame with technical coefficient matrix.
+
+        Returns:
+        --------
+        dict_lu: dictionary with LU factorization and labels of I-A. With
+        method 'series', sparse A and its norm instead of factorization.
+
+    """
+    array_ca = df_ca.values
+    method = get_method(array_ca)
+
+    dict_lu = {}
+    dict_lu['method'] = method
+    dict_lu['index'] = df_ca.index.droplevel(2)
+    dict_lu['columns'] = df_ca.columns
+    if method == 'series':
+        ut.log('Preparing power series of Leontief system.')
+        dict_lu['a'] = sp.csr_matrix(array_ca)
+        dict_lu['norm'] = np.abs(array_ca).sum(axis=0).max()
+        if dict_lu['norm'] >= 1:
+            raise ValueError(('Power series requires column sums of |A| '
+                              'below one, maximum is {}.').format(
+                                  dict_lu['norm']))
+        return dict_lu
+
+    ut.log('Factorizing Leontief system with {} LU.'.format(method))
+    if method == 'sparse':
+        sp_ci = sp.identity(array_ca.shape[0], format='csc')
+        dict_lu['lu'] = spla.splu(sp_ci-sp.csc_matrix(array_ca))
+    else:
+        array_ci = np.eye(array_ca.shape[0])
+        dict_lu['lu'] = sla.lu_factor(array_ci-array_ca,
+                                      overwrite_a=True,
+                                      check_finite=False)
+    return dict_lu
+
+
+def get_lu(dict_eb):
+    """ Get LU factorization of Leontief system of processed EXIOBASE.
+        Factorization is done on first request and kept in dict_eb.
+
+    """
+    with dict_lock['lu']:
+        if 'cLU' not in dict_eb:
+            dict_eb['cLU'] = factorize(dict_eb['cA'])
+    return dict_eb['cLU']
+
+
+@ut.trace
+def solve(dict_lu, array_y, trans=False):
+    """ Solve (I-A)x = y for all columns of y in one multi-RHS solve.
+
+        Parameters:
+        -----------
+        dict_lu: dictionary with LU factorization of I-A.
+        array_y: array with right-hand sides in columns.
+        trans: boolean to solve transposed system (I-A)'x = y.
+
+        Returns:
+        --------
+        array with solutions in columns, approximate with method 'series'.
+
+    """
+    if dict_lu['method'] == 'series':
+        array_x, n_tier, array_err = solve_series(dict_lu, array_y, trans)
+        ut.log('Solved Leontief system with power series.',
+               n_tier=n_tier,
+               err_max=array_err.max())
+        return array_x
+    if dict_lu['method'] == 'sparse':
+        if trans:
+            return dict_lu['lu'].solve(array_y, trans='T')
+        return dict_lu['lu'].solve(array_y)
+    return sla.lu_solve(dict_lu['lu'],
+                        array_y,
+                        trans=int(trans),
+                        check_finite=False)
+
+
+def solve_series(dict_lu, array_y, trans=False):
+    """ Solve (I-A)x = y approximately with power series x = sum of A^k y.
+
+        All columns of y are advanced together, one sparse product with A
+        per tier. With a = max column sum of |A| < 1, remainder of series
+        after term t is at most a/(1-a)|t| in 1-norm, and in max-norm for
+        transposed system. Series stops if this bound is below
+        LEONTIEF_SERIES_TOL times norm of solution, for all columns.
+
+        Parameters:
+        -----------
+        dict_lu: dictionary with sparse A and its norm, as returned by
+        factorize with method 'series'.
+        array_y: array with right-hand sides in columns.
+        trans: boolean to solve transposed system (I-A)'x = y.
+
+        Returns:
+        --------
+        array_x: array with approximate solutions in columns.
+        n_tier: number of tiers of series used.
+        array_err: array with bound on relative error per column.
+
+    """
+    sp_a = dict_lu['a']
+    norm_ord = 1
+    if trans:
+        sp_a = sp_a.T
+        norm_ord = np.inf
+    norm_a = dict_lu['norm']
+    array_term = np.asarray(array_y, dtype=float)
+    array_x = array_term.copy()
+    for n_tier in range(1, cfg.LEONTIEF_SERIES_MAX_TIER+1):
+        array_term = sp_a.dot(array_term)
+        array_x += array_term
+        array_err = (norm_a/(1-norm_a) *
+                     np.linalg.norm(array_term, norm_ord, axis=0))
+        array_x_norm = np.linalg.norm(array_x, norm_ord, axis=0)
+        array_err = np.divide(array_err,
+                              array_x_norm,
+                              out=np.zeros_like(array_err),
+                              where=array_x_norm > 0)
+        if (array_err <= cfg.LEONTIEF_SERIES_TOL).all():
+            break
+    else:
+        ut.log('Power series did not reach tolerance.',
+               level='WARNING',
+               n_tier=n_tier,
+               err_max=np.max(array_err))
+    return array_x, n_tier, np.atleast_1d(array_err)
+
+
+def get_series_key():
+    """ Get key of approximation by power series, empty for exact methods.
+
+    """
+    if cfg.LEONTIEF_METHOD != 'series':
+        return ''
+    return ' series {} {}'.format(cfg.LEONTIEF_SERIES_TOL,
+                                  cfg.LEONTIEF_SERIES_MAX_TIER)
+
+
+def calc_x(dict_lu, df_y):
+    """ Calculate total output x = Ly for all columns of final demand.
+
+        Parameters:
+        -----------
+        dict_lu: dictionary with LU factorization of I-A.
+        df_y: DataFrame with final demand in EXIOBASE classification.
+
+        Returns:
+        --------
+        df_x: DataFrame with total output.
+
+    """
+    array_y = np.asarray(df_y.loc[dict_lu['columns']].values, dtype=float)
+    array_x = solve(dict_lu, array_y)
+    df_x = pd.DataFrame(array_x,
+                        index=dict_lu['index'],
+                        columns=df_y.columns)
+    return df_x
+
+
+def calc_x_inject(dict_lu, sr_y):
+    """ Calculate total output x = Ly of sparse final demand injection.
+        For unit demand of one product, x is that column of L.
+
+        Parameters:
+        -----------
+        dict_lu: dictionary with LU factorization of I-A.
+        sr_y: Series with nonzero final demand, indexed by columns of I-A.
+
+        Returns:
+        --------
+        sr_x: Series with total output.
+
+    """
+    array_pos = dict_lu['columns'].get_indexer(sr_y.index)
+    if (array_pos < 0).any():
+        raise KeyError('Final demand not in EXIOBASE: {}'.format(
+            list(sr_y.index[array_pos < 0])))
+    array_y = np.zeros(len(dict_lu['columns']))
+    array_y[array_pos] = sr_y.values
+    sr_x = pd.Series(solve(dict_lu, array_y), index=dict_lu['index'])
+    return sr_x
+
+
+def calc_cl(dict_lu):
+    """ Calculate dense Leontief inverse from LU factorization.
+        Only needed if cL itself is requested.
+
+    """
+    ut.log('Calculating Leontief inverse.')
+    array_ci = np.eye(len(dict_lu['columns']))
+    array_cl = solve(dict_lu, array_ci)
+    df_cl = pd.DataFrame(array_cl,
+                         index=dict_lu['index'],
+                         columns=dict_lu['columns'])
+    return df_cl
+
+
+@ut.trace
+def calc_update(dict_lu, array_pos, array_d):
+    """ Prepare low-rank update of Leontief system for changed columns of A.
+
+        With k columns of A at positions array_pos changed by D, the
+        updated system is I-A-DE', with E selecting the columns. By
+        Sherman-Morrison-Woodbury its inverse is L' = L+LD(I-E'LD)^-1E'L,
+        with L = (I-A)^-1. Rows E'L are solved from the transposed system
+        with the factorization of I-A, such that an update costs k solves
+        instead of a factorization.
+
+        Parameters:
+        -----------
+        dict_lu: dictionary with LU factorization of I-A.
+        array_pos: array with positions of changed columns of A.
+        array_d: array with changes of columns of A, in columns.
+
+        Returns:
+        --------
+        dict_update: dictionary with positions 'pos', changes 'd', and
+        'cap_el' with (I-E'LD)^-1E'L, such that L' = L+LD cap_el.
+
+    """
+    n_pos = len(array_pos)
+    array_e = np.zeros((len(dict_lu['columns']), n_pos))
+    array_e[array_pos, np.arange(n_pos)] = 1
+    array_el = solve(dict_lu, array_e, trans=True).T
+    array_cap = np.eye(n_pos)-array_el.dot(array_d)
+    tup_lu_cap = sla.lu_factor(array_cap, check_finite=False)
+    if not np.diag(tup_lu_cap[0]).all():
+        raise ValueError('Updated Leontief system is singular.')
+
+    dict_update = {}
+    dict_update['pos'] = np.asarray(array_pos)
+    dict_update['d'] = array_d
+    dict_update['cap_el'] = sla.lu_solve(tup_lu_cap,
+                                         array_el,
+                                         check_finite=False)
+    return dict_update
@@ -0,0 +1,462 @@
+# -*- coding: utf-8 -*-
+""" Synthetic EXIOBASE and TNO data for benchmarks of paper on
+    Global environmental and socio-economic impacts of a transition to a
+    circular economy in metal and electrical products: a Dutch case-study
+
+    Copyright (c) 2020 Bertram F. de Boer
+
+    Bertram F. de Boer
+    Faculty of Science
+    Institute of Environmental Sciences (CML)
+    Department of Industrial Ecology
+    Einsteinweg 2
+    2333 CC Leiden
+    The Netherlands
+
+    +31 (0)71 527 1478
+    b.f.de.boer@cml.leidenuniv.nl
+
+    Permission is hereby granted, free of charge, to any person obtaining a
+    copy of this software and associated documentation files (the "Software"),
+    to deal in the Software without restriction, including without limitation
+    the rights to use, copy, modify, merge, publish, distribute, sublicense,
+    and/or sell copies of the Software, and to permit persons to whom the
+    Software is furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in
+    all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+    FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+    DEALINGS IN THE SOFTWARE.
+"""
+
+import csv
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+import cfg
+
+# Final demand categories of EXIOBASE.
+LIST_Y_CAT = ['Final consumption expenditure by households',
+              'Final consumption expenditure by non-profit organisations',
+              'Final consumption expenditure by government',
+              'Gross fixed capital formation',
+              'Changes in inventories',
+              'Changes in valuables',
+              'Exports: Total (fob)']
+
+# Stressors of emission, material, and resource extensions.
+LIST_TUP_E = [('CO2 - combustion', 'air', 'kg'),
+              ('CH4 - combustion', 'air', 'kg'),
+              ('N2O - combustion', 'air', 'kg'),
+              ('NOX - combustion', 'air', 'kg')]
+LIST_TUP_M = [('Domestic Extraction', 'kt'),
+              ('Water Consumption Blue - Total', 'Mm3'),
+              ('Unused Extraction', 'kt')]
+LIST_TUP_R = [('Land use', 'Cropland', 'km2'),
+              ('Land use', 'Forest', 'km2')]
+
+# Input files of TNO and CBS copied unchanged to synthetic input.
+LIST_INPUT_FILE_NAME = [cfg.B_CPA_PRIM_EB_FILE_NAME,
+                        cfg.B_CPA_CIRC_SBI_FILE_NAME,
+                        cfg.IO_CBS_2010_FILE_NAME,
+                        cfg.B_SBI_EB_FILE_NAME,
+                        cfg.PROD_ID_FILE_NAME,
+                        cfg.SEC_FILE_NAME,
+                        cfg.CBS_REP_EMP_2010_FILE_NAME,
+                        cfg.E_FP_FILE_NAME,
+                        cfg.M_FP_FILE_NAME,
+                        cfg.R_FP_FILE_NAME,
+                        cfg.JOB_FP_FILE_NAME,
+                        cfg.VA_FP_FILE_NAME]
+
+# Number of rows of Z generated at once.
+N_ROW_CHUNK = 1000
+
+
+def read_list_row(file_path):
+    """ Read rows of tab separated file.
+
+    """
+    list_row = []
+    with open(file_path) as read_file:
+        csv_file = csv.reader(read_file, delimiter='\t')
+        for row in csv_file:
+            list_row.append(row)
+    return list_row
+
+
+def write_header(csv_file, list_header_name, list_col, n_index):
+    """ Write header rows of table in layout of EXIOBASE.
+
+    """
+    for level, header_name in enumerate(list_header_name):
+        row_write = [header_name] + ['']*(n_index-1)
+        row_write += [col[level] for col in list_col]
+        csv_file.writerow(row_write)
+
+
+def write_row(csv_file, tup_index, array_row):
+    """ Write row of table in layout of EXIOBASE.
+
+    """
+    csv_file.writerow(list(tup_index) +
+                      ['{:.9g}'.format(val) for val in array_row])
+
+
+def write_table(file_path, list_header_name, list_col, list_index,
+                array_table):
+    """ Write table in layout of EXIOBASE.
+
+    """
+    with open(file_path, 'w', encoding='utf-8') as write_file:
+        csv_file = csv.writer(write_file, delimiter='\t', lineterminator='\n')
+        write_header(csv_file, list_header_name, list_col,
+                     len(list_index[0]))
+        for tup_index, array_row in zip(list_index, array_table):
+            write_row(csv_file, tup_index, array_row)
+
+
+def get_list_reg(n_reg):
+    """ Get list with region codes.
+
+        Regions of EXIOBASE are taken in turn from each aggregate region
+        of cfg.LIST_TUP_REG, starting with NL. Beyond 49 regions, synthetic
+        region codes are added.
+
+    """
+    list_reg_eb = []
+    n_cntr_max = max(len(list_cntr) for reg, list_cntr in cfg.LIST_TUP_REG)
+    for cntr_pos in range(n_cntr_max):
+        for reg, list_cntr in cfg.LIST_TUP_REG:
+            if cntr_pos < len(list_cntr):
+                list_reg_eb.append(list_cntr[cntr_pos])
+    list_reg = list_reg_eb[:n_reg]
+    for reg_id in range(n_reg-len(list_reg)):
+        list_reg.append('X{:02d}'.format(reg_id))
+    return list_reg
+
+
+def get_list_tup_reg(list_reg):
+    """ Get aggregate regions of synthetic regions, for cfg.LIST_TUP_REG.
+        Synthetic regions are part of rest of world.
+
+    """
+    list_tup_reg = []
+    for reg_pos, (reg, list_cntr) in enumerate(cfg.LIST_TUP_REG):
+        list_cntr_syn = [cntr for cntr in list_cntr if cntr in list_reg]
+        if reg_pos == len(cfg.LIST_TUP_REG)-1:
+            list_cntr_eb = [cntr for tup_reg in cfg.LIST_TUP_REG
+                            for cntr in tup_reg[1]]
+            list_cntr_syn += [cntr for cntr in list_reg
+                              if cntr not in list_cntr_eb]
+        list_tup_reg.append((reg, list_cntr_syn))
+    return list_tup_reg
+
+
+def get_list_prod(n_prod):
+    """ Get list with product names.
+
+        Products of EXIOBASE are taken from bridge of CBS to EXIOBASE, such
+        that all bridges of the model apply. At least all 200 products are
+        used. Beyond 200 products, synthetic products are added.
+
+    """
+    df_b_sbi_eb = pd.read_csv(cfg.INPUT_DIR_PATH+cfg.B_SBI_EB_FILE_NAME,
+                              sep='\t',
+                              index_col=[0],
+                              header=[0, 1])
+    list_prod = list(df_b_sbi_eb.index)
+    for prod_id in range(n_prod-len(list_prod)):
+        list_prod.append('Synthetic product {}'.format(prod_id))
+    return list_prod
+
+
+def gen_eb(eb_data_dir_path, n_reg, n_prod, seed=0, fill=0.3):
+    """ Generate synthetic EXIOBASE in layout of raw text version.
+
+        Technical coefficients are random with density fill, and column
+        sums below one, such that I-A is invertible. Z is written in chunks
+        of rows, such that memory is bounded by N_ROW_CHUNK rows.
+
+        Parameters:
+        -----------
+        eb_data_dir_path: string with directory of characterization
+        factors. Tables are written to subdirectory 'eb/'.
+        n_reg: integer with number of regions.
+        n_prod: integer with number of products, at least 200.
+        seed: integer with seed of random generator.
+        fill: float with density of Z.
+
+        Returns:
+        --------
+        list_reg: list with region codes.
+
+    """
+    eb_dir_path = os.path.join(eb_data_dir_path, 'eb')
+    os.makedirs(eb_dir_path, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    list_reg = get_list_reg(n_reg)
+    list_prod = get_list_prod(n_prod)
+    list_reg_prod = [(reg, prod) for reg in list_reg for prod in list_prod]
+    list_index = [(reg, prod, 'C_{}'.format(prod_pos))
+                  for reg in list_reg
+                  for prod_pos, prod in enumerate(list_prod)]
+    list_reg_y = [(reg, y_cat) for reg in list_reg for y_cat in LIST_Y_CAT]
+    n_x = len(list_reg_prod)
+
+    # Target output, and share of intermediate use in each column.
+    array_x = rng.uniform(100, 1000, n_x)
+    array_ca_sum = rng.uniform(0.2, 0.7, n_x)
+
+    # First pass sums random entries per column, second pass writes Z.
+    # Chunks of rows are drawn from own seeds, such that passes agree.
+    list_seed_chunk = rng.integers(2**32, size=-(-n_x//N_ROW_CHUNK))
+    array_col_sum = np.zeros(n_x)
+    for chunk_pos, seed_chunk in enumerate(list_seed_chunk):
+        array_chunk = get_array_z_chunk(seed_chunk, chunk_pos, n_x, fill)
+        array_col_sum += array_chunk.sum(axis=0)
+    array_col_sum[array_col_sum == 0] = 1
+    array_col_scalar = array_ca_sum*array_x/array_col_sum
+
+    array_z_row_sum = np.zeros(n_x)
+    with open(os.path.join(eb_dir_path, 'mrIot_version3.3.txt'), 'w',
+              encoding='utf-8') as write_file:
+        csv_file = csv.writer(write_file, delimiter='\t', lineterminator='\n')
+        write_header(csv_file, ['region', 'sector'], list_reg_prod, 3)
+        for chunk_pos, seed_chunk in enumerate(list_seed_chunk):
+            array_chunk = get_array_z_chunk(seed_chunk, chunk_pos, n_x,
+                                            fill)*array_col_scalar
+            row_start = chunk_pos*N_ROW_CHUNK
+            array_z_row_sum[row_start:row_start+len(array_chunk)] = (
+                array_chunk.sum(axis=1))
+            for row_pos, array_row in enumerate(array_chunk):
+                write_row(csv_file, list_index[row_start+row_pos], array_row)
+
+    # Final demand fills up output. Output may exceed target, which only
+    # lowers column sums of technical coefficients.
+    array_y_sum = np.maximum(array_x-array_z_row_sum, 0.1*array_x)
+    array_y = rng.random((n_x, len(list_reg_y)))
+    array_y *= (array_y_sum/array_y.sum(axis=1))[:, np.newaxis]
+    write_table(os.path.join(eb_dir_path, 'mrFinalDemand_version3.3.txt'),
+                ['region', 'category'], list_reg_y, list_index, array_y)
+
+    # Extensions of industries and final demand.
+    list_tup_v = ([tuple(row) for row in read_list_row(
+        cfg.INPUT_DIR_PATH+cfg.JOB_FP_FILE_NAME)] +
+                  [tuple(row) for row in read_list_row(
+                      cfg.INPUT_DIR_PATH+cfg.VA_FP_FILE_NAME)])
+    for file_name, list_tup_s in [('mrEmission', LIST_TUP_E),
+                                  ('mrMaterial', LIST_TUP_M),
+                                  ('mrResource', LIST_TUP_R),
+                                  ('mrFactorInput', list_tup_v)]:
+        array_s = rng.random((len(list_tup_s), n_x))*array_x
+        write_table(os.path.join(eb_dir_path, file_name+'_version3.3.txt'),
+                    ['region', 'sector'], list_reg_prod, list_tup_s, array_s)
+    for file_name, list_tup_s in [('mrFDEmission', LIST_TUP_E),
+                                  ('mrFDMaterial', LIST_TUP_M),
+                                  ('mrFDResource', LIST_TUP_R)]:
+        array_s = rng.random((len(list_tup_s), len(list_reg_y)))
+        write_table(os.path.join(eb_dir_path, file_name+'_version3.3.txt'),
+                    ['region', 'category'], list_reg_y, list_tup_s, array_s)
+
+    # Characterization factors, including rows used by footprints.
+    list_tup_qe = [tuple(read_list_row(
+        cfg.INPUT_DIR_PATH+cfg.E_FP_FILE_NAME)[0][1:])]
+    list_tup_qe.append(('Problem oriented approach: baseline (CML, 1999)',
+                        'acidification (incl. fate, average Europe total, '
+                        'A&B)',
+                        'AP (Huijbregts, 1999)',
+                        'kg SO2 eq.'))
+    write_table(os.path.join(eb_data_dir_path, cfg.CQE_FILE_NAME),
+                ['stressor', 'compartment', 'unit'], LIST_TUP_E,
+                list_tup_qe, rng.random((len(list_tup_qe), len(LIST_TUP_E))))
+    list_tup_qm = [tuple(row[1:]) for row in read_list_row(
+        cfg.INPUT_DIR_PATH+cfg.M_FP_FILE_NAME)]
+    write_table(os.path.join(eb_data_dir_path, cfg.CQM_FILE_NAME),
+                ['stressor', 'unit'], LIST_TUP_M, list_tup_qm,
+                np.eye(len(list_tup_qm), len(LIST_TUP_M)))
+    list_tup_qr = [tuple(row[1:]) for row in read_list_row(
+        cfg.INPUT_DIR_PATH+cfg.R_FP_FILE_NAME)]
+    write_table(os.path.join(eb_data_dir_path, cfg.CQR_FILE_NAME),
+                ['stressor', 'compartment', 'unit'], LIST_TUP_R, list_tup_qr,
+                np.ones((len(list_tup_qr), len(LIST_TUP_R))))
+    return list_reg
+
+
+def get_array_z_chunk(seed_chunk, chunk_pos, n_x, fill):
+    """ Get chunk of rows of random Z before scaling of columns.
+
+    """
+    rng = np.random.default_rng(seed_chunk)
+    n_row = min(N_ROW_CHUNK, n_x-chunk_pos*N_ROW_CHUNK)
+    array_chunk = rng.random((n_row, n_x))
+    array_chunk[rng.random((n_row, n_x)) >= fill] = 0
+    return array_chunk
+
+
+def get_str_prod_id(list_prod_id):
+    """ Get product IDs of measure as in delta sheet, e.g. '1, 3-5'.
+
+    """
+    list_tup_range = []
+    for prod_id in list_prod_id:
+        if list_tup_range and prod_id == list_tup_range[-1][1]+1:
+            list_tup_range[-1] = (list_tup_range[-1][0], prod_id)
+        else:
+            list_tup_range.append((prod_id, prod_id))
+    list_str_prod_id = []
+    for prod_id_start, prod_id_end in list_tup_range:
+        if prod_id_end > prod_id_start:
+            list_str_prod_id.append('{}-{}'.format(prod_id_start,
+                                                   prod_id_end))
+        else:
+            list_str_prod_id.append(str(prod_id_start))
+    return ', '.join(list_str_prod_id)
+
+
+def gen_tno(input_dir_path, n_meas, seed=0):
+    """ Generate synthetic input of TNO in layout of delta sheet.
+
+        Other input files are copied from cfg.INPUT_DIR_PATH. Each measure
+        changes number of products of one circularity sector, and
+        oppositely of primary sector. First measure changes all products of
+        all sectors, such that baseline covers all sectors of bridges.
+        Blocks of measures have one or at least three products, since
+        reader takes blocks of two rows as one product.
+
+        Parameters:
+        -----------
+        input_dir_path: string with directory of input.
+        n_meas: integer with number of measures.
+        seed: integer with seed of random generator.
+
+    """
+    os.makedirs(input_dir_path, exist_ok=True)
+    for file_name in LIST_INPUT_FILE_NAME:
+        shutil.copyfile(cfg.INPUT_DIR_PATH+file_name,
+                        os.path.join(input_dir_path, file_name))
+    rng = np.random.default_rng(seed)
+
+    # Product IDs sorted by product position, as read by read_y_tno.
+    # Product 2 is skipped in ranges, so it is not used.
+    list_prod_row = read_list_row(cfg.INPUT_DIR_PATH+cfg.PROD_ID_FILE_NAME)
+    list_prod_id = [int(row[1]) for row in sorted(list_prod_row,
+                                                  key=lambda row: int(row[0]))
+                    if int(row[1]) != 2]
+    list_sec_nl = [row[1] for row in read_list_row(
+        cfg.INPUT_DIR_PATH+cfg.SEC_FILE_NAME)]
+    sec_nl_prim, list_sec_nl_circ = list_sec_nl[0], list_sec_nl[1:]
+
+    n_col = 18
+    with open(os.path.join(input_dir_path, cfg.DELTA_FILE_NAME), 'w',
+              encoding='utf-8') as write_file:
+        csv_file = csv.writer(write_file, delimiter='\t', lineterminator='\n')
+        csv_file.writerow(['', '', 'base'] + ['']*(n_col-3))
+        csv_file.writerow(['ID', '', '# (000)', 'low', 'high'] +
+                          ['']*(n_col-5))
+        for meas_id in range(1, n_meas+1):
+            if meas_id == 1:
+                list_prod_id_meas = list_prod_id
+                list_sec_nl_meas = list_sec_nl_circ
+            else:
+                n_prod = rng.choice([1]+list(range(3, len(list_prod_id)+1)))
+                list_prod_id_meas = sorted(
+                    int(prod_id) for prod_id in rng.choice(list_prod_id,
+                                                           n_prod,
+                                                           replace=False))
+                list_sec_nl_meas = [rng.choice(list_sec_nl_circ)]
+            n_prod = len(list_prod_id_meas)
+            str_prod_id = get_str_prod_id(list_prod_id_meas)
+            array_unit = rng.uniform(1, 1000, n_prod)
+            array_lo = rng.uniform(1, 100, n_prod)
+            array_hi = array_lo*rng.uniform(1, 3, n_prod)
+            array_rate = rng.uniform(0.01, 0.1, n_prod)
+            list_tup_sec_sign = [(sec_nl, 1) for sec_nl in list_sec_nl_meas]
+            list_tup_sec_sign.append((sec_nl_prim, -1))
+            for sec_pos, (sec_nl, sign) in enumerate(list_tup_sec_sign):
+                suffix = chr(ord('a')+sec_pos)
+                list_row = []
+                for prod_pos in range(n_prod):
+                    unit = array_unit[prod_pos]
+                    price = (array_lo[prod_pos]+array_hi[prod_pos])/2
+                    unit_delta = sign*array_rate[prod_pos]*unit
+                    mon_base = unit*price
+                    mon_scen = (unit+unit_delta)*price
+                    mon_delta = mon_scen-mon_base
+                    list_row.append(
+                        ['', '', unit, array_lo[prod_pos],
+                         array_hi[prod_pos], mon_base, '',
+                         sign*array_rate[prod_pos], 0, '', unit+unit_delta,
+                         array_lo[prod_pos], array_hi[prod_pos],
+                         unit_delta, mon_scen, mon_delta, mon_delta,
+                         meas_id])
+                list_row[0][0] = '{}{}'.format(meas_id, suffix)
+                list_row[0][1] = str_prod_id
+                if n_prod == 1:
+                    list_row.append(['']*n_col)
+                list_row[1][1] = sec_nl
+                list_row.append(['']*n_col)
+                for row_write in list_row:
+                    csv_file.writerow(row_write)
+
+    with open(os.path.join(input_dir_path,
+                           cfg.LIST_MEAS_ID_SHORT_LONG_FILE_NAME), 'w',
+              encoding='utf-8') as write_file:
+        csv_file = csv.writer(write_file, delimiter='\t', lineterminator='\n')
+        csv_file.writerow(['ID', 'Measure short', 'Measure long'])
+        for meas_id in range(1, n_meas+1):
+            csv_file.writerow([meas_id,
+                               'Measure {}'.format(meas_id),
+                               'Synthetic measure {}'.format(meas_id)])
+
+
+def gen(dir_path, n_reg, n_prod, n_meas, seed=0):
+    """ Generate synthetic EXIOBASE and input of TNO.
+
+        Returns:
+        --------
+        dict_syn: dictionary with paths of synthetic data, and aggregate
+        regions, to be set in cfg with set_cfg.
+
+    """
+    dict_syn = {}
+    dict_syn['eb_data_dir_path'] = os.path.join(dir_path, 'data')+'/'
+    dict_syn['eb_dir_path'] = dict_syn['eb_data_dir_path']+'eb/'
+    dict_syn['input_dir_path'] = os.path.join(dir_path, 'input')+'/'
+    list_reg = gen_eb(dict_syn['eb_data_dir_path'], n_reg, n_prod, seed)
+    gen_tno(dict_syn['input_dir_path'], n_meas, seed)
+    dict_syn['list_tup_reg'] = get_list_tup_reg(list_reg)
+    return dict_syn
+
+
+def set_cfg(dict_syn, output_dir_path):
+    """ Point cfg to synthetic data, and output to output_dir_path.
+
+    """
+    cfg.EB_DATA_DIR_PATH = dict_syn['eb_data_dir_path']
+    cfg.EB_DIR_PATH = dict_syn['eb_dir_path']
+    cfg.INPUT_DIR_PATH = dict_syn['input_dir_path']
+    cfg.OUTPUT_DIR_PATH = output_dir_path
+    cfg.RESULT_DIR_PATH = '{}/result/'.format(cfg.OUTPUT_DIR_PATH)
+    cfg.RESULT_TXT_DIR_PATH = '{}/txt/'.format(cfg.RESULT_DIR_PATH)
+    cfg.LOG_DIR_PATH = '{}/log/'.format(cfg.OUTPUT_DIR_PATH)
+    cfg.RESULT_STORE_DIR_PATH = '{}/store/'.format(cfg.RESULT_DIR_PATH)
+    cfg.RESULT_ATTR_STORE_DIR_PATH = '{}/store_attr/'.format(
+        cfg.RESULT_DIR_PATH)
+    cfg.LIST_OUTPUT_DIR_PATH = [cfg.RESULT_TXT_DIR_PATH, cfg.LOG_DIR_PATH]
+    cfg.LIST_TUP_REG = dict_syn['list_tup_reg']
+    cfg.TUP_NL = cfg.LIST_TUP_REG[0]
+
+
+if __name__ == '__main__':
+    gen(sys.argv[1], *[int(arg) for arg in sys.argv[2:5]])
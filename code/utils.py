@@ -34,22 +34,229 @@
     FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
     DEALINGS IN THE SOFTWARE.
 """
-import csv
+import atexit
+import contextlib
+import functools
+import hashlib
+import json
+import logging
+import logging.handlers
+import multiprocessing
+import multiprocessing.util
 import os
+import sys
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+try:
+    import resource
+except ImportError:
+    resource = None
 
 import cfg
 
+# Closed spans of current run, and stack of open spans per thread. Open
+# spans with traced memory of all threads, to detect overlap of threads.
+list_span = []
+local_span = threading.local()
+list_span_mem_open = []
+lock_span_mem = threading.Lock()
+
+# Logger of runs, and its handlers, queue, and start time of current run.
+logger = logging.getLogger('circular_measures')
+dict_log = {}
+
+# Log files opened by this process. First open truncates log of previous
+# run, later opens append.
+set_log_file_path = set()
+
+
+class BufferedFileHandler(logging.Handler):
+    """ Log handler that keeps file open for run, and writes buffered
+        lines in one append. Buffer is written when it exceeds
+        LOG_BUFFER_SIZE characters, on warnings, and on close. A timer
+        thread writes it every LOG_FLUSH_INTERVAL seconds, also when no
+        records arrive, such that lines before a long stage are on disk if
+        run is killed. Buffer is written with one append, but appends of
+        other runs logging to same file may still interleave, e.g. for
+        large buffers or on network filesystems. Worker processes of run
+        log through queue of parent process instead, see init_log_worker.
+
+    """
+    def __init__(self, file_path, bool_trunc=False):
+        logging.Handler.__init__(self)
+        flag = os.O_WRONLY | os.O_CREAT | os.O_APPEND
+        if bool_trunc:
+            flag |= os.O_TRUNC
+        self.fd = os.open(file_path, flag, 0o644)
+        self.list_line = []
+        self.n_char = 0
+        self.time_flush = time.time()
+        self.event_close = threading.Event()
+        self.thread_flush = threading.Thread(target=self.flush_timer,
+                                             daemon=True)
+        self.thread_flush.start()
+
+    def flush_timer(self):
+        while not self.event_close.wait(cfg.LOG_FLUSH_INTERVAL):
+            self.flush()
+
+    def emit(self, record):
+        try:
+            line = self.format(record)+'\n'
+        except Exception:
+            self.handleError(record)
+            return
+        self.list_line.append(line)
+        self.n_char += len(line)
+        if (self.n_char >= cfg.LOG_BUFFER_SIZE or
+                record.levelno >= logging.WARNING or
+                time.time()-self.time_flush >= cfg.LOG_FLUSH_INTERVAL):
+            self.flush()
+
+    def flush(self):
+        self.acquire()
+        try:
+            if self.list_line and self.fd is not None:
+                os.write(self.fd, ''.join(self.list_line).encode('utf-8'))
+            self.list_line = []
+            self.n_char = 0
+            self.time_flush = time.time()
+        finally:
+            self.release()
+
+    def close(self):
+        self.event_close.set()
+        self.thread_flush.join()
+        self.flush()
+        self.acquire()
+        try:
+            if self.fd is not None:
+                os.close(self.fd)
+                self.fd = None
+        finally:
+            self.release()
+        logging.Handler.close(self)
+
+
+def init_log():
+    """ Start logging of run to LOG_FILE_NAME in LOG_DIR_PATH, and to
+        console.
+
+        Lines in file have elapsed seconds since start of run, level,
+        process ID, message, and structured fields. If LOG_THREAD, records
+        are written by background thread.
+
+    """
+    close_log()
+    os.makedirs(cfg.LOG_DIR_PATH, exist_ok=True)
+    dict_log['time_start'] = time.time()
+
+    log_file_path = os.path.abspath(cfg.LOG_DIR_PATH+cfg.LOG_FILE_NAME)
+    handler_file = BufferedFileHandler(
+        log_file_path, bool_trunc=log_file_path not in set_log_file_path)
+    set_log_file_path.add(log_file_path)
+    handler_file.setFormatter(logging.Formatter(
+        '%(elapsed).3f\t%(levelname)s\t%(process)d\t%(message)s'
+        '%(str_field)s'))
+    handler_console = logging.StreamHandler(sys.stdout)
+    handler_console.setFormatter(logging.Formatter('\n%(message)s'))
+    dict_log['list_handler'] = [handler_file, handler_console]
+
+    logger.setLevel(cfg.LOG_LEVEL)
+    logger.propagate = False
+    if cfg.LOG_THREAD:
+        logger.addHandler(logging.handlers.QueueHandler(get_log_queue()))
+    else:
+        for handler in dict_log['list_handler']:
+            logger.addHandler(handler)
+
 
-def log(str_log):
-    """ Log console output to file.
+def get_log_queue():
+    """ Get queue of log records of run, written by background thread.
+        Worker processes log to this queue, see init_log_worker.
 
     """
-    print('\n{}'.format(str_log))
-    with open(cfg.LOG_DIR_PATH+cfg.LOG_FILE_NAME, cfg.log_mode) as write_file:
-        csv_file = csv.writer(write_file,
-                              delimiter='\t',
-                              lineterminator='\n')
-        csv_file.writerow([str_log])
+    if 'queue' not in dict_log:
+        if 'list_handler' not in dict_log:
+            init_log()
+        dict_log['queue'] = multiprocessing.Queue()
+        dict_log['listener'] = logging.handlers.QueueListener(
+            dict_log['queue'],
+            *dict_log['list_handler'],
+            respect_handler_level=True)
+        dict_log['listener'].start()
+    return dict_log['queue']
+
+
+def init_log_worker(queue_log, time_start):
+    """ Log from worker process to queue of run in parent process.
+        Handlers inherited from parent are dropped, without writing their
+        buffers twice.
+
+    """
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    dict_log.clear()
+    dict_log['time_start'] = time_start
+    dict_log['list_handler'] = []
+    logger.setLevel(cfg.LOG_LEVEL)
+    logger.propagate = False
+    logger.addHandler(logging.handlers.QueueHandler(queue_log))
+
+
+def close_log():
+    """ Write remaining records, and close handlers of run.
+
+    """
+    if 'listener' in dict_log:
+        dict_log['listener'].stop()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    for handler in dict_log.get('list_handler', []):
+        handler.close()
+    dict_log.clear()
+
+
+# Remaining records are written when interpreter exits. Registered after
+# import of multiprocessing.util, so listener stops before queues of
+# multiprocessing are closed.
+atexit.register(close_log)
+
+
+def log(str_log, level='INFO', **dict_field):
+    """ Log message of run to console and file.
+
+        Parameters:
+        -----------
+        str_log: string with message.
+        level: string with name of level, e.g. 'DEBUG' or 'WARNING'.
+        dict_field: keyword arguments with structured fields, e.g. stage
+        or meas_id. Stage defaults to innermost open span of trace.
+
+    """
+    if 'time_start' not in dict_log:
+        init_log()
+    list_stack = getattr(local_span, 'list_stack', None)
+    if list_stack and 'stage' not in dict_field:
+        dict_field['stage'] = list_stack[-1]['name']
+    str_field = ''
+    for key in dict_field:
+        str_field += '\t{}={}'.format(key, dict_field[key])
+    logger.log(logging.getLevelName(level),
+               str_log,
+               extra={'elapsed': time.time()-dict_log['time_start'],
+                      'str_field': str_field})
 
 
 def makedirs():
@@ -69,6 +276,303 @@ def makedirs():
                 '    {}'.format(output_dir_path))
             list_log_makedirs.append(
                 '    This run will overwrite previous output.')
+    init_log()
     for log_makedirs in list_log_makedirs:
         log(log_makedirs)
-        cfg.log_mode = 'a'
+
+
+def get_hash(list_file_path, str_extra=''):
+    """ Get hash of content of files.
+
+        Parameters:
+        -----------
+        list_file_path: list with paths of files to hash.
+        str_extra: string with extra content to hash, e.g. a version.
+
+        Returns:
+        --------
+        string with hexadecimal hash.
+
+    """
+    hash_file = hashlib.blake2b(digest_size=16)
+    hash_file.update(str_extra.encode())
+    for file_path in list_file_path:
+        hash_file.update(os.path.basename(file_path).encode())
+        with open(file_path, 'rb') as read_file:
+            for chunk in iter(lambda: read_file.read(1 << 24), b''):
+                hash_file.update(chunk)
+    return hash_file.hexdigest()
+
+
+def get_hash_stat(list_file_path, str_extra=''):
+    """ Get hash of manifest of files: names, sizes, and modification times.
+        Content of files is not read.
+
+        Parameters:
+        -----------
+        list_file_path: list with paths of files to hash.
+        str_extra: string with extra content to hash, e.g. a version.
+
+        Returns:
+        --------
+        string with hexadecimal hash.
+
+    """
+    hash_file = hashlib.blake2b(digest_size=16)
+    hash_file.update(str_extra.encode())
+    for file_path in list_file_path:
+        stat_file = os.stat(file_path)
+        hash_file.update('{} {} {}'.format(os.path.basename(file_path),
+                                           stat_file.st_size,
+                                           stat_file.st_mtime_ns).encode())
+    return hash_file.hexdigest()
+
+
+def update_hash(hash_obj, obj):
+    """ Update hash with content of object.
+        DataFrames and Series are hashed by labels and values, arrays by
+        values, dictionaries, lists, and tuples by their elements, and
+        other objects by their repr. Name of Series is not hashed.
+
+    """
+    if isinstance(obj, dict):
+        for key in obj:
+            hash_obj.update(repr(key).encode())
+            update_hash(hash_obj, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        hash_obj.update('{}{}'.format(type(obj).__name__,
+                                      len(obj)).encode())
+        for obj_elem in obj:
+            update_hash(hash_obj, obj_elem)
+    elif isinstance(obj, (pd.DataFrame, pd.Series)):
+        hash_obj.update(repr(obj.shape).encode())
+        if isinstance(obj, pd.DataFrame):
+            hash_obj.update(repr(list(obj.columns)).encode())
+        hash_obj.update(
+            pd.util.hash_pandas_object(obj, index=True).values.tobytes())
+    elif isinstance(obj, np.ndarray):
+        hash_obj.update(repr((obj.shape, obj.dtype.str)).encode())
+        hash_obj.update(np.ascontiguousarray(obj).tobytes())
+    else:
+        hash_obj.update(repr(obj).encode())
+
+
+def get_hash_obj(list_obj, str_extra=''):
+    """ Get hash of content of objects in memory.
+
+        Parameters:
+        -----------
+        list_obj: list with objects to hash, see update_hash.
+        str_extra: string with extra content to hash, e.g. a version.
+
+        Returns:
+        --------
+        string with hexadecimal hash.
+
+    """
+    hash_obj = hashlib.blake2b(digest_size=16)
+    hash_obj.update(str_extra.encode())
+    for obj in list_obj:
+        update_hash(hash_obj, obj)
+    return hash_obj.hexdigest()
+
+
+@contextlib.contextmanager
+def lock_file(lock_file_path):
+    """ Take exclusive lock on file, waiting until it is released by other
+        processes. Lock is released on exit, also if the process dies.
+
+    """
+    with open(lock_file_path, 'a') as lock_file_handle:
+        if fcntl:
+            fcntl.flock(lock_file_handle, fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(lock_file_handle.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file_handle, fcntl.LOCK_UN)
+            else:
+                msvcrt.locking(lock_file_handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def get_size(obj):
+    """ Get shape and bytes of array, Series, or DataFrame, or None for
+        other objects.
+
+    """
+    if not hasattr(obj, 'shape'):
+        return None
+    if hasattr(obj, 'memory_usage'):
+        nbytes = obj.memory_usage(index=False)
+        if hasattr(nbytes, 'sum'):
+            nbytes = nbytes.sum()
+    else:
+        nbytes = getattr(obj, 'nbytes', 0)
+    return {'shape': [int(dim) for dim in obj.shape], 'nbytes': int(nbytes)}
+
+
+def get_list_size(obj):
+    """ Get sizes of array-like object, or of array-like elements of tuple
+        or list.
+
+    """
+    if isinstance(obj, (tuple, list)):
+        list_obj = obj
+    else:
+        list_obj = [obj]
+    list_size = []
+    for obj_elem in list_obj:
+        dict_size = get_size(obj_elem)
+        if dict_size:
+            list_size.append(dict_size)
+    return list_size
+
+
+def get_rss_max():
+    """ Get peak resident set size of process in bytes, or None if not
+        available on platform.
+
+    """
+    if resource is None:
+        return None
+    rss_max = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != 'darwin':
+        rss_max *= 1024
+    return rss_max
+
+
+@contextlib.contextmanager
+def span(name, **dict_attr):
+    """ Trace stage of run, if cfg.TRACE.
+
+        Records wall time, CPU time of process, peak resident set size of
+        process so far, growth of that peak within span, and, if
+        cfg.TRACE_MEM, peak of traced memory above start of span. Peak of
+        tracemalloc is process-global, so it is None for spans of threads
+        other than main thread that overlap each other, e.g. of task graph
+        with GRAPH_N_WORKER > 1.
+        Attributes may be added to yielded dictionary within span. Spans
+        of worker processes are not collected.
+
+        Parameters:
+        -----------
+        name: string with name of stage.
+        dict_attr: keyword arguments with attributes of span.
+
+    """
+    if not cfg.TRACE:
+        yield dict_attr
+        return
+
+    list_stack = getattr(local_span, 'list_stack', None)
+    if list_stack is None:
+        list_stack = local_span.list_stack = []
+    if cfg.TRACE_MEM and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    bool_mem = tracemalloc.is_tracing()
+
+    dict_span = {}
+    dict_span['name'] = name
+    dict_span['depth'] = len(list_stack)
+    dict_span['pid'] = os.getpid()
+    dict_span['tid'] = threading.get_ident()
+    if bool_mem:
+        with lock_span_mem:
+            # Peak of open spans of all threads is kept before peak is reset
+            # for this span. Spans of other threads than main thread, e.g.
+            # of tasks of graph, overlap if they are open at same time.
+            mem_cur, mem_peak = tracemalloc.get_traced_memory()
+            tid_main = threading.main_thread().ident
+            for dict_span_open in list_span_mem_open:
+                dict_span_open['mem_peak_open'] = max(
+                    dict_span_open['mem_peak_open'], mem_peak)
+                if (dict_span['tid'] != tid_main and
+                        dict_span_open['tid'] not in (dict_span['tid'],
+                                                      tid_main)):
+                    dict_span_open['bool_overlap'] = True
+                    dict_span['bool_overlap'] = True
+            tracemalloc.reset_peak()
+            dict_span['mem_start'] = mem_cur
+            dict_span['mem_peak_open'] = mem_cur
+            list_span_mem_open.append(dict_span)
+    list_stack.append(dict_span)
+    rss_peak_start = get_rss_max()
+    time_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield dict_attr
+    finally:
+        dict_span['start'] = time_start
+        dict_span['wall'] = time.perf_counter()-time_start
+        dict_span['cpu'] = time.process_time()-cpu_start
+        dict_span['rss_peak_process'] = get_rss_max()
+        dict_span['rss_peak_grow'] = None
+        if rss_peak_start is not None:
+            dict_span['rss_peak_grow'] = (dict_span['rss_peak_process'] -
+                                          rss_peak_start)
+        list_stack.pop()
+        if bool_mem:
+            with lock_span_mem:
+                list_span_mem_open.remove(dict_span)
+                mem_peak = max(tracemalloc.get_traced_memory()[1],
+                               dict_span.pop('mem_peak_open'))
+                for dict_span_open in list_span_mem_open:
+                    dict_span_open['mem_peak_open'] = max(
+                        dict_span_open['mem_peak_open'], mem_peak)
+            dict_span['mem_peak'] = mem_peak-dict_span.pop('mem_start')
+            if dict_span.pop('bool_overlap', False):
+                dict_span['mem_peak'] = None
+        dict_span.update(dict_attr)
+        list_span.append(dict_span)
+
+
+def trace(func):
+    """ Decorate stage to trace calls in span, with sizes of array-like
+        arguments and results. Only checks cfg.TRACE if disabled.
+
+    """
+    @functools.wraps(func)
+    def func_trace(*args, **kwargs):
+        if not cfg.TRACE:
+            return func(*args, **kwargs)
+        with span(func.__name__, size_in=get_list_size(args)) as dict_attr:
+            result = func(*args, **kwargs)
+            dict_attr['size_out'] = get_list_size(result)
+        return result
+    return func_trace
+
+
+def write_trace():
+    """ Write spans of run as JSON lines, and in Chrome trace format, to
+        LOG_DIR_PATH, if cfg.TRACE. Spans are cleared afterwards.
+
+    """
+    if not cfg.TRACE:
+        return
+    with open(cfg.LOG_DIR_PATH+cfg.TRACE_FILE_NAME, 'w') as write_file:
+        for dict_span in list_span:
+            write_file.write(json.dumps(dict_span, default=str)+'\n')
+
+    # Complete events, with times in microseconds.
+    list_event = []
+    for dict_span in list_span:
+        dict_event = {}
+        dict_event['name'] = dict_span['name']
+        dict_event['ph'] = 'X'
+        dict_event['ts'] = dict_span['start']*1e6
+        dict_event['dur'] = dict_span['wall']*1e6
+        dict_event['pid'] = dict_span['pid']
+        dict_event['tid'] = dict_span['tid']
+        dict_event['args'] = {}
+        for key in dict_span:
+            if key not in ['name', 'start', 'wall', 'pid', 'tid']:
+                dict_event['args'][key] = dict_span[key]
+        list_event.append(dict_event)
+    with open(cfg.LOG_DIR_PATH+cfg.TRACE_CHROME_FILE_NAME,
+              'w') as write_file:
+        json.dump({'traceEvents': list_event}, write_file, default=str)
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    list_span.clear()
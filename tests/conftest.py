@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+""" Fixtures of tests of calculation steps.
+
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'code'))
+
+import cfg  # noqa: E402
+import circular_measures_main as cmm  # noqa: E402
+import synthetic as syn  # noqa: E402
+import utils as ut  # noqa: E402
+
+# Countries and regions of small technical coefficient matrix.
+LIST_CNTR = ['NL', 'DE', 'US']
+LIST_TUP_REG = [('NL', ['NL']), ('RoE', ['DE']), ('RoW', ['US'])]
+N_PROD = 4
+
+# Numbers of regions, products, and measures of synthetic model.
+TUP_SYN_SIZE = (5, 200, 6)
+
+
+@pytest.fixture(autouse=True, scope='session')
+def log_dir(tmp_path_factory):
+    """ Write log of tests to temporary directory.
+
+    """
+    log_dir_path = str(tmp_path_factory.mktemp('log'))+'/'
+    cfg.LOG_DIR_PATH = log_dir_path
+    yield log_dir_path
+    ut.close_log()
+
+
+@pytest.fixture
+def df_ca():
+    """ Random technical coefficient matrix, with columns summing to at
+        most one half.
+
+    """
+    rng = np.random.default_rng(0)
+    list_prod = ['P{}'.format(prod_id) for prod_id in range(N_PROD)]
+    index_ca = pd.MultiIndex.from_product([LIST_CNTR, list_prod, ['']])
+    columns_ca = pd.MultiIndex.from_product([LIST_CNTR, list_prod])
+    n_x = len(columns_ca)
+    array_ca = rng.random((n_x, n_x))*(rng.random((n_x, n_x)) < 0.5)
+    array_ca += np.eye(n_x)*0.1
+    array_ca *= rng.uniform(0.2, 0.5, n_x)/array_ca.sum(axis=0)
+    return pd.DataFrame(array_ca, index=index_ca, columns=columns_ca)
+
+
+@pytest.fixture
+def leontief_method(monkeypatch):
+    """ Set method of Leontief system for test.
+
+    """
+    def set_method(method):
+        monkeypatch.setattr(cfg, 'LEONTIEF_METHOD', method)
+    return set_method
+
+
+@pytest.fixture(scope='session')
+def dict_model_syn(tmp_path_factory):
+    """ Model of synthetic EXIOBASE and input of TNO. Configuration points
+        to synthetic data during tests that use it, and is restored
+        afterwards.
+
+    """
+    dict_cfg = dict(vars(cfg))
+    dir_path = str(tmp_path_factory.mktemp('syn'))
+    cfg.INPUT_DIR_PATH = os.path.join(os.path.dirname(__file__), '..',
+                                      'input')+'/'
+    dict_syn = syn.gen(dir_path, *TUP_SYN_SIZE)
+    syn.set_cfg(dict_syn, dir_path+'/output')
+    ut.makedirs()
+    yield cmm.read_model()
+    ut.close_log()
+    for key in dict_cfg:
+        setattr(cfg, key, dict_cfg[key])
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+""" Tests of regional footprint multipliers, batched final demand, and
+    envelopes of footprints.
+
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import benchmark as bm
+import cfg
+import circular_measures_calc as cmc
+import circular_measures_main as cmm
+import circular_measures_read as cmr
+import circular_measures_write as cmw
+
+from conftest import LIST_TUP_REG
+
+
+def gen_io_eb_2010(df_ca):
+    """ Generate processed EXIOBASE with random extensions for technical
+        coefficient matrix.
+
+    """
+    rng = np.random.default_rng(3)
+    dict_io_eb_2010 = {}
+    dict_io_eb_2010['cA'] = df_ca
+    for qm, rm, list_stressor in [('cQe', 'cRe', ['CO2', 'CH4']),
+                                  ('cQm', 'cRm', ['Ore']),
+                                  ('cQr', 'cRr', ['Land', 'Water'])]:
+        dict_io_eb_2010[qm] = pd.DataFrame(
+            rng.random((2, len(list_stressor))),
+            index=[qm+'_0', qm+'_1'],
+            columns=list_stressor)
+        dict_io_eb_2010[rm] = pd.DataFrame(
+            rng.random((len(list_stressor), len(df_ca.columns))),
+            index=list_stressor,
+            columns=df_ca.columns)
+    dict_io_eb_2010['cV'] = pd.DataFrame(
+        rng.random((4, len(df_ca.columns))),
+        index=['Job low', 'Job high', 'VA wages', 'VA surplus'],
+        columns=df_ca.columns)
+    return dict_io_eb_2010
+
+
+@pytest.mark.parametrize('method', ['dense', 'sparse', 'series'])
+def test_calc_mult_direct(df_ca, leontief_method, monkeypatch, method):
+    """ Regional multipliers equal footprints of unit final demand of each
+        product, solved directly with inverse of I-A.
+
+    """
+    leontief_method(method)
+    monkeypatch.setattr(cfg, 'LIST_TUP_REG', LIST_TUP_REG)
+    dict_io_eb_2010 = gen_io_eb_2010(df_ca)
+    dict_tup_fp = {'e': {'GHG': 'cQe_0'},
+                   'm': {'Metal': 'cQm_1'},
+                   'r': {'Land': 'cQr_0', 'Water': 'cQr_1'}}
+    dict_impact = {'job': ['Job low', 'Job high'],
+                   'va': ['VA wages', 'VA surplus']}
+    dict_mult = cmc.calc_mult(dict_io_eb_2010, dict_tup_fp, dict_impact)
+
+    array_ca = df_ca.values
+    array_cl = np.linalg.inv(np.eye(array_ca.shape[0])-array_ca)
+    list_array_f = []
+    for fpm in dict_tup_fp:
+        for fp in dict_tup_fp[fpm]:
+            q = dict_tup_fp[fpm][fp]
+            df_cq = dict_io_eb_2010['cQ'+fpm].loc[[q]]
+            list_array_f.append(
+                df_cq.dot(dict_io_eb_2010['cR'+fpm]).values[0])
+    for fp_type in dict_impact:
+        for impact in dict_impact[fp_type]:
+            list_array_f.append(dict_io_eb_2010['cV'].loc[impact].values)
+    index_cntr = df_ca.columns.get_level_values(0)
+
+    # Power series bounds error of each row of M in max-norm.
+    tol = 1e-10
+    if method == 'series':
+        tol = cfg.LEONTIEF_SERIES_TOL*(1+1e-9)
+    assert dict_mult['fp'] == ['GHG', 'Metal', 'Land', 'Water']
+    assert dict_mult['reg'] == [reg for reg, list_cntr in LIST_TUP_REG]
+    for f_id, array_f in enumerate(list_array_f):
+        for reg_id, (reg, list_cntr) in enumerate(LIST_TUP_REG):
+            array_mask = index_cntr.isin(list_cntr).astype(float)
+            array_mult = dict_mult['array'][f_id, reg_id]
+            array_mult_direct = (array_f*array_mask).dot(array_cl)
+            assert (np.abs(array_mult-array_mult_direct).max() <=
+                    tol*np.abs(array_mult).max())
+
+
+@pytest.mark.parametrize('n_meas', [1, 10])
+def test_calc_y_eb_source_col(n_meas):
+    """ Broadcasted sourcing of final demand equals column wise sourcing.
+
+    """
+    df_bridge_eb_source, df_y_eb = bm.gen_y_eb_source(n_meas)
+    df_col = bm.calc_y_eb_source_col(df_bridge_eb_source, df_y_eb)
+    df_vec = cmc.calc_y_eb_source(df_bridge_eb_source, df_y_eb)
+    np.testing.assert_allclose(df_vec.values, df_col.values)
+
+
+@pytest.mark.parametrize('n_meas', [1, 10])
+def test_calc_y_cbs_circular_rep_col(n_meas):
+    """ Batched imports of repair sectors equal column wise imports.
+
+    """
+    df_coeff, df_y_cbs_circular = bm.gen_y_cbs_circular(n_meas)
+    list_tup_cbs_rep = [cfg.TUP_CBS_REP_CONS, cfg.TUP_CBS_REP_MACH]
+    df_vec = cmc.calc_y_cbs_circular_rep(df_coeff, df_y_cbs_circular,
+                                         list_tup_cbs_rep)
+    for tup_cbs_rep in list_tup_cbs_rep:
+        dict_col = bm.calc_y_cbs_circular_rep_col(df_coeff,
+                                                  df_y_cbs_circular,
+                                                  tup_cbs_rep)
+        np.testing.assert_allclose(df_vec.loc[tup_cbs_rep].values,
+                                   list(dict_col.values()))
+
+
+def get_df_cat_base(dict_model):
+    """ Get totals of baseline per activity, footprint, and region, as
+        written by main.
+
+    """
+    df_y_base_tno, df_y_scen_tno, df_y_delta_tno = cmr.read_y_tno()
+    dict_base = cmm.calc_base_tno(dict_model, df_y_base_tno)
+    df_result = cmw.get_df_result('base',
+                                  dict_base['ef_prim'],
+                                  dict_base['vf_emp_prim'],
+                                  dict_base['vf_va_prim'],
+                                  dict_base['ef_circ'],
+                                  dict_base['vf_emp_circ'],
+                                  dict_base['vf_va_circ'],
+                                  dict_base['cbs_emp'],
+                                  dict_base['cbs_va'])
+    return cmw.cat_result(df_result, 'base')
+
+
+def test_calc_fp_tno_base_bound_central(dict_model_syn):
+    """ Central value of baseline envelopes equals totals of calc_base_tno,
+        for primary sales and circularity activities.
+
+    """
+    df_cat = get_df_cat_base(dict_model_syn)
+    df_y_base_tno, df_y_scen_tno, df_y_delta_tno, dict_bound = (
+        cmr.read_y_tno(bool_bound=True))
+    dict_mult_tno = cmc.calc_mult_tno(dict_model_syn, variant='base')
+    df_fp_bound = cmc.calc_fp_tno_base_bound(dict_mult_tno,
+                                             df_y_base_tno,
+                                             dict_bound)
+
+    sr_central = df_fp_bound.xs('all', level='Measure')['central']
+    assert set(df_cat['Activity']) == {'Prim', 'Circ'}
+    for row in df_cat.itertuples(index=False):
+        val = sr_central[(row.Activity, row.Footprint, row.Unit, row.Region)]
+        assert val == pytest.approx(row.Value, rel=1e-10, abs=1e-15)
+
+    with pytest.raises(ValueError):
+        cmc.calc_fp_tno_base_bound(cmc.calc_mult_tno(dict_model_syn),
+                                   df_y_base_tno,
+                                   dict_bound)
+
+
+def test_calc_fp_mult_empty(df_ca, monkeypatch):
+    """ Footprints of final demand without measures are empty.
+
+    """
+    monkeypatch.setattr(cfg, 'LIST_TUP_REG', LIST_TUP_REG)
+    dict_io_eb_2010 = gen_io_eb_2010(df_ca)
+    dict_tup_fp = {'e': {'GHG': 'cQe_0'},
+                   'm': {'Metal': 'cQm_1'},
+                   'r': {'Land': 'cQr_0'}}
+    dict_impact = {'job': ['Job low'], 'va': ['VA wages']}
+    df_y_eb_source = pd.DataFrame(index=df_ca.columns, columns=[],
+                                  dtype=float)
+    dict_ef_eb, dict_vf_eb = cmc.calc_fp_mult(dict_io_eb_2010,
+                                              df_y_eb_source,
+                                              dict_tup_fp,
+                                              dict_impact)
+    assert dict_ef_eb == {}
+    assert dict_vf_eb == {'job': {}, 'va': {}}
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+""" Tests of factorization, low-rank update, and power series of Leontief
+    system.
+
+"""
+
+import numpy as np
+import pytest
+
+import cfg
+import leontief as lt
+
+
+def get_cl(df_ca):
+    """ Get Leontief inverse by explicit inversion of I-A.
+
+    """
+    array_ca = df_ca.values
+    return np.linalg.inv(np.eye(array_ca.shape[0])-array_ca)
+
+
+@pytest.mark.parametrize('method', ['dense', 'sparse'])
+@pytest.mark.parametrize('trans', [False, True])
+def test_solve_lu_inv(df_ca, leontief_method, method, trans):
+    """ Solve with LU factorization equals product with inverse of I-A.
+
+    """
+    leontief_method(method)
+    rng = np.random.default_rng(1)
+    array_y = rng.random((len(df_ca.columns), 3))
+    dict_lu = lt.factorize(df_ca)
+    assert dict_lu['method'] == method
+
+    array_cl = get_cl(df_ca)
+    if trans:
+        array_cl = array_cl.T
+    array_x = lt.solve(dict_lu, array_y, trans=trans)
+    np.testing.assert_allclose(array_x, array_cl.dot(array_y),
+                               rtol=1e-10, atol=1e-12)
+
+
+def test_calc_cl_inv(df_ca, leontief_method):
+    """ Leontief inverse from LU factorization equals inverse of I-A.
+
+    """
+    leontief_method('dense')
+    df_cl = lt.calc_cl(lt.factorize(df_ca))
+    np.testing.assert_allclose(df_cl.values, get_cl(df_ca),
+                               rtol=1e-10, atol=1e-12)
+
+
+@pytest.mark.parametrize('n_col', [1, 2, 5])
+def test_calc_update_refactorize(df_ca, leontief_method, n_col):
+    """ Low-rank update of Leontief system equals refactorization of
+        system with changed columns of A.
+
+    """
+    leontief_method('dense')
+    rng = np.random.default_rng(n_col)
+    n_x = len(df_ca.columns)
+    dict_lu = lt.factorize(df_ca)
+    array_y = rng.random(n_x)
+    array_pos = rng.choice(n_x, n_col, replace=False)
+    array_d = -0.1*df_ca.values[:, array_pos]
+    dict_update = lt.calc_update(dict_lu, array_pos, array_d)
+
+    df_ca_tech = df_ca.copy()
+    df_ca_tech.iloc[:, array_pos] += array_d
+    array_x_tech = lt.solve(lt.factorize(df_ca_tech), array_y)
+    array_x = lt.solve(dict_lu, array_y)
+    array_x_update = array_x+lt.solve(
+        dict_lu, array_d.dot(dict_update['cap_el'].dot(array_y)))
+    np.testing.assert_allclose(array_x_update, array_x_tech,
+                               rtol=1e-10, atol=1e-12)
+
+
+@pytest.mark.parametrize('trans', [False, True])
+def test_solve_series_bound(df_ca, leontief_method, trans):
+    """ Error of power series is within its bound, relative to norm of
+        approximate solution, and bound is within tolerance.
+
+    """
+    leontief_method('series')
+    rng = np.random.default_rng(2)
+    array_y = rng.random((len(df_ca.columns), 3))
+    array_y[:, 0] = 0
+    dict_lu = lt.factorize(df_ca)
+    array_x, n_tier, array_err = lt.solve_series(dict_lu, array_y, trans)
+
+    array_cl = get_cl(df_ca)
+    norm_ord = 1
+    if trans:
+        array_cl = array_cl.T
+        norm_ord = np.inf
+    array_x_exact = array_cl.dot(array_y)
+    array_err_abs = np.linalg.norm(array_x-array_x_exact, norm_ord, axis=0)
+    array_x_norm = np.linalg.norm(array_x, norm_ord, axis=0)
+    assert n_tier > 1
+    assert (array_err <= cfg.LEONTIEF_SERIES_TOL).all()
+    assert (array_err_abs <= array_err*array_x_norm*(1+1e-9)).all()
+
+
+def test_factorize_series_norm(df_ca, leontief_method):
+    """ Power series is refused if column sums of |A| reach one.
+
+    """
+    leontief_method('series')
+    with pytest.raises(ValueError):
+        lt.factorize(df_ca*4)